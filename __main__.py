@@ -1,44 +1,42 @@
 from time import monotonic as count
 from msvcrt import kbhit, getch
 
-class __Variable__(type):
-    state = {}
-    
-    def __delattr__(cls, k, v):
-        __Variable__.state.pop(k, None)
-    
-    def __setattr__(cls, k, v):
-        __Variable__.state[k]=v
- 
-    def __getattribute__(cls, k):
-        try:
-            return __Variable__.state[k]()
-        except KeyError:
-            return super(__Variable__).__getattribute__(k)
-
-
-class Variable(metaclass=__Variable__):
-    __slots__ = ()
-    pass
-
 
 def radio(engine, gen_func_lambda, *, octave=4, verbose=True, **kwargs):
+    # Fresh material on every loop is never replayed: rendered while playing, not compiled
     while not kbhit():
         engine.play(gen_func_lambda(), octave=octave, verbose=verbose, **kwargs)
+
+
+async def aradio(engine, gen_func_lambda, *, octave=4, verbose=True, **kwargs):
+    '''
+    Async radio. Runs until a key is hit or the task is cancelled;
+    many radios can share one event loop, e.g. asyncio.gather(aradio(...), aradio(...)).
+    '''
+    while not kbhit():
+        await engine.aplay(gen_func_lambda(), octave=octave, verbose=verbose, **kwargs)
     
 if __name__=="__main__":
     from rhythm.Rhythm import Rhythm
     from utils.Scale import Scale, find_scale
     from engine.Engine import Engine, StupidEngine
     from engine.Engine import seconds_to_bar, bar_to_seconds
-    from random import choice, random, sample, choices
+    from utils.Random import Stream
+    from engine.Modulation import Modulation, Uniform, Choice
     
-    Variable.low_notes = lambda : choice((True, False))
-    Variable.silence_ratio = random
-    Variable.inversion = lambda : choice((1, 0, 2))
+    rng = Stream()      # Stream(<seed>) replays a session
+    print("Seed:", rng.entropy)
+    choice, random, sample, choices = rng.choice, rng.random, rng.sample, rng.choices
     
-    _chord_lambda = "lambda : (se.next_chord(silence_ratio=Variable.silence_ratio, inversion=Variable.inversion, low_notes=Variable.low_notes),)"
-    _note_lambda = "lambda : (se.next_note(silence_ratio=Variable.silence_ratio),)"
+    mod = Modulation(       # One row of params per generated chord / note
+        silence_ratio=Uniform(0, 1),
+        inversion=Choice((1, 0, 2)),
+        low_notes=Choice((True, False)),
+        rng=rng,
+    )
+    
+    _chord_lambda = "lambda : (se.next_chord(**next(mod)),)"
+    _note_lambda = "lambda : (se.next_note(silence_ratio=next(mod)['silence_ratio']),)"
     
     def random_chord_prog(scale, delay=1.5, instrument=51, mute_prev=True):
         def r(n=1, **kwargs):
@@ -46,7 +44,7 @@ if __name__=="__main__":
                 if hasattr(r, k):
                     setattr(r, k, v)
             scale.midi.instrument = r.instrument
-            scale.chord_progression([scale.chord(i) for i in  r.pattern*n], delay=r.delay, mute_prev=r.mute_prev)
+            scale.chord_progression(scale.progression([scale.chord(i) for i in r.pattern], r.delay, r.mute_prev)*n)
             scale.midi.play('m')
         r.delay = delay
         r.instrument = instrument
@@ -77,13 +75,4 @@ if __name__=="__main__":
     rhy.rhythm = "---O---O-O-O-O---O---O-O-O-O---O---O-O-O-O---O-O"
     
     def rand_rhythm():
-        s = []
-        for _ in range(16):
-            c = choices([0,1,2,3], [3/6, 1/6, 1/6, 1/6])[0]
-            if not c:
-                s += ["-", "-", "-"]
-            else:
-                x = ['-', '-', '-']
-                x[c-1] = 'O'
-                s += x
-        return "".join(s)
\ No newline at end of file
+        return Rhythm.random(rng=rng).rhythm
\ No newline at end of file
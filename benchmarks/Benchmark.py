@@ -0,0 +1,133 @@
+'''
+Benchmark runner: timing, JSON export and baseline comparison.
+
+A benchmark is a named setup function returning the callable to time
+(setup work is excluded). Each benchmark is run in rounds of a calibrated
+number of calls; the reported time per call is the minimum over rounds
+(least disturbed by the rest of the system), the median is kept alongside.
+'''
+
+
+import json
+import platform
+import sys
+from statistics import median
+from time import perf_counter
+from typing import Callable, Dict, List
+
+
+class Benchmark:
+    '''
+    @params:
+        name: str - Unique name, key in JSON results and baselines
+        setup: Callable[[], Callable[[], object]] - Returns the callable to time
+        threshold: float - Optional. Allowed slowdown over the baseline, as a ratio (0.25: 25% slower)
+    '''
+
+    def __init__(self, name:str, setup:Callable, threshold:float=None):
+        self.name = name
+        self.setup = setup
+        self.threshold = threshold
+
+    def run(self, *, rounds=5, target=0.1)->Dict:
+        '''
+        Times the benchmark. Calls per round are calibrated so that a round
+        takes about target seconds.
+        Returns Dict(name, number, rounds, best, median), times in seconds per call.
+        '''
+        func = self.setup()
+        func()      # Warm up: caches, lazy imports
+        number = 1
+        while True:
+            start = perf_counter()
+            for _ in range(number):
+                func()
+            elapsed = perf_counter() - start
+            if elapsed >= target/10 or number >= 1 << 20:
+                break
+            number *= 10
+        number = max(1, int(number*target/max(elapsed, 1e-9)))
+
+        times = []
+        for _ in range(rounds):
+            start = perf_counter()
+            for _ in range(number):
+                func()
+            times.append((perf_counter() - start)/number)
+        return dict(
+            name=self.name,
+            number=number,
+            rounds=rounds,
+            best=min(times),
+            median=median(times),
+        )
+
+    def __repr__(self):
+        return f"<Benchmark {self.name}>"
+
+
+def run(benchmarks:List[Benchmark], *, select=None, rounds=5, target=0.1, verbose=True)->Dict:
+    '''
+    Runs benchmarks (names containing select, if given).
+    Returns JSON-serializable Dict(machine, results: Dict[name, result]).
+    '''
+    results = {}
+    for b in benchmarks:
+        if select and select not in b.name:
+            continue
+        res = b.run(rounds=rounds, target=target)
+        results[b.name] = res
+        if verbose:
+            print(f"{b.name:<48} {format_time(res['best']):>10}  (median {format_time(res['median'])}, {res['number']} x {rounds})")
+    return dict(machine=machine(), results=results)
+
+
+def machine()->Dict:
+    return dict(
+        python=sys.version.split()[0],
+        implementation=platform.python_implementation(),
+        platform=platform.platform(),
+        processor=platform.processor(),
+    )
+
+
+def format_time(seconds:float)->str:
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return f"{seconds/scale:.2f}{unit}"
+    return f"{seconds/1e-9:.0f}ns"
+
+
+def save(report:Dict, path):
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+
+
+def load(path)->Dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(report:Dict, baseline:Dict, benchmarks:List[Benchmark]=(), *, threshold=0.25, verbose=True)->List[str]:
+    '''
+    Compares best times of report against baseline.
+    A benchmark regresses when it is slower than its baseline by more than its
+    own threshold (default: threshold).
+    Returns names of the regressed benchmarks.
+    '''
+    thresholds = {b.name: b.threshold for b in benchmarks if b.threshold is not None}
+    regressed = []
+    for name, res in report['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            if verbose:
+                print(f"{name:<48} {'new':>10}")
+            continue
+        ratio = res['best']/base['best']
+        limit = thresholds.get(name, threshold)
+        bad = ratio > 1 + limit
+        if bad:
+            regressed.append(name)
+        if verbose:
+            print(f"{name:<48} {ratio:>9.2f}x  {'REGRESSED' if bad else 'ok'} (limit {1+limit:.2f}x)")
+    return regressed
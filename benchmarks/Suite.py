@@ -0,0 +1,134 @@
+'''
+Benchmarks of the theory and engine hot paths.
+
+Engine.play runs against a MidiPlayer on the null backend (utils.Backend)
+with a negligible delay, so it measures the cost of rendering, scheduling
+and sending items, not the playback time.
+'''
+
+
+from utils.Scale import Scale, find_scale
+from utils.CircularOctave import CircularOctave
+from utils.MidiPlayer import MidiPlayer
+from engine.Engine import StupidEngine, MarkovEngine
+from benchmarks.Benchmark import Benchmark
+
+
+DURATIONS = (4.0, 16.0, 64.0)    # Seconds of get_*_sequence, at the default 0.25s delay
+
+
+def _engine():
+    return StupidEngine(Scale('C', 'major'), seed=0)
+
+
+def scale_construction():
+    return lambda: Scale('D', 'harmonic')
+
+
+def scale_chord():
+    s = Scale('C', 'major')
+    return lambda: (s.chord(1), s.chord(5, inversion=1), s.chord(9, low_notes=False))
+
+
+def semitones_to_letter_notes():
+    chord = Scale('C', 'major').chord(5)
+    return lambda: Scale.semitones_to_letter_notes(chord, octave=3)
+
+
+def midi_to_letter_notes():
+    return lambda: Scale.midi_to_letter_notes(48, 55, 60, 64, 67)
+
+
+def find_scale_notes():
+    return lambda: find_scale('C', 'E', 'G', 'B')
+
+
+def octave_getitem():
+    o = CircularOctave(*range(1, 13))
+    return lambda: (o[3], o[14], o[0, 4, 7])
+
+
+def octave_next():
+    o = CircularOctave(*range(1, 13))
+    return lambda: next(o)
+
+
+def octave_gather():
+    import numpy as np
+    o = CircularOctave(*range(1, 13))
+    index = np.arange(-24, 40)
+    return lambda: o.gather(index)
+
+
+def octave_iter():
+    o = CircularOctave(*range(1, 13))
+    o.root_idx = 5
+    return lambda: tuple(o)
+
+
+def next_note():
+    e = _engine()
+    return lambda: e.next_note()
+
+
+def next_chord():
+    e = _engine()
+    return lambda: e.next_chord(inversion=1)
+
+
+def markov_next_note():
+    e = MarkovEngine(Scale('C', 'major'))
+    e.fit([[1, 3, 5, 8, 5, 3, 1, 0, 2, 4, 6, 9, 7, 5]*8], 'notes')
+    return lambda: e.next_note()
+
+
+def note_sequence(duration, **kwargs):
+    def setup():
+        e = _engine()
+        return lambda: e.get_note_sequence(duration=duration, **kwargs)
+    return setup
+
+
+def chord_sequence(duration, **kwargs):
+    def setup():
+        e = _engine()
+        return lambda: e.get_chord_sequence(duration=duration, **kwargs)
+    return setup
+
+
+def engine_play(protocol, chords=False, compiled=False):
+    def setup():
+        e = _engine()
+        blob = e.get_chord_sequence(duration=64.0) if chords else e.get_note_sequence(duration=64.0)
+        e._delay = 1e-9     # Deadlines are always due: no sleeping
+        if compiled:
+            blob = e.compile(blob)
+        e.scale.midi = MidiPlayer(backend='null', protocol=protocol)
+        e.scale.midi.start()
+        return lambda: e.play(blob, verbose=False)
+    return setup
+
+
+benchmarks = [
+    Benchmark('scale.construction', scale_construction),
+    Benchmark('scale.chord', scale_chord),
+    Benchmark('scale.semitones_to_letter_notes', semitones_to_letter_notes),
+    Benchmark('scale.midi_to_letter_notes', midi_to_letter_notes),
+    Benchmark('scale.find_scale', find_scale_notes),
+    Benchmark('octave.getitem', octave_getitem),
+    Benchmark('octave.next', octave_next),
+    Benchmark('octave.gather[64]', octave_gather),
+    Benchmark('octave.iter', octave_iter),
+    Benchmark('engine.next_note', next_note),
+    Benchmark('engine.next_chord', next_chord),
+    Benchmark('markov.next_note', markov_next_note),
+    *(Benchmark(f'engine.get_note_sequence[{d:g}s]', note_sequence(d)) for d in DURATIONS),
+    *(Benchmark(f'engine.get_chord_sequence[{d:g}s]', chord_sequence(d)) for d in DURATIONS),
+    *(Benchmark(f'engine.get_note_sequence[{d:g}s,vectorized]', note_sequence(d, vectorized=True)) for d in DURATIONS),
+    *(Benchmark(f'engine.get_chord_sequence[{d:g}s,vectorized]', chord_sequence(d, vectorized=True)) for d in DURATIONS),
+    # Playback goes through the scheduler and the OS clock: noisier
+    Benchmark('engine.play[notes,text]', engine_play('text'), threshold=0.5),
+    Benchmark('engine.play[chords,text]', engine_play('text', chords=True), threshold=0.5),
+    Benchmark('engine.play[chords,binary]', engine_play('binary', chords=True), threshold=0.5),
+    Benchmark('engine.play[chords,text,compiled]', engine_play('text', chords=True, compiled=True), threshold=0.5),
+]
@@ -0,0 +1,47 @@
+'''
+Runs the benchmark suite.
+
+    python -m benchmarks                                Run and print
+    python -m benchmarks --json out.json                Also export results
+    python -m benchmarks --compare                      Compare with benchmarks/baseline.json,
+                                                        exit status 1 on regression
+    python -m benchmarks --save                         Overwrite benchmarks/baseline.json
+    python -m benchmarks -k get_chord                   Only benchmarks whose name contains get_chord
+'''
+
+
+import os
+import sys
+from argparse import ArgumentParser
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.Benchmark import run, save, load, compare
+from benchmarks.Suite import benchmarks
+
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(prog="benchmarks", description="Theory / engine benchmarks")
+    parser.add_argument('-k', dest='select', help="Run benchmarks whose name contains SELECT")
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--target', type=float, default=0.1, help="Seconds per round")
+    parser.add_argument('--json', help="Export results to JSON")
+    parser.add_argument('--save', nargs='?', const=BASELINE, help="Save results as baseline")
+    parser.add_argument('--compare', nargs='?', const=BASELINE, help="Compare with baseline")
+    parser.add_argument('--threshold', type=float, default=0.25, help="Allowed slowdown ratio (default 0.25)")
+    args = parser.parse_args()
+
+    report = run(benchmarks, select=args.select, rounds=args.rounds, target=args.target)
+    if args.json:
+        save(report, args.json)
+    if args.save:
+        save(report, args.save)
+    if args.compare:
+        print()
+        regressed = compare(report, load(args.compare), benchmarks, threshold=args.threshold)
+        if regressed:
+            print(f"\n{len(regressed)} regression(s):", *regressed, sep="\n    ")
+            sys.exit(1)
@@ -0,0 +1,187 @@
+'''
+Bulk corpus generation on a process pool.
+
+Sequence i of a corpus is generated as by engine.fork(i) (see Engine.fork),
+so the output depends only on the engine, its seed and the parameters:
+not on the number of workers, the shard size or interruptions.
+
+Output directory:
+    manifest.json           engine, seed and parameters of the corpus
+    shard_<j>.jsonl         sequences [j*shard_size, (j+1)*shard_size), one JSON object per line:
+                            {"index": i, "chords": [[[semitone, octave], ...], ...], "notes": [...]}
+Shards are written to a temporary file and renamed when complete; running
+generate again on the same directory skips the complete shards (resume)
+and deletes the temporary files left by an interrupted run.
+Workers unpickle the engine without its Scale's MIDI player: no MidiPlayer
+subprocess is created.
+
+    python -m engine.Bulk <directory> -n 100000 --key C --scale major --seed 1 --duration 4
+'''
+
+
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from math import ceil
+from typing import Callable, Dict
+
+_engine = None      # Engine of the worker process
+
+
+def _init_worker(engine):
+    global _engine
+    _engine = engine
+
+
+def _items(seq):
+    return [[list(_) for _ in item] for item in seq]
+
+
+def _shard(path:str, start:int, stop:int, params:Dict)->int:
+    '''
+    Writes sequences [start, stop) to path. Returns their count.
+    '''
+    tmp = f"{path}.{os.getpid()}.part"
+    e = _engine.fork(start)     # One fork per shard, reset to each sequence's substream
+    with open(tmp, 'w') as f:
+        for i in range(start, stop):
+            e._reset(_engine.rng.substream(i))
+            row = dict(index=i)
+            for kind, kwargs in params.items():
+                get = e.get_chord_sequence if kind == 'chords' else e.get_note_sequence
+                row[kind] = _items(get(midi=True, **kwargs))
+            f.write(json.dumps(row, separators=(',', ':')) + "\n")
+    os.replace(tmp, path)
+    return stop - start
+
+
+def _print_progress(done:int, total:int):
+    print(f"\r{done}/{total} sequences ({100*done/total:.1f}%)", end="" if done < total else "\n", file=sys.stderr, flush=True)
+
+
+def generate(engine, n:int, directory:str, *, chords:Dict=None, notes:Dict=None, shard_size=1000, workers=None, progress:Callable=_print_progress)->int:
+    '''
+    Generates n sequences into sharded files of directory. Returns the number generated
+    by this call (0 when the corpus was already complete).
+
+    @params:
+        engine: Engine - Any picklable engine (e.g. StupidEngine, MarkovEngine)
+        n: int - Number of sequences
+        directory: str - Output directory, created if missing
+        chords: Dict - Optional. get_chord_sequence params of each sequence (midi is always True).
+                JSON-serializable, for the manifest: else ValueError
+        notes: Dict - Optional. get_note_sequence params. Default: chords only, with default params
+        shard_size: int - Sequences per file
+        workers: int - Processes (default: CPU count). 1 runs in this process
+        progress: callable(done, total) - Called after each shard. None: silent
+    '''
+    params = {k: dict(v) for k, v in (('chords', chords), ('notes', notes)) if v is not None}
+    if not params:
+        params = dict(chords={})
+    for kwargs in params.values():
+        kwargs.pop('midi', None)
+
+    manifest = dict(
+        engine=type(engine).__name__,
+        scale=repr(engine.scale),
+        seed=engine.rng.entropy,
+        key=list(engine.rng.key),
+        delay=engine._delay,
+        n=n,
+        shard_size=shard_size,
+        params=params,
+    )
+    try:
+        encoded = json.dumps(manifest, indent=2)
+    except TypeError as e:
+        raise ValueError(f"Bulk params must be JSON-serializable (manifest): {e}")
+
+    os.makedirs(directory, exist_ok=True)
+    manifest_path = os.path.join(directory, 'manifest.json')
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            previous = json.load(f)
+        if previous != json.loads(encoded):
+            raise ValueError(f"{directory} holds a different corpus:\n{previous}")
+        for name in os.listdir(directory):
+            if name.startswith('shard_') and name.endswith('.part'):    # Left by an interrupted run
+                os.remove(os.path.join(directory, name))
+    else:
+        with open(manifest_path, 'w') as f:
+            f.write(encoded)
+
+    shards = []
+    done = 0
+    for j in range(ceil(n/shard_size)):
+        start, stop = j*shard_size, min((j+1)*shard_size, n)
+        path = os.path.join(directory, f"shard_{j:05d}.jsonl")
+        if os.path.exists(path):
+            done += stop - start
+        else:
+            shards.append((path, start, stop))
+    generated = 0
+    if progress and done:
+        progress(done, n)
+
+    if workers == 1:
+        _init_worker(engine)
+        for path, start, stop in shards:
+            count = _shard(path, start, stop, params)
+            done += count
+            generated += count
+            if progress:
+                progress(done, n)
+        return generated
+
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(engine,)) as pool:
+        futures = [pool.submit(_shard, path, start, stop, params) for path, start, stop in shards]
+        for future in as_completed(futures):
+            count = future.result()
+            done += count
+            generated += count
+            if progress:
+                progress(done, n)
+    return generated
+
+
+def read(directory:str):
+    '''
+    Yields the rows of a corpus in index order.
+    '''
+    for name in sorted(os.listdir(directory)):
+        if name.startswith('shard_') and name.endswith('.jsonl'):
+            with open(os.path.join(directory, name)) as f:
+                for line in f:
+                    yield json.loads(line)
+
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from utils.Scale import Scale
+    from engine.Engine import StupidEngine
+
+    parser = ArgumentParser(prog="engine.Bulk", description="Generate a chord / note corpus")
+    parser.add_argument('directory')
+    parser.add_argument('-n', type=int, required=True, help="Number of sequences")
+    parser.add_argument('--key', default='C')
+    parser.add_argument('--scale', default='major')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--duration', type=float, default=4.0, help="Seconds per sequence")
+    parser.add_argument('--notes', action='store_true', help="Also generate note sequences")
+    parser.add_argument('--vectorized', action='store_true')
+    parser.add_argument('--shard-size', type=int, default=1000)
+    parser.add_argument('--workers', type=int)
+    args = parser.parse_args()
+
+    params = dict(duration=args.duration, vectorized=args.vectorized)
+    generate(
+        StupidEngine(Scale(args.key, args.scale), seed=args.seed),
+        args.n,
+        args.directory,
+        chords=params,
+        notes=params if args.notes else None,
+        shard_size=args.shard_size,
+        workers=args.workers,
+    )
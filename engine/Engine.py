@@ -5,11 +5,18 @@ Returns note (sequence) / chord (sequence)
 
 
 from utils.Scale import Scale
-from typing import Iterator, List, Tuple, Text
-from functools import wraps
-from random import choices, choice
-from math import ceil
-from time import sleep
+from utils.NoteSequence import NoteSequence, ChordSequence
+from utils.Scheduler import Scheduler, Timing
+from utils.Plan import Plan
+from utils.Markov import NGram
+from utils import Markov as markov
+from utils.Random import Stream
+from typing import Iterator, List, Tuple
+from collections import deque
+from functools import lru_cache
+from copy import deepcopy
+from itertools import count
+from math import ceil, isinf
 
 
 def seconds_to_bar(sec:float, bpm:int):
@@ -34,34 +41,92 @@ def bar_to_seconds(bar:int, bpm:int):
     return bar/(bpm/60)
 
 
+def arrays_to_blob(pitch, octave)->List[Tuple]:
+    '''
+    Convert (pitch, octave) arrays of StupidEngine.note_arrays / chord_arrays
+    to the midi-number blob format of note_history / chord_history.
+    
+    @params:
+        pitch: array (steps,) or (steps, notes). Rows with pitch 0 are silence.
+        octave: array of the same shape
+    '''
+    res = []
+    for p, o in zip(pitch.tolist(), octave.tolist()):
+        if isinstance(p, int):
+            res.append(((p, o),) if p else ())
+        else:
+            res.append(tuple(zip(p, o)) if p[0] else ())
+    return res
+
+
+def _commands(blob, delay, sustain=True, octave=3)->Iterator:
+    '''
+    Yields (delay, command) Scheduler events of blob. Silence has command None.
+    '''
+    for b in blob:
+        if len(b) == 0:
+            yield delay, None
+        elif not isinstance(b[0], str):
+            yield delay, ("" if sustain else "m") + "".join(Scale.semitones_to_letter_notes(b, octave=octave))
+        else:
+            yield delay, ("" if sustain else "m") + "".join(b)
+
+
+@lru_cache(maxsize=256)
+def _compile(items, delay, sustain, octave)->Plan:
+    return Plan(_commands(items, delay, sustain, octave))
+
+
 class Engine:
+    '''
+    @params:
+        scale: Scale
+        seed: int - Optional. Seed of the engine's random stream (rng, see utils.Random)
+    '''
 
-    def __init__(self, scale:Scale=None):
+    def __init__(self, scale:Scale=None, seed:int=None):
+        self.__scale: Scale
+        if scale:
+            self.__scale = scale
+        self.__chord_history: List = []
+        self.__note_history: List = []
+        self._delay = 0.25
+        self.rng = Stream(seed)
+        self._wrap_sequences()
+    
+    def _wrap_sequences(self):
         class Iterable:
             '''
             Wrapper for get_<X>_sequence methods to add 'generator' property.
             '''
-            def __init__(self, func):
+            def __init__(self, func, stream):
                 self.__f = func
+                self.__stream = stream
             
             def __call__(self, *args, **kwargs)->List:
                 return self.__f(*args, **kwargs)
             
             def generator(self, *args, **kwargs)->Iterator:
                 '''
-                Returns Iterator from get_<X>_sequence method.
+                Returns Iterator producing the items of get_<X>_sequence on demand
+                (see stream_<X>s method).
                 '''
-                return iter(self.__f(*args, **kwargs))
+                return self.__stream(*args, **kwargs)
         
-        self.__scale: Scale
-        if scale:
-            self.__scale = scale
-        self.__chord_history: List = []
-        self.__note_history: List = []
-        self._delay = 0.25
-        
-        self.get_chord_sequence = Iterable(self.get_chord_sequence)
-        self.get_note_sequence = Iterable(self.get_note_sequence)
+        self.get_chord_sequence = Iterable(self.get_chord_sequence, self.stream_chords)
+        self.get_note_sequence = Iterable(self.get_note_sequence, self.stream_notes)
+    
+    def __getstate__(self):
+        '''
+        Picklable state (e.g. for worker processes), without the get_<X>_sequence wrappers.
+        '''
+        state = self.__dict__.copy()
+        del state['get_chord_sequence'], state['get_note_sequence']
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._wrap_sequences()
         
         
     @property
@@ -83,7 +148,7 @@ class Engine:
     @property
     def chord_history(self)->List:
         '''
-        List object.
+        List (or ChordSequence, or a windowed deque while streaming) object.
         next_chord method adds new entry. 
         Each entry a Tuple containing 
         < Tuple(note_number, octave), Tuple(note_number, octave), ... >
@@ -95,14 +160,14 @@ class Engine:
         
     @chord_history.setter
     def chord_history(self, history:List):
-        if not isinstance(history, List):
-            raise TypeError("Expected type 'List'")
+        if not isinstance(history, (List, deque, ChordSequence)):
+            raise TypeError("Expected type 'List', 'deque' or 'ChordSequence'")
         self.__chord_history = history
     
     @property
     def note_history(self)->List:
         '''
-        List object.
+        List (or NoteSequence, or a windowed deque while streaming) object.
         next_note method adds new entry. 
         Each entry a Tuple containing 
         < Tuple(note_number, octave) >
@@ -114,14 +179,57 @@ class Engine:
         
     @note_history.setter
     def note_history(self, history:List):
-        if not isinstance(history, List):
-            raise TypeError("Expected type 'List'")
+        if not isinstance(history, (List, deque, NoteSequence)):
+            raise TypeError("Expected type 'List', 'deque' or 'NoteSequence'")
         self.__note_history = history
     
     def clear_history(self):
         self.chord_history = []
         self.note_history = []
     
+    def seed(self, seed:int=None):
+        '''
+        Restarts rng from seed.
+        '''
+        self.rng = Stream(seed)
+    
+    def fork(self, index:int)->'Engine':
+        '''
+        Engine of the same kind, scale and delay with empty history,
+        drawing from rng.substream(index). Forks of equal index generate
+        equal output, in any process: chunk i of a parallel batch is fork(i).
+        '''
+        e = self.__class__.__new__(self.__class__)
+        e.__setstate__(self.__getstate__())
+        e._reset(self.rng.substream(index))
+        return e
+    
+    def _reset(self, rng:Stream):
+        '''
+        Puts a fork in the state fork() leaves it in, drawing from rng. A fork can be
+        reset to every other index instead of forking again (see engine.Bulk).
+        '''
+        self.clear_history()
+        self.rng = rng
+    
+    def snapshot(self)->dict:
+        '''
+        Copy of the rng state and histories, for restore.
+        '''
+        return dict(
+            rng=self.rng.getstate(),
+            note_history=deepcopy(self.note_history),
+            chord_history=deepcopy(self.chord_history),
+        )
+    
+    def restore(self, snapshot:dict):
+        '''
+        Returns the engine to the state of snapshot. The snapshot stays reusable.
+        '''
+        self.rng.setstate(snapshot['rng'])
+        self.note_history = deepcopy(snapshot['note_history'])
+        self.chord_history = deepcopy(snapshot['chord_history'])
+    
     def next_chord(self, *args, **kwargs)->Tuple:
         '''
         Returns a chord and Inserts it to the chord_history
@@ -148,12 +256,51 @@ class Engine:
         '''
         raise NotImplementedError
         
-    def play(self, blob:List[Tuple], *, verbose=True, sustain=True, octave=3):
+    def stream_chords(self, *args, **kwargs)->Iterator:
+        '''
+        Yields the chords of get_chord_sequence on demand.
+        Default: builds the whole sequence first.
+        '''
+        yield from self.get_chord_sequence(*args, **kwargs)
+    
+    def stream_notes(self, *args, **kwargs)->Iterator:
+        '''
+        Yields the notes of get_note_sequence on demand.
+        Default: builds the whole sequence first.
+        '''
+        yield from self.get_note_sequence(*args, **kwargs)
+    
+    def _render(self, blob, sustain=True, octave=3)->Iterator:
+        '''
+        Yields (delay, command) Scheduler events of blob. Silence has command None.
+        A Plan is already rendered, its events are yielded as-is.
+        '''
+        if isinstance(blob, Plan):
+            return iter(blob)
+        return _commands(blob, self._delay, sustain, octave)
+    
+    def compile(self, blob, *, sustain=True, octave=3)->Plan:
+        '''
+        Renders blob once into a Plan (see utils.Plan) at the current _delay.
+        play(plan) sends its pre-rendered commands without formatting;
+        plans concatenate (+) and repeat (*). Compiling equal material
+        again returns the cached Plan.
+        
+        @params: As play
+        '''
+        if isinstance(blob, Plan):
+            return blob
+        return _compile(tuple(tuple(_) for _ in blob), self._delay, sustain, octave)
+    
+    def play(self, blob:List[Tuple], *, verbose=True, sustain=True, octave=3)->Timing:
         '''
         Invokes MidiPlayer in Scale to play given sequence.
+        Items are sent at absolute deadlines every _delay seconds (see Scheduler).
+        Returns Timing report of the playback.
         
         @params:
-            blob: List[Tuple]. Acceptable forms:
+            blob: List[Tuple], Iterator (e.g. get_<X>_sequence.generator), NoteSequence,
+                  ChordSequence or Plan (see compile; sustain and octave have no effect). Acceptable item forms:
                 [((midi_note_number, octave), (midi_note_number, octave), ...), (), ...]
                 [((midi_note_number, octave),), ((midi_note_number, octave),), (), ...]
                 [(LetterNoteNameOctave, LetterNoteNameOctave, ...), (), ...]
@@ -163,44 +310,77 @@ class Engine:
             octave  (Optional): int - If blob items contain midi-number, Translates them to note in
                     specified octave. If blob items contain LetterNotes, has no effect.
         '''
-        def _check_if_midi_(_):
-            raise Exception(_)
-        midi:bool
-        try:    # Loop through blob to find first non-empty item and check if it's midi. Raise exception to exit loop.
-            [_check_if_midi_(False) if isinstance(_[0], str) else _check_if_midi_(True) for _ in blob if len(_)>0]
-        except Exception as e:
-            midi = e.args[0]
-            
-        for b in blob:
-            if len(b) == 0:
-                if verbose:
-                    print(f"---{self._delay}---")
-                sleep(self._delay)
-                continue
-            if midi:
-                _ = ("" if sustain else "m") + "".join(self.scale.semitones_to_letter_notes(b, octave=octave))
-            else:
-                _ = ("" if sustain else "m") + "".join(b)
+        midi = self.scale.midi
+        def send(_):
             if verbose:
                 print(_)
-            self.scale.midi.play(_)
-            sleep(self._delay)
+            midi.play(_, at=scheduler.deadline, build=scheduler.build)
+        
+        scheduler = Scheduler(
+            send,
+            rest=(lambda: print(f"---{self._delay}---")) if verbose else None,
+            batch=getattr(midi, 'batch', None),
+        )
+        return scheduler.run(self._render(blob, sustain, octave))
     
-    def rhythm(self, rhy):
+    async def aplay(self, blob:List[Tuple], *, verbose=True, sustain=True, octave=3)->Timing:
+        '''
+        Async form of play. Many engines can play concurrently on one event loop;
+        cancelling the task stops playback. Params as play.
+        '''
+        midi = self.scale.midi
+        async def send(_):
+            if verbose:
+                print(_)
+            await midi.aplay(_, at=scheduler.deadline, build=scheduler.build)
+        
+        scheduler = Scheduler(
+            send,
+            rest=(lambda: print(f"---{self._delay}---")) if verbose else None,
+            batch=getattr(midi, 'batch', None),
+        )
+        return await scheduler.arun(self._render(blob, sustain, octave))
+    
+    def rhythm(self, rhy)->Timing:
+        '''
+        Plays 4 bars of rhy on the scale's midi. Onsets take no time,
+        each rest lasts rhy.min_interval. Returns Timing report.
+        '''
+        def events():
+            for __ in range(4):
+                _ = True
+                for r in rhy:
+                    if r:
+                        yield 0, "mG4" if _ else "mC#5"
+                        _ = False
+                    else:
+                        yield rhy.min_interval, None
+                yield 0, "\n"
+        
+        def send(_):
+            if _ == "\n":
+                print()
+            else:
+                print("O", end="")
+                self.scale.midi.play(_, at=scheduler.deadline)
+        
         _instrument = self.scale.midi.instrument
         self.scale.midi.instrument = 115
-        for __ in range(4):
-            _ = True
-            for r in rhy:
-                if r:
-                    print("O", end="")
-                    self.scale.midi.play("mG4" if _ else "mC#5")
-                    _ = False
-                else:
-                    print("-", end="")
-                    sleep(rhy.min_interval)
-            print()
+        scheduler = Scheduler(
+            send,
+            rest=lambda: print("-", end=""),
+            batch=getattr(self.scale.midi, 'batch', None),
+        )
+        timing = scheduler.run(events())
         self.scale.midi.instrument = _instrument
+        return timing
+    
+    @property
+    def latency(self):
+        '''
+        Property: LatencyMonitor of the scale's player (see utils.Latency), None without one.
+        '''
+        return getattr(self.scale.midi, 'latency', None)
     
     def __repr__(self):
         return self.__class__.__name__
@@ -219,12 +399,12 @@ class StupidEngine(Engine):
             inversion: int - To be Implemented
             low_notes: bool - True: Adds 1st and 5th Note from 1 octave lower in a chord
         '''
-        if len(self.chord_history)>128:
+        if isinstance(self.chord_history, list) and len(self.chord_history)>128:     # Streaming windows are bounded by their maxlen
             self.chord_history.clear()
         oct = [0, 1, 2]
         choi = [0,1,2,3,4,5,6,7]
         wts = [silence_ratio]+[(1-silence_ratio)/7]*7
-        self.chord_history.append((lambda x: self.scale.chord(choice(oct)+x, inversion=inversion, low_notes=low_notes) if x>0 else () )(choices(choi, wts)[0]))
+        self.chord_history.append((lambda x: self.scale.chord(self.rng.choice(oct)+x, inversion=inversion, low_notes=low_notes) if x>0 else () )(self.rng.choices(choi, wts)[0]))
         return self.chord_history[-1]
     
     def next_note(self, silence_ratio=0.25):
@@ -234,15 +414,72 @@ class StupidEngine(Engine):
         @params:
             silence_ratio: float - Ratio of Silence:Notes. Ex.: 1:4
         '''
-        if len(self.note_history)>128:
+        if isinstance(self.note_history, list) and len(self.note_history)>128:     # Streaming windows are bounded by their maxlen
             self.note_history.clear()
         oct = [0, 1, 2]
         choi = [0,1,2,3,4,5,6,7]
         wts = [silence_ratio]+[(1-silence_ratio)/7]*7
-        self.note_history.append((lambda x: self.scale.intervals[choice(oct)+x,] if x>0 else () )(choices(choi, wts)[0]))
+        self.note_history.append((lambda x: self.scale.intervals[self.rng.choice(oct)+x,] if x>0 else () )(self.rng.choices(choi, wts)[0]))
         return self.note_history[-1]
     
-    def get_chord_sequence(self, *, duration=4.0, low_notes=True, octave=3, silence_ratio=0.25, midi=False, **kwargs):
+    def _pool(self, steps, silence_ratio):
+        '''
+        Vectorized form of the pooling in next_chord / next_note.
+        Draws the silence, degree and offset decisions of all steps in one call.
+        Returns numpy array of pool indices: 0 for silence, 1-9 otherwise.
+        '''
+        import numpy as np
+        silent, degree, offset = self.rng.numpy().random((3, steps))
+        return np.where(
+            silent < silence_ratio,
+            0,
+            1 + (degree*7).astype(np.intp) + (offset*3).astype(np.intp),
+        )
+    
+    def _note_pool(self)->List[Tuple]:
+        return [()] + [self.scale.intervals[_,] for _ in range(1, 10)]
+    
+    def _chord_pool(self, inversion=0, low_notes=True)->List[Tuple]:
+        return [()] + [self.scale.chord(_, inversion=inversion, low_notes=low_notes) for _ in range(1, 10)]
+    
+    def note_arrays(self, *, duration=4.0, silence_ratio=0.25):
+        '''
+        Vectorized note sequence. Does not touch note_history.
+        Returns Tuple(pitch, octave) of numpy int8 arrays with one entry per step.
+        Pitch 0 marks silence. See arrays_to_blob for the List form.
+        
+        @params: Optional
+            duration: float - Total playtime of sequence, in seconds
+            silence_ratio: float - Ratio of Silence:Notes. Ex.: 1:4
+        '''
+        import numpy as np
+        pitch, octave = self.scale.intervals.gather(slice(1, 10))
+        pitch = np.concatenate(([0], pitch)).astype(np.int8)
+        octave = np.concatenate(([0], octave)).astype(np.int8)
+        idx = self._pool(ceil(duration/self._delay), silence_ratio)
+        return pitch[idx], octave[idx]
+    
+    def chord_arrays(self, *, duration=4.0, silence_ratio=0.25, inversion=0, low_notes=True):
+        '''
+        Vectorized chord sequence. Does not touch chord_history.
+        Returns Tuple(pitch, octave) of numpy int8 arrays of shape (steps, notes in chord).
+        Rows of pitch 0 mark silence. See arrays_to_blob for the List form.
+        
+        @params: Optional
+            duration: float - Total playtime of sequence, in seconds
+            silence_ratio: float - Ratio of Silence:Notes. Ex.: 1:4
+            inversion: int - Inversion of every chord
+            low_notes: bool - True: Adds 1st and 5th Note from 1 octave lower in a chord
+        '''
+        import numpy as np
+        pool = self._chord_pool(inversion, low_notes)
+        width = len(pool[1])
+        pitch = np.array([[n for n, o in _] if _ else [0]*width for _ in pool], dtype=np.int8)
+        octave = np.array([[o for n, o in _] if _ else [0]*width for _ in pool], dtype=np.int8)
+        idx = self._pool(ceil(duration/self._delay), silence_ratio)
+        return pitch[idx], octave[idx]
+    
+    def get_chord_sequence(self, *, duration=4.0, low_notes=True, octave=3, silence_ratio=0.25, midi=False, vectorized=False, compact=False, modulation=None, voice_leading=False, **kwargs):
         '''
         Empties chord_history. Repeatedly calls next_chord to generate a sequence.
         Returns a sequence of chords and Inserts it to the chord_history
@@ -254,12 +491,42 @@ class StupidEngine(Engine):
             midi: bool - True: Returns chord containing LetterNotes
                          False: Returns chord containing midi-number-notes
             octave: int - If midi is False, Translates them to note in specified octave
+            vectorized: bool - True: Draws the whole sequence at once with NumPy
+            compact: bool - True: chord_history is a ChordSequence, which is returned
+                            as-is (midi and octave have no effect)
+            modulation: engine.Modulation.Modulation - Per-chord values of next_chord
+                        params, overriding the ones above
+            voice_leading: bool - True: Inversion and octave of every chord chosen by
+                           Scale.voice_lead (inversion is ignored). The generator form leads
+                           online with a lookahead (see stream_chords), so its chords differ
         '''
+        if vectorized and modulation is not None:
+            raise ValueError("modulation needs vectorized=False")
+        if voice_leading and modulation is not None:
+            raise ValueError("modulation needs voice_leading=False")
         self.chord_history = []
         _len = ceil(duration/self._delay)
-        for _ in range(_len):
-            self.next_chord(silence_ratio=silence_ratio, low_notes=low_notes, **kwargs)
-            
+        if vectorized and compact and not voice_leading:
+            self.chord_history = ChordSequence.from_arrays(
+                *self.chord_arrays(duration=duration, silence_ratio=silence_ratio, inversion=kwargs.get('inversion', 0), low_notes=low_notes),
+                delay=self._delay,
+            )
+            return self.chord_history
+        if voice_leading:
+            self.chord_history = self.scale.voice_lead(self._pool(_len, silence_ratio).tolist(), low_notes=low_notes)
+        elif vectorized:
+            pool = self._chord_pool(kwargs.get('inversion', 0), low_notes)
+            self.chord_history = [pool[_] for _ in self._pool(_len, silence_ratio).tolist()]
+        else:
+            self.chord_history = deque()    # Built whole: next_chord caps List histories only
+            params = dict(silence_ratio=silence_ratio, low_notes=low_notes, **kwargs)
+            for _ in range(_len):
+                self.next_chord(**(params if modulation is None else {**params, **next(modulation)}))
+            self.chord_history = list(self.chord_history)
+        
+        if compact:
+            self.chord_history = ChordSequence.from_list(self.chord_history, delay=self._delay)
+            return self.chord_history
         if not midi:
             return [
                 self.scale.semitones_to_letter_notes(_, octave=octave)
@@ -267,7 +534,7 @@ class StupidEngine(Engine):
             ]
         return self.chord_history
         
-    def get_note_sequence(self, *, duration=4.0, octave=3, silence_ratio=0.25, midi=False):
+    def get_note_sequence(self, *, duration=4.0, octave=3, silence_ratio=0.25, midi=False, vectorized=False, compact=False, modulation=None):
         '''
         Empties note_history. Repeatedly calls next_note to generate a sequence.
         Returns a sequence of notes and Inserts it to the note_history
@@ -278,15 +545,238 @@ class StupidEngine(Engine):
             midi: bool - True: Returns sequence containing LetterNotes
                          False: Returns sequence containing midi-number-notes
             octave: int - If midi is False, Translates them to note in specified octave
+            vectorized: bool - True: Draws the whole sequence at once with NumPy
+            compact: bool - True: note_history is a NoteSequence, which is returned
+                            as-is (midi and octave have no effect)
+            modulation: engine.Modulation.Modulation - Per-note silence_ratio
         '''
+        if vectorized and modulation is not None:
+            raise ValueError("modulation needs vectorized=False")
         self.note_history = []
         _len = ceil(duration/self._delay)
-        for _ in range(_len):
-            self.next_note(silence_ratio=silence_ratio)
-            
+        if vectorized and compact:
+            self.note_history = NoteSequence.from_arrays(
+                *self.note_arrays(duration=duration, silence_ratio=silence_ratio),
+                delay=self._delay,
+            )
+            return self.note_history
+        if vectorized:
+            pool = self._note_pool()
+            self.note_history = [pool[_] for _ in self._pool(_len, silence_ratio).tolist()]
+        else:
+            self.note_history = deque()     # Built whole: next_note caps List histories only
+            for _ in range(_len):
+                self.next_note(silence_ratio=silence_ratio if modulation is None else next(modulation).get('silence_ratio', silence_ratio))
+            self.note_history = list(self.note_history)
+        
+        if compact:
+            self.note_history = NoteSequence.from_list(self.note_history, delay=self._delay)
+            return self.note_history
         if not midi:
             return [
                 self.scale.semitones_to_letter_notes(_, octave=octave)
                 for _ in self.note_history
             ]
         return self.note_history
+    
+    def _degree(self, silence_ratio=0.25)->int:
+        '''
+        Degree draw of next_chord: 0 for silence, 1-7 otherwise.
+        '''
+        return self.rng.choices(range(8), [silence_ratio]+[(1-silence_ratio)/7]*7)[0]
+    
+    def stream_chords(self, *, duration=4.0, low_notes=True, octave=3, silence_ratio=0.25, midi=False, window=128, modulation=None, voice_leading=False, lookahead=4, **kwargs)->Iterator:
+        '''
+        Generator form of get_chord_sequence. Calls next_chord only when the next chord is requested.
+        chord_history keeps the last <window> chords only.
+        
+        @params: Optional
+            duration: float - Total playtime of sequence, in seconds. None or inf: endless
+            window: int - Length of chord_history while streaming
+            voice_leading: bool - True: Inversion and octave of every chord chosen online by
+                           utils.VoiceLeading.lead_stream, degrees drawn as next_chord
+            lookahead: int - Degrees drawn ahead for each voice-led chord (1: greedy)
+            Other params as get_chord_sequence
+        '''
+        if voice_leading and modulation is not None:
+            raise ValueError("modulation needs voice_leading=False")
+        self.chord_history = deque(maxlen=window)
+        steps = count() if duration is None or isinf(duration) else range(ceil(duration/self._delay))
+        if voice_leading:
+            from utils.VoiceLeading import lead_stream
+            chords = lead_stream(self.scale, (self._degree(silence_ratio) for _ in steps), window=lookahead, low_notes=low_notes)
+            for chord in chords:
+                self.chord_history.append(chord)
+                yield chord if midi else self.scale.semitones_to_letter_notes(chord, octave=octave)
+            return
+        params = dict(silence_ratio=silence_ratio, low_notes=low_notes, **kwargs)
+        for _ in steps:
+            chord = self.next_chord(**(params if modulation is None else {**params, **next(modulation)}))
+            yield chord if midi else self.scale.semitones_to_letter_notes(chord, octave=octave)
+    
+    def stream_notes(self, *, duration=4.0, octave=3, silence_ratio=0.25, midi=False, window=128, modulation=None)->Iterator:
+        '''
+        Generator form of get_note_sequence. Calls next_note only when the next note is requested.
+        note_history keeps the last <window> notes only.
+        
+        @params: Optional
+            duration: float - Total playtime of sequence, in seconds. None or inf: endless
+            window: int - Length of note_history while streaming
+            Other params as get_note_sequence
+        '''
+        self.note_history = deque(maxlen=window)
+        for _ in (count() if duration is None or isinf(duration) else range(ceil(duration/self._delay))):
+            note = self.next_note(silence_ratio=silence_ratio if modulation is None else next(modulation).get('silence_ratio', silence_ratio))
+            yield note if midi else self.scale.semitones_to_letter_notes(note, octave=octave)
+
+
+class MarkovEngine(Engine):
+    '''
+    Generates notes / chords from n-gram models of scale degrees (see utils.Markov).
+    Degrees are relative to the scale (1: tonic, 8: tonic an octave up, 0: silence;
+    chords as Scale.chord), so a model learned in one scale plays in any other.
+    
+    @params:
+        scale: Scale
+        order: int - Length of the context the next degree depends on
+        seed: int - Optional. See Engine
+    '''
+    def __init__(self, scale:Scale=None, order=2, seed:int=None):
+        super().__init__(scale, seed)
+        self.order = order
+        self.models = dict(notes=NGram(order), chords=NGram(order))
+        self._context = dict(notes=deque(maxlen=order), chords=deque(maxlen=order))
+    
+    def degrees(self, items, kind='notes')->List[int]:
+        '''
+        Degrees of note / chord history items in the current scale (0 for silence).
+        Items of other scales or voicings outside the chord table raise ValueError.
+        '''
+        if kind == 'notes':
+            table = {self.scale.intervals[d-1,]: d for d in Scale.voiced_degrees}
+        else:
+            table = {v: num for (num, inv, low), v in self.scale._chords.items()}
+        try:
+            return [table[tuple(_)] if len(_) else 0 for _ in items]
+        except KeyError as e:
+            raise ValueError(f"{e.args[0]} is not a {kind[:-1]} of {self.scale}")
+    
+    def fit(self, sequences, kind='notes'):
+        '''
+        Learns transitions from an imported corpus: Iterable of degree sequences. Returns self.
+        '''
+        self.models[kind].fit(sequences)
+        return self
+    
+    def learn_history(self):
+        '''
+        Learns transitions from the current note_history and chord_history. Returns self.
+        '''
+        if len(self.note_history):
+            self.fit((self.degrees(self.note_history, 'notes'),), 'notes')
+        if len(self.chord_history):
+            self.fit((self.degrees(self.chord_history, 'chords'),), 'chords')
+        return self
+    
+    def save(self, file):
+        '''
+        Writes the models to a compact binary file (path or binary file object).
+        '''
+        markov.save(self.models, file, self.order)
+    
+    def load(self, file):
+        '''
+        Replaces the models with those of a file of save. Returns self.
+        '''
+        self.order, models = markov.load(file)
+        self.models.update(models)
+        self._context = {k: deque(maxlen=self.order) for k in self.models}
+        return self
+    
+    def _reset(self, rng:Stream):
+        '''
+        See Engine._reset. A fork shares the models, with its own context.
+        '''
+        super()._reset(rng)
+        self._context = {k: deque(maxlen=self.order) for k in self.models}
+    
+    def snapshot(self)->dict:
+        return dict(super().snapshot(), context=deepcopy(self._context))
+    
+    def restore(self, snapshot:dict):
+        super().restore(snapshot)
+        self._context = deepcopy(snapshot['context'])
+    
+    def _next(self, kind)->int:
+        context = self._context[kind]
+        degree = self.models[kind].sample(context, self.rng.random)
+        context.append(degree)
+        return degree
+    
+    def next_chord(self, inversion=0, low_notes=True, **kwargs):
+        '''
+        Returns the next chord of the chord model and Inserts it to the chord_history
+        
+        @params:
+            inversion: int - Inversion of the chord
+            low_notes: bool - True: Adds 1st and 5th Note from 1 octave lower in a chord
+        '''
+        degree = self._next('chords')
+        self.chord_history.append(self.scale.chord(degree, inversion=inversion, low_notes=low_notes) if degree else ())
+        return self.chord_history[-1]
+    
+    def next_note(self, **kwargs):
+        '''
+        Returns the next note of the note model and Inserts it to the note_history
+        '''
+        degree = self._next('notes')
+        self.note_history.append(self.scale.intervals[degree-1,] if degree else ())
+        return self.note_history[-1]
+    
+    def get_chord_sequence(self, *, duration=4.0, low_notes=True, octave=3, midi=False, **kwargs):
+        '''
+        Empties chord_history and the chord context. Repeatedly calls next_chord to generate a sequence.
+        Params as StupidEngine.get_chord_sequence; silence comes from the model.
+        '''
+        self.chord_history = []
+        self._context['chords'].clear()
+        for _ in range(ceil(duration/self._delay)):
+            self.next_chord(low_notes=low_notes, inversion=kwargs.get('inversion', 0))
+        if not midi:
+            return [self.scale.semitones_to_letter_notes(_, octave=octave) for _ in self.chord_history]
+        return self.chord_history
+    
+    def get_note_sequence(self, *, duration=4.0, octave=3, midi=False, **kwargs):
+        '''
+        Empties note_history and the note context. Repeatedly calls next_note to generate a sequence.
+        Params as StupidEngine.get_note_sequence; silence comes from the model.
+        '''
+        self.note_history = []
+        self._context['notes'].clear()
+        for _ in range(ceil(duration/self._delay)):
+            self.next_note()
+        if not midi:
+            return [self.scale.semitones_to_letter_notes(_, octave=octave) for _ in self.note_history]
+        return self.note_history
+    
+    def stream_chords(self, *, duration=4.0, low_notes=True, octave=3, midi=False, window=128, **kwargs)->Iterator:
+        '''
+        Generator form of get_chord_sequence. chord_history keeps the last <window> chords only.
+        duration None or inf: endless.
+        '''
+        self.chord_history = deque(maxlen=window)
+        self._context['chords'].clear()
+        for _ in (count() if duration is None or isinf(duration) else range(ceil(duration/self._delay))):
+            chord = self.next_chord(low_notes=low_notes, inversion=kwargs.get('inversion', 0))
+            yield chord if midi else self.scale.semitones_to_letter_notes(chord, octave=octave)
+    
+    def stream_notes(self, *, duration=4.0, octave=3, midi=False, window=128, **kwargs)->Iterator:
+        '''
+        Generator form of get_note_sequence. note_history keeps the last <window> notes only.
+        duration None or inf: endless.
+        '''
+        self.note_history = deque(maxlen=window)
+        self._context['notes'].clear()
+        for _ in (count() if duration is None or isinf(duration) else range(ceil(duration/self._delay))):
+            note = self.next_note()
+            yield note if midi else self.scale.semitones_to_letter_notes(note, octave=octave)
@@ -0,0 +1,251 @@
+'''
+Parameter modulation for engines.
+
+Modulators produce one value per tick (one generated item). A Modulation
+evaluates its modulators with NumPy in blocks of ticks and hands out the
+values of each tick as a ready-made kwargs dict, so a read costs a list
+index:
+
+    mod = Modulation(
+        silence_ratio=RandomWalk(0.25, step=0.05, low=0.0, high=0.6),
+        inversion=Steps((0, 1, 2, 1), hold=8),
+        low_notes=Choice((True, False)),
+        rng=engine.rng,
+    )
+    engine.next_chord(**next(mod))
+    engine.get_chord_sequence(duration=16, modulation=mod)
+
+A Modulation draws from the numpy Generator of its rng Stream, so restoring
+the engine's rng restores its draws. Its own position (evaluated block, tick,
+modulator states) is not part of Engine.snapshot: take both.
+
+    snap = engine.snapshot(), mod.snapshot()
+    ...
+    engine.restore(snap[0]); mod.restore(snap[1])
+
+A fork draws from a new Stream: give it its own Modulation(rng=fork.rng).
+Modulations are not JSON params of engine.Bulk.
+'''
+
+
+import numpy as np
+from copy import deepcopy
+from typing import Callable, Dict, Iterator, Sequence, Tuple
+
+
+class Modulator:
+    '''
+    Values of ticks [start, start+n) as a NumPy array, see block.
+    '''
+
+    def block(self, start:int, n:int, rng:np.random.Generator)->np.ndarray:
+        raise NotImplementedError
+
+    def map(self, func:Callable)->'Modulator':
+        '''
+        Modulator applying func to each block, e.g. lfo.map(np.rint).
+        '''
+        return Map(self, func)
+
+
+class Map(Modulator):
+    def __init__(self, source:Modulator, func:Callable):
+        self.source = source
+        self.func = func
+
+    def block(self, start, n, rng):
+        return np.asarray(self.func(self.source.block(start, n, rng)))
+
+
+class Constant(Modulator):
+    def __init__(self, value):
+        self.value = value
+
+    def block(self, start, n, rng):
+        return np.full(n, self.value)
+
+
+class Uniform(Modulator):
+    '''
+    Independent uniform draw in [low, high) per tick.
+    '''
+
+    def __init__(self, low=0.0, high=1.0):
+        self.low = low
+        self.high = high
+
+    def block(self, start, n, rng):
+        return rng.uniform(self.low, self.high, n)
+
+
+class Choice(Modulator):
+    '''
+    Independent draw of values per tick (weights: Optional relative probabilities).
+    '''
+
+    def __init__(self, values:Sequence, weights:Sequence[float]=None):
+        self.values = np.asarray(values)
+        self.p = None if weights is None else np.asarray(weights, dtype=float)/sum(weights)
+
+    def block(self, start, n, rng):
+        return self.values[rng.choice(len(self.values), n, p=self.p)]
+
+
+class RandomWalk(Modulator):
+    '''
+    Gaussian random walk reflected at low / high.
+
+    @params:
+        start: float - Value before the first tick
+        step: float - Standard deviation of one tick's step
+    '''
+
+    def __init__(self, start=0.5, step=0.05, low=0.0, high=1.0):
+        self.step = step
+        self.low = low
+        self.high = high
+        self._free = start - low    # Unreflected walk, relative to low
+
+    def block(self, start, n, rng):
+        free = self._free + np.cumsum(rng.normal(0.0, self.step, n))
+        self._free = free[-1] if n else self._free
+        span = self.high - self.low
+        if span <= 0:
+            return np.full(n, self.low)
+        folded = np.mod(free, 2*span)   # Reflecting walk = free walk folded into [0, span]
+        return self.low + np.where(folded > span, 2*span - folded, folded)
+
+
+class LFO(Modulator):
+    '''
+    Periodic modulator between low and high.
+
+    @params:
+        period: float - Ticks per cycle
+        shape: str - 'sine', 'triangle', 'saw' or 'square'
+        phase: float - Offset, in cycles
+    '''
+    shapes = ('sine', 'triangle', 'saw', 'square')
+
+    def __init__(self, period=16, low=0.0, high=1.0, shape='sine', phase=0.0):
+        if shape not in self.shapes:
+            raise ValueError(f"Invalid shape '{shape}'.\nValid shapes:\n{self.shapes}")
+        self.period = period
+        self.low = low
+        self.high = high
+        self.shape = shape
+        self.phase = phase
+
+    def block(self, start, n, rng):
+        cycle = np.mod((start + np.arange(n))/self.period + self.phase, 1.0)
+        if self.shape == 'sine':
+            wave = 0.5 - 0.5*np.cos(2*np.pi*cycle)
+        elif self.shape == 'triangle':
+            wave = 1 - np.abs(2*cycle - 1)
+        elif self.shape == 'saw':
+            wave = cycle
+        else:
+            wave = (cycle < 0.5).astype(float)
+        return self.low + (self.high - self.low)*wave
+
+
+class Envelope(Modulator):
+    '''
+    Piecewise-linear envelope through (tick, value) points, holding the last value
+    (or starting over with loop).
+    '''
+
+    def __init__(self, points:Sequence[Tuple[float, float]], loop=False):
+        self.ticks = np.array([t for t, v in points], dtype=float)
+        self.values = np.array([v for t, v in points], dtype=float)
+        self.loop = loop
+
+    def block(self, start, n, rng):
+        t = start + np.arange(n, dtype=float)
+        if self.loop and self.ticks[-1] > 0:
+            t = np.mod(t, self.ticks[-1])
+        return np.interp(t, self.ticks, self.values)
+
+
+class Steps(Modulator):
+    '''
+    Step sequence: each value held for hold ticks, repeating.
+    '''
+
+    def __init__(self, values:Sequence, hold=1):
+        self.values = np.asarray(values)
+        self.hold = hold
+
+    def block(self, start, n, rng):
+        return self.values[((start + np.arange(n))//self.hold) % len(self.values)]
+
+
+class Modulation:
+    '''
+    Block-evaluated set of named modulators. Iterating yields one kwargs dict per tick.
+
+    @params:
+        block: int - Ticks evaluated at once
+        rng: utils.Random.Stream or numpy.random.Generator - Optional
+        **modulators: name=Modulator, or a plain value for a constant
+    '''
+
+    def __init__(self, block=64, rng=None, **modulators):
+        self.block = block
+        self.rng = np.random.default_rng() if rng is None else rng
+        self.modulators = {
+            k: m if isinstance(m, Modulator) else Constant(m)
+            for k, m in modulators.items()
+        }
+        self.tick = 0           # Ticks handed out
+        self._evaluated = 0     # Ticks evaluated
+        self._rows = []
+        self._i = 0
+
+    def _generator(self)->np.random.Generator:
+        return self.rng.numpy() if hasattr(self.rng, 'numpy') else self.rng
+
+    def _fill(self):
+        names = tuple(self.modulators)
+        rng = self._generator()
+        columns = [m.block(self._evaluated, self.block, rng).tolist() for m in self.modulators.values()]
+        self._rows = [dict(zip(names, values)) for values in zip(*columns)] if names else [{}]*self.block
+        self._evaluated += self.block
+        self._i = 0
+
+    def __next__(self)->Dict:
+        if self._i == len(self._rows):
+            self._fill()
+        row = self._rows[self._i]
+        self._i += 1
+        self.tick += 1
+        return row
+
+    def __iter__(self)->Iterator[Dict]:
+        return self
+
+    def snapshot(self)->dict:
+        '''
+        Copy of the position, evaluated block and modulator states, for restore.
+        The rng is not included: it is restored with the engine (Engine.snapshot).
+        '''
+        return dict(
+            tick=self.tick,
+            evaluated=self._evaluated,
+            rows=list(self._rows),
+            i=self._i,
+            modulators=deepcopy(self.modulators),
+        )
+
+    def restore(self, snapshot:dict):
+        '''
+        Returns the modulation to the state of snapshot. The snapshot stays reusable.
+        '''
+        self.tick = snapshot['tick']
+        self._evaluated = snapshot['evaluated']
+        self._rows = list(snapshot['rows'])
+        self._i = snapshot['i']
+        self.modulators = deepcopy(snapshot['modulators'])
+
+    def __repr__(self):
+        return f"<Modulation tick {self.tick}: {', '.join(f'{k}={type(m).__name__}' for k, m in self.modulators.items())}>"
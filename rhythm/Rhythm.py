@@ -0,0 +1,198 @@
+'''
+Rhythm patterns on a tick grid.
+
+A pattern is stored as a bit mask, bit i set for an onset at tick i, with
+its length in ticks. Patterns combine without going through strings:
+    a & b, a | b, a ^ b, ~a     boolean combination (lengths tiled to their lcm,
+                                an empty pattern counts as rests)
+    a + b                       concatenation
+    a * n, a.tile(n)            repetition
+    a.rotate(k)                 onsets moved k ticks later (wrapping)
+Strings use 'O' for an onset and '-' for a rest, e.g. "---O---O-O-O".
+'''
+
+
+from math import lcm
+from typing import Tuple
+
+
+ONSET = 'O'
+REST = '-'
+_onset_chars = frozenset('OoXx1')
+
+
+class Rhythm:
+    '''
+    @params:
+        pattern: str or Rhythm - Optional. Onsets 'O' / rests '-'
+        bpm: int - Tempo
+        min_interval: float - Seconds per tick (rest length in Engine.rhythm)
+    '''
+
+    def __init__(self, pattern="", bpm=120, min_interval=1/16):
+        self.bpm = bpm
+        self.min_interval = min_interval
+        if isinstance(pattern, Rhythm):
+            self._set(pattern.mask, len(pattern))
+        else:
+            self.rhythm = pattern
+
+    def _set(self, mask:int, length:int):
+        self.mask = mask & ((1 << length) - 1)
+        self._length = length
+        self._ticks = tuple(bool(self.mask >> i & 1) for i in range(length))
+        self.onsets = tuple(i for i, t in enumerate(self._ticks) if t)
+        self._onset_array = None
+
+    @classmethod
+    def from_mask(cls, mask:int, length:int, bpm=120, min_interval=1/16)->'Rhythm':
+        r = cls(bpm=bpm, min_interval=min_interval)
+        r._set(mask, length)
+        return r
+
+    @classmethod
+    def from_array(cls, ticks, bpm=120, min_interval=1/16)->'Rhythm':
+        '''
+        Rhythm of a boolean sequence / NumPy row (True: onset).
+        '''
+        ticks = list(ticks)
+        return cls.from_mask(sum(1 << i for i, t in enumerate(ticks) if t), len(ticks), bpm, min_interval)
+
+    def _new(self, mask, length)->'Rhythm':
+        return Rhythm.from_mask(mask, length, self.bpm, self.min_interval)
+
+    @property
+    def rhythm(self)->str:
+        '''
+        Property: Pattern string, 'O' onset / '-' rest.
+        '''
+        return "".join(ONSET if t else REST for t in self._ticks)
+
+    @rhythm.setter
+    def rhythm(self, pattern:str):
+        self._set(sum(1 << i for i, c in enumerate(pattern) if c in _onset_chars), len(pattern))
+
+    def onset_array(self):
+        '''
+        NumPy array of onset ticks, built once per pattern (read-only).
+        '''
+        if self._onset_array is None:
+            import numpy as np
+            self._onset_array = np.array(self.onsets, dtype=np.intp)
+            self._onset_array.flags.writeable = False
+        return self._onset_array
+
+    @property
+    def duration(self)->float:
+        '''
+        Property: Seconds of one pass (ticks x min_interval).
+        '''
+        return self._length*self.min_interval
+
+    @property
+    def density(self)->float:
+        return len(self.onsets)/self._length if self._length else 0.0
+
+    def __iter__(self):
+        return iter(self._ticks)
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return Rhythm.from_array(self._ticks[index], self.bpm, self.min_interval)
+        return self._ticks[index]
+
+    def tile(self, n:int)->'Rhythm':
+        mask, length = 0, self._length
+        for i in range(n):
+            mask |= self.mask << (i*length)
+        return self._new(mask, length*n)
+
+    def __mul__(self, n:int)->'Rhythm':
+        return self.tile(n)
+
+    __rmul__ = __mul__
+
+    def rotate(self, k:int)->'Rhythm':
+        '''
+        Onsets moved k ticks later, wrapping around (negative k: earlier).
+        '''
+        n = self._length
+        if not n:
+            return self._new(0, 0)
+        k %= n
+        full = (1 << n) - 1
+        return self._new(((self.mask << k) | (self.mask >> (n - k))) & full, n)
+
+    def __add__(self, other:'Rhythm')->'Rhythm':
+        return self._new(self.mask | (other.mask << self._length), self._length + len(other))
+
+    def _aligned(self, other:'Rhythm')->Tuple[int, int, int]:
+        if not self._length or not len(other):      # Empty: rests over the other's length
+            return self.mask, other.mask, self._length or len(other)
+        n = lcm(self._length, len(other))
+        return self.tile(n//self._length).mask, other.tile(n//len(other)).mask, n
+
+    def __and__(self, other:'Rhythm')->'Rhythm':
+        a, b, n = self._aligned(other)
+        return self._new(a & b, n)
+
+    def __or__(self, other:'Rhythm')->'Rhythm':
+        a, b, n = self._aligned(other)
+        return self._new(a | b, n)
+
+    def __xor__(self, other:'Rhythm')->'Rhythm':
+        a, b, n = self._aligned(other)
+        return self._new(a ^ b, n)
+
+    def __invert__(self)->'Rhythm':
+        return self._new(~self.mask, self._length)
+
+    def __eq__(self, other):
+        return isinstance(other, Rhythm) and (self.mask, self._length) == (other.mask, len(other))
+
+    def __hash__(self):
+        return hash((self.mask, self._length))
+
+    def __repr__(self):
+        return f"Rhythm({self.rhythm!r}, bpm={self.bpm}, min_interval={self.min_interval})"
+
+    def __str__(self):
+        return self.rhythm
+
+    @staticmethod
+    def random_array(count:int, *, groups=16, group=3, rest=0.5, rng=None):
+        '''
+        count random patterns as a NumPy bool array of shape (count, groups*group).
+        Each group of ticks is silent with probability rest, otherwise has one onset
+        on a uniformly drawn tick of the group (the pattern of __main__.rand_rhythm).
+
+        @params:
+            rng: utils.Random.Stream or numpy.random.Generator - Optional
+        '''
+        import numpy as np
+        if rng is None:
+            rng = np.random.default_rng()
+        elif hasattr(rng, 'numpy'):
+            rng = rng.numpy()
+        silent = rng.random((count, groups)) < rest
+        tick = rng.integers(0, group, (count, groups))
+        out = np.zeros((count, groups, group), dtype=bool)
+        c, g = np.nonzero(~silent)
+        out[c, g, tick[c, g]] = True
+        return out.reshape(count, groups*group)
+
+    @classmethod
+    def random(cls, count:int=None, *, groups=16, group=3, rest=0.5, rng=None, bpm=120, min_interval=1/16):
+        '''
+        Random Rhythm (count None) or List of count Rhythms, drawn in one vectorized batch.
+        See random_array.
+        '''
+        import numpy as np
+        ticks = cls.random_array(1 if count is None else count, groups=groups, group=group, rest=rest, rng=rng)
+        packed = np.packbits(ticks, axis=1, bitorder='little')
+        length = ticks.shape[1]
+        res = [cls.from_mask(int.from_bytes(row.tobytes(), 'little'), length, bpm, min_interval) for row in packed]
+        return res[0] if count is None else res
@@ -0,0 +1,68 @@
+import pytest
+from utils.Backend import make_backend, JavaBackend, ReferenceBackend, NullBackend, RecordingBackend
+from utils.MidiPlayer import MidiPlayer
+
+
+def test_make_backend():
+    assert isinstance(make_backend('null'), NullBackend)
+    assert make_backend('recording', 'binary').protocol == 'binary'
+    assert make_backend('python').protocol == 'binary'
+    assert isinstance(make_backend('java', 'text'), JavaBackend)
+    assert isinstance(make_backend('python', 'binary'), ReferenceBackend)
+    with pytest.raises(ValueError):
+        make_backend('java', 'binary')
+    with pytest.raises(ValueError):
+        make_backend('python', 'text')
+    with pytest.raises(ValueError):
+        make_backend('nope')
+
+
+def test_null_backend():
+    b = NullBackend()
+    assert not b.running
+    b.start()
+    assert b.running and b.queue_depth() == 0
+    b.restart()
+    assert b.running
+    b.stop()
+    assert not b.running
+
+
+def test_recording_backend():
+    b = RecordingBackend()
+    b.start()
+    try:
+        b.send("C4")
+        b.send("m")
+        records = b.records()
+        assert [c for s, r, c in records] == ["C4", "m"]
+        assert all(s <= r for s, r, c in records)
+        assert b.records() == []
+        b.send("D4")
+        b.restart()     # Fresh process: nothing recorded before the restart
+        assert b.running
+        b.send("E4")
+        assert [c for s, r, c in b.records()] == ["E4"]
+    finally:
+        b.stop()
+
+
+def test_player_lifecycle():
+    player = MidiPlayer(backend='null')
+    with pytest.raises(MidiPlayer.UninitializedError):
+        player.play("C4")
+    assert not player.mute
+    player.start()
+    player.play("C4")
+    assert player.mute
+    player.stop()
+    assert not player.running
+    player.start()
+    assert player.running
+    player.stop()
+
+
+def test_failed_player_init():
+    with pytest.raises(ValueError):
+        MidiPlayer(backend='java', protocol='binary')
+    MidiPlayer.__new__(MidiPlayer).__del__()    # No backend: nothing to stop
@@ -0,0 +1,30 @@
+import json
+import os
+from benchmarks import Benchmark
+from benchmarks.Suite import benchmarks
+
+
+def test_suite_setups():
+    names = [b.name for b in benchmarks]
+    assert len(names) == len(set(names))
+    baseline = Benchmark.load(os.path.join(os.path.dirname(Benchmark.__file__), 'baseline.json'))
+    assert set(baseline['results']) == set(names)
+    for b in benchmarks:
+        if not b.name.startswith('engine.play'):   # Plays sleep on the null backend
+            b.setup()()
+
+
+def test_run_and_compare(tmp_path):
+    calls = []
+    suite = [Benchmark.Benchmark('a', lambda: lambda: calls.append(1)), Benchmark.Benchmark('b', lambda: lambda: None, threshold=1.0)]
+    report = Benchmark.run(suite, select='a', rounds=2, target=0.001, verbose=False)
+    assert list(report['results']) == ['a'] and calls
+    res = report['results']['a']
+    assert res['rounds'] == 2 and res['best'] <= res['median']
+    Benchmark.save(report, tmp_path/'r.json')
+    assert Benchmark.load(tmp_path/'r.json') == json.loads(json.dumps(report))
+
+    def results(**best):
+        return dict(results={k: dict(best=v) for k, v in best.items()})
+    assert Benchmark.compare(results(a=1.3, b=1.9, c=5), results(a=1.0, b=1.0), suite, verbose=False) == ['a']
+    assert Benchmark.compare(results(a=1.2, b=2.1), results(a=1.0, b=1.0), suite, verbose=False) == ['b']
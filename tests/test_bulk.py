@@ -0,0 +1,46 @@
+import os
+import pytest
+from engine import Bulk
+from engine.Engine import StupidEngine
+from utils.Scale import Scale
+
+
+def rows(engine, directory, **kwargs):
+    Bulk.generate(engine, 25, str(directory), chords=dict(duration=2), notes=dict(duration=2, vectorized=True), progress=None, **kwargs)
+    return list(Bulk.read(str(directory)))
+
+
+def test_rows_match_forks(tmp_path):
+    e = StupidEngine(Scale('C', 'major'), seed=7)
+    for row in rows(e, tmp_path, shard_size=10, workers=1):
+        f = e.fork(row['index'])
+        assert row['chords'] == Bulk._items(f.get_chord_sequence(duration=2, midi=True))
+        assert row['notes'] == Bulk._items(f.get_note_sequence(duration=2, vectorized=True, midi=True))
+
+
+def test_parallel_matches_serial(tmp_path):
+    e = StupidEngine(Scale('D', 'minor'), seed=8)
+    assert rows(e, tmp_path/'a', shard_size=10, workers=1) == rows(e, tmp_path/'b', shard_size=7, workers=2)
+
+
+def test_resume(tmp_path):
+    e = StupidEngine(Scale('C', 'major'), seed=9)
+    first = rows(e, tmp_path, shard_size=10, workers=1)
+    (tmp_path/'shard_00001.jsonl').unlink()
+    assert Bulk.generate(e, 25, str(tmp_path), chords=dict(duration=2), notes=dict(duration=2, vectorized=True), shard_size=10, workers=1, progress=None) == 10
+    assert list(Bulk.read(str(tmp_path))) == first
+
+
+def test_resume_removes_stale_parts(tmp_path):
+    e = StupidEngine(Scale('C', 'major'), seed=9)
+    rows(e, tmp_path, shard_size=10, workers=1)
+    (tmp_path/'shard_00001.jsonl').rename(tmp_path/'shard_00001.jsonl.1234.part')     # Interrupted shard
+    Bulk.generate(e, 25, str(tmp_path), chords=dict(duration=2), notes=dict(duration=2, vectorized=True), shard_size=10, workers=1, progress=None)
+    assert not [_ for _ in os.listdir(tmp_path) if _.endswith('.part')]
+
+
+def test_params_must_be_json(tmp_path):
+    e = StupidEngine(Scale('C', 'major'), seed=9)
+    with pytest.raises(ValueError):
+        Bulk.generate(e, 5, str(tmp_path/'corpus'), chords=dict(duration=2, modulation=object()), workers=1, progress=None)
+    assert not (tmp_path/'corpus').exists()
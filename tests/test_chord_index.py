@@ -0,0 +1,32 @@
+'''
+Chord recognition against the voicings of Scale.chord.
+'''
+
+
+from itertools import product
+from utils.Scale import Scale
+from utils.ChordIndex import find_chord, find_chords
+
+
+def test_find_chord_recognizes_every_voicing():
+    for key, name in product(Scale.note_name, Scale.rules):
+        s = Scale(key, name)
+        for degree, inv, low in product(range(1, 8), range(3), (False, True)):
+            matches = find_chord(s.chord(degree, inv, low), s)
+            assert [(m.key, m.scale, m.degree, m.inversion) for m in matches] == [(key, name, degree, inv)]
+    assert find_chord(()) == ()
+
+
+def test_find_chords_matches_find_chord():
+    s = Scale('D', 'minor')
+    chords = [s.chord(d, inv) for d in range(1, 8) for inv in range(3)] + [(), ('C', 'E', 'G'), ('C', 'E', 'G')]
+    assert find_chords(chords) == [find_chord(c) for c in chords]
+    assert find_chords(chords, s) == [find_chord(c, s) for c in chords]
+
+
+def test_list_notes():
+    # e.g. chords read back from JSON
+    c = Scale('C', 'major').chord(1)
+    as_lists = [list(n) for n in c]
+    assert find_chord(as_lists) == find_chord(c) != ()
+    assert find_chords([as_lists, c, [[1, 4], [5, 4], [8, 4]]]) == [find_chord(c)] * 2 + [find_chord(((1, 4), (5, 4), (8, 4)))]
@@ -0,0 +1,36 @@
+import numpy as np
+from utils.CircularOctave import CircularOctave
+from utils.Scale import Scale
+
+
+def test_gather_matches_indexing():
+    for key in range(1, 13):
+        o = CircularOctave(Scale._intervals(key, Scale.rules['major']))
+        for root in range(7):
+            o.root_idx = root
+            index = tuple(range(-24, 40))
+            elems, octaves = o.gather(np.array(index))
+            assert list(zip(elems.tolist(), octaves.tolist())) == list(o[index])
+            elems, octaves = o.gather(slice(1, 10))
+            assert list(zip(elems.tolist(), octaves.tolist())) == list(o[tuple(range(1, 10))])
+
+
+def test_gather_shape():
+    o = CircularOctave(*range(1, 13))
+    elems, octaves = o.gather(np.arange(12).reshape(3, 4))
+    assert elems.shape == octaves.shape == (3, 4)
+
+
+def test_iter_follows_root():
+    o = CircularOctave(*range(1, 13))
+    o.root_idx = 5
+    assert tuple(o) == tuple(range(6, 13)) + tuple(range(1, 6))
+    assert str(o) == str(tuple(o))
+    o.root_idx = 0
+    assert tuple(o) == tuple(range(1, 13))
+
+
+def test_rotations_cached():
+    o = CircularOctave(*range(1, 13))
+    o.root_idx = 3
+    assert o._rotated() is o._rotated()
@@ -0,0 +1,101 @@
+'''
+Seeded engines: vectorized generation, streaming, forks and snapshots.
+'''
+
+
+import pickle
+from engine.Engine import StupidEngine, arrays_to_blob
+from utils.Scale import Scale
+from utils.NoteSequence import NoteSequence
+
+
+def engine(seed=0):
+    return StupidEngine(Scale('C', 'major'), seed=seed)
+
+
+def test_seeded_engines_are_deterministic():
+    for kwargs in (dict(), dict(vectorized=True)):
+        assert engine(1).get_chord_sequence(duration=8, **kwargs) == engine(1).get_chord_sequence(duration=8, **kwargs)
+        assert engine(1).get_note_sequence(duration=8, **kwargs) == engine(1).get_note_sequence(duration=8, **kwargs)
+        assert engine(1).get_chord_sequence(duration=8, **kwargs) != engine(2).get_chord_sequence(duration=8, **kwargs)
+
+
+def test_vectorized_matches_arrays():
+    e = engine(3)
+    notes = e.get_note_sequence(duration=8, vectorized=True, midi=True)
+    assert notes == arrays_to_blob(*engine(3).note_arrays(duration=8))
+    chords = e.get_chord_sequence(duration=8, vectorized=True, midi=True, low_notes=False)
+    pool = e._chord_pool(low_notes=False)
+    assert all(_ in pool for _ in chords)
+    assert len(notes) == len(chords) == 32
+    assert e.get_note_sequence(duration=8, vectorized=True, compact=True).duration[0] == e._delay
+
+
+def test_stream_matches_sequence():
+    for midi in (True, False):
+        assert list(engine(4).get_note_sequence.generator(duration=8, midi=midi)) == engine(4).get_note_sequence(duration=8, midi=midi)
+        assert list(engine(4).get_chord_sequence.generator(duration=8, midi=midi)) == engine(4).get_chord_sequence(duration=8, midi=midi)
+
+
+def test_stream_is_lazy():
+    e = engine(5)
+    notes = e.stream_notes(duration=None, window=8)
+    assert len(e.note_history) == 0
+    first = [next(notes) for _ in range(20)]
+    assert len(e.note_history) == 8
+    assert first == engine(5).get_note_sequence(duration=5)
+
+
+def test_stream_window():
+    e = engine(6)
+    notes = e.stream_notes(duration=None, window=256)
+    for _ in range(200):
+        next(notes)
+    assert len(e.note_history) == 200
+    for _ in range(100):
+        next(notes)
+    assert len(e.note_history) == 256
+    chords = e.stream_chords(duration=None, window=300)
+    for _ in range(200):
+        next(chords)
+    assert len(e.chord_history) == 200
+
+
+def test_sequence_lengths_agree():
+    e = engine(7)
+    for kwargs in (dict(), dict(vectorized=True), dict(compact=True), dict(vectorized=True, compact=True), dict(voice_leading=True)):
+        assert len(e.get_chord_sequence(duration=60, **kwargs)) == 240, kwargs
+        kwargs.pop('voice_leading', None)
+        assert len(e.get_note_sequence(duration=60, **kwargs)) == 240, kwargs
+    e.get_note_sequence(duration=60, compact=True)
+    assert isinstance(e.note_history, NoteSequence)
+    e.get_chord_sequence(duration=60)
+    assert isinstance(e.chord_history, list)
+
+
+def test_fork():
+    e = engine(3)
+    a = e.fork(5).get_chord_sequence(duration=8)
+    e.get_chord_sequence(duration=8)    # The parent's own draws do not affect its forks
+    assert e.fork(5).get_chord_sequence(duration=8) == a
+    assert e.fork(6).get_chord_sequence(duration=8) != a
+    assert pickle.loads(pickle.dumps(e)).fork(5).get_chord_sequence(duration=8) == a
+
+
+def test_snapshot_restore():
+    e = engine(4)
+    e.get_note_sequence(duration=2)
+    snap = e.snapshot()
+    a = e.get_note_sequence(duration=8, vectorized=True), e.get_chord_sequence(duration=8)
+    e.restore(snap)
+    assert (e.get_note_sequence(duration=8, vectorized=True), e.get_chord_sequence(duration=8)) == a
+
+
+def test_restore_keeps_numpy_generator():
+    e = engine(8)
+    g = e.rng.numpy()
+    snap = e.snapshot()
+    a = g.random(4).tolist(), e.get_note_sequence(duration=4, vectorized=True)
+    e.restore(snap)
+    assert e.rng.numpy() is g
+    assert (g.random(4).tolist(), e.get_note_sequence(duration=4, vectorized=True)) == a
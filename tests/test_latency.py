@@ -0,0 +1,43 @@
+import io
+import json
+from utils.Latency import Histogram, LatencyMonitor, CsvLog, JsonLog
+from utils.MidiPlayer import MidiPlayer
+
+
+def test_histogram():
+    h = Histogram(bounds=(1, 10), window=4)
+    for v in (0.5, 5, 20, 1, 2):
+        h.add(v)
+    assert len(h) == 4      # Rolling: 0.5 dropped
+    assert h.buckets() == [(1, 1), (10, 2), (None, 1)]
+    assert h.summary() == dict(count=4, mean=7.0, p50=5, p90=20, p99=20, max=20)
+    h.clear()
+    assert h.percentile(50) is None and h.summary()['mean'] is None
+
+
+def test_monitor_and_hooks():
+    csv_file, json_file = io.StringIO(), io.StringIO()
+    m = LatencyMonitor(window=8, hook=CsvLog(csv_file))
+    m.hooks.append(JsonLog(json_file))
+    m.record("C4", intended=1.0, sent=1.5, done=1.75, build=0.25, depth=3)
+    m.record("D4", intended=2.0, sent=2.0, done=2.5)
+    assert list(m['late'].values) == [0.5, 0.0] and list(m['ipc'].values) == [0.25, 0.5]
+    assert list(m['depth'].values) == [3]
+    assert csv_file.getvalue().splitlines()[0] == "command,intended,sent,done,build,late,ipc,depth"
+    rows = [json.loads(_) for _ in json_file.getvalue().splitlines()]
+    assert [(r['command'], r['late'], r['depth']) for r in rows] == [("C4", 0.5, 3), ("D4", 0.0, None)]
+
+
+def test_player_records():
+    player = MidiPlayer(backend='null', protocol='binary')
+    player.start()
+    player.play("C4", at=0.0, build=0.125)
+    assert player.latency['build'].values[-1] == 0.125 and player.latency['late'].values[-1] > 0
+    with player.batch():
+        player.play("D4")
+        player.play("E4")
+        assert len(player.latency['late']) == 1     # Batched plays are recorded when the frame is sent
+    assert len(player.latency['late']) == 3
+    player.latency = None
+    player.play("F4")
+    player.stop()
@@ -0,0 +1,60 @@
+import io
+import random
+import pytest
+from engine.Engine import MarkovEngine
+from utils.Markov import AliasTable, NGram, save, load
+from utils.Scale import Scale
+
+
+corpus = [[1, 3, 5, 8, 5, 3, 1, 0, 2, 4, 6, 4, 2]*4, [5, 4, 3, 2, 1, 0, 1]*3]
+
+
+def test_alias_table_is_exact():
+    weights = [5, 1, 0, 3, 7, 2]
+    t = AliasTable('abcdef', weights)
+    mass = dict.fromkeys('abcdef', 0.0)
+    for i in range(t.n):
+        mass[t.symbols[i]] += t.prob[i]/t.n
+        mass[t.symbols[t.alias[i]]] += (1 - t.prob[i])/t.n
+    for s, w in zip('abcdef', weights):
+        assert mass[s] == pytest.approx(w/sum(weights))
+    with pytest.raises(ValueError):
+        AliasTable('ab', [0, 0])
+
+
+def test_backoff():
+    m = NGram(2).fit([[1, 2, 3]])
+    assert m.sample((1, 2)) == 3
+    assert m.sample((7, 2)) == 3        # Unseen context: backs off to (2,)
+    assert m.sample((7, 7)) in (1, 2, 3)
+    with pytest.raises(ValueError):
+        NGram(2).sample(())
+
+
+def test_save_load(tmp_path):
+    e = MarkovEngine(Scale('C', 'major'), order=3, seed=0).fit(corpus, 'notes').fit(corpus[::-1], 'chords')
+    path = str(tmp_path/'model.mkv')
+    e.save(path)
+    f = io.BytesIO()
+    e.save(f)
+    with open(path, 'rb') as saved:
+        assert saved.read() == f.getvalue()
+    for source in (path, io.BytesIO(f.getvalue())):
+        other = MarkovEngine(Scale('D', 'minor'), seed=0).load(source)
+        assert other.order == 3
+        assert {k: dict(m.counts) for k, m in other.models.items()} == {k: dict(m.counts) for k, m in e.models.items()}
+        assert other.get_note_sequence(duration=8, midi=True) == MarkovEngine(Scale('D', 'minor'), order=3, seed=0).fit(corpus, 'notes').get_note_sequence(duration=8, midi=True)
+    with pytest.raises(ValueError):
+        load(io.BytesIO(b'NOPE\x02\x00'))
+
+
+def test_engine_learns_and_forks():
+    scale = Scale('C', 'major')
+    e = MarkovEngine(scale, seed=1).fit(corpus, 'chords').fit(corpus, 'notes')
+    notes = e.get_note_sequence(duration=8, midi=True)
+    assert set(e.degrees(notes)) <= set(range(9))
+    learner = MarkovEngine(scale, seed=1)
+    learner.note_history = list(notes)
+    assert learner.learn_history().models['notes']
+    assert e.fork(2).get_chord_sequence(duration=8) == e.fork(2).get_chord_sequence(duration=8)
+    assert list(e.fork(3).get_note_sequence.generator(duration=8, midi=True)) == e.fork(3).get_note_sequence(duration=8, midi=True)
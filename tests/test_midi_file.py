@@ -0,0 +1,70 @@
+from struct import unpack
+from utils import MidiFile
+from utils.Command import NOTE_ON, NOTE_OFF, PROGRAM
+from utils.Scale import Scale
+
+
+def read(data):
+    '''
+    (tick, status, data1, data2) channel events of a format 0 SMF.
+    '''
+    assert data[:4] == b'MThd' and unpack('>IHHH', data[4:14]) == (6, 0, 1, MidiFile.TICKS_PER_BEAT)
+    assert data[14:18] == b'MTrk'
+    end = 22 + unpack('>I', data[18:22])[0]
+    assert end == len(data)
+    i, tick, events = 22, 0, []
+    while i < end:
+        delta = 0
+        while True:
+            byte = data[i]
+            i += 1
+            delta = delta << 7 | byte & 0x7F
+            if not byte & 0x80:
+                break
+        tick += delta
+        status = data[i]
+        if status == 0xFF:
+            i += 3 + data[i+2]
+        elif status & 0xF0 == PROGRAM:
+            events.append((tick, status, data[i+1], None))
+            i += 2
+        else:
+            events.append((tick, status, data[i+1], data[i+2]))
+            i += 3
+    return events
+
+
+def test_vlq():
+    assert [MidiFile._vlq(n) for n in (0, 0x7F, 0x80, 0x3FFF, 0x4000)] == [b'\x00', b'\x7f', b'\x81\x00', b'\xff\x7f', b'\x81\x80\x00']
+
+
+def test_render_notes():
+    blob = [((1, 0),), (), ((5, 1),)]
+    assert read(MidiFile.render(blob, delay=0.25, octave=3, program=5)) == [
+        (0, PROGRAM, 5, None),
+        (0, NOTE_ON, 48, 100),
+        (480, NOTE_ON, 64, 100),
+        (720, NOTE_OFF, 48, 0),     # Sustained notes end with the sequence
+        (720, NOTE_OFF, 64, 0),
+    ]
+
+
+def test_render_mute_and_letters():
+    blob = [("C4", "E4"), ("G4",)]
+    assert read(MidiFile.render(blob, delay=0.5, sustain=False)) == [
+        (0, NOTE_ON, 60, 100), (0, NOTE_ON, 64, 100),
+        (480, NOTE_OFF, 60, 0), (480, NOTE_OFF, 64, 0),
+        (480, NOTE_ON, 67, 100),
+        (960, NOTE_OFF, 67, 0),
+    ]
+
+
+def test_out_of_range_notes_dropped():
+    assert read(MidiFile.render([((1, 0), (12, 1))], octave=9)) == [(0, NOTE_ON, 120, 100), (240, NOTE_OFF, 120, 0)]
+
+
+def test_render_phrase():
+    expected = [(0, NOTE_ON, 60, 100), (480, NOTE_OFF, 60, 0), (480, NOTE_ON, 62, 100), (960, NOTE_OFF, 62, 0)]
+    assert read(MidiFile.render_phrase("C4-D4-")) == expected
+    scale = Scale('C', 'major')
+    assert MidiFile.render_phrase(scale.compile_phrase("1 2 ")) == MidiFile.render_phrase(scale.phrase("1 2 "))
@@ -0,0 +1,62 @@
+import pytest
+from utils.MidiPlayer import MidiPlayer, MidiHub
+
+
+def commands(hub):
+    return [c for sent, received, c in hub.player.backend.records()]
+
+
+@pytest.fixture
+def hub():
+    hub = MidiHub(MidiPlayer(backend='recording', protocol='text'))
+    yield hub
+    if hub.player.running:
+        hub.player.stop()
+
+
+def test_channels_route_and_mute(hub):
+    a, b = hub.channel(5), hub.channel()
+    assert (a.channel, b.channel) == (0, 1)
+    hub.start()
+    a.play("C4")
+    assert b.mute
+    a.instrument = 7
+    assert commands(hub) == ["V<0>I<5>", "V<1>I<0>", "V<0>C4", "V<1>m", "V<0>I<7>"]
+
+
+def test_release(hub):
+    a, b = hub.channel(), hub.channel()
+    hub.start()
+    hub.release(a)
+    assert commands(hub) == ["V<0>I<0>", "V<1>I<0>", "V<0>m"]
+    with pytest.raises(MidiHub.ReleasedChannel):
+        a.play("C4")
+    assert not a.mute and not a.running
+    assert hub._free[-1] == 0   # Freed for a new client, after the unused channels
+    b.play("D4")
+    assert commands(hub) == ["V<1>D4"]
+
+
+def test_restart_after_last_release(hub):
+    a = hub.channel()
+    hub.start()
+    a.stop()
+    assert not hub.running
+    b = hub.channel(3)
+    b.start()
+    assert hub.running
+    b.play("E4")
+    assert commands(hub) == ["V<1>I<3>", "V<1>E4"]     # Fresh backend: earlier records are gone
+
+
+def test_no_free_channel(hub):
+    for _ in MidiHub.channels:
+        hub.channel()
+    with pytest.raises(MidiHub.NoFreeChannel):
+        hub.channel()
+
+
+def test_backend_must_route_channels():
+    with pytest.raises(ValueError):
+        MidiHub(MidiPlayer(backend='java'))
+    assert MidiHub(MidiPlayer(backend='null')).player.backend.routes_channels
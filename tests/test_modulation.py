@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+from engine.Engine import StupidEngine
+from engine.Modulation import Modulation, Constant, Uniform, Choice, RandomWalk, LFO, Envelope, Steps
+from utils.Random import Stream
+from utils.Scale import Scale
+
+
+def values(modulator, n=200, block=64, seed=0):
+    mod = Modulation(block=block, rng=Stream(seed), x=modulator)
+    return [next(mod)['x'] for _ in range(n)]
+
+
+def test_blocks_do_not_change_values():
+    for make in (lambda: Uniform(2, 3), lambda: Choice((1, 2, 3), (1, 0, 2)), lambda: RandomWalk(0.5, 0.2, 0.0, 1.0),
+                 lambda: LFO(10, shape='triangle'), lambda: Steps((1, 2, 3), hold=4), lambda: Envelope([(0, 0), (50, 1)])):
+        a = values(make(), block=64)
+        assert values(make(), block=64) == a
+        if not isinstance(make(), (Uniform, Choice)):   # Independent draws depend on the block split
+            assert values(make(), block=7) == pytest.approx(a)
+
+
+def test_modulators():
+    assert values(Constant(3), 5) == [3]*5
+    assert values(Steps((1, 2, 3), hold=2), 7) == [1, 1, 2, 2, 3, 3, 1]
+    assert values(LFO(4, low=0, high=2, shape='square'), 5) == [2, 2, 0, 0, 2]
+    assert values(LFO(4, shape='saw'), 4) == [0, 0.25, 0.5, 0.75]
+    assert values(Envelope([(0, 0), (4, 1)], loop=True), 6) == [0, 0.25, 0.5, 0.75, 0, 0.25]
+    walk = values(RandomWalk(0.5, step=0.5, low=0.2, high=0.6), 500)
+    assert min(walk) >= 0.2 and max(walk) <= 0.6
+    assert set(values(Choice((True, False), (1, 0)), 20)) == {True}
+    assert values(LFO(4, shape='saw').map(lambda b: b*4), 4) == [0, 1, 2, 3]
+    with pytest.raises(ValueError):
+        LFO(shape='nope')
+
+
+def test_engine_modulation():
+    def run(seed):
+        e = StupidEngine(Scale('C', 'major'), seed=seed)
+        mod = Modulation(rng=e.rng, silence_ratio=Steps((0.0, 1.0), hold=4), inversion=Steps((0, 1, 2)))
+        return e.get_chord_sequence(duration=4, midi=True, modulation=mod)
+    chords = run(1)
+    assert chords == run(1)
+    assert [bool(c) for c in chords] == [True]*4 + [False]*4 + [True]*4 + [False]*4
+    with pytest.raises(ValueError):
+        StupidEngine(Scale('C', 'major')).get_note_sequence(vectorized=True, modulation=Modulation())
+
+
+def test_restore_replays():
+    e = StupidEngine(Scale('C', 'major'), seed=2)
+    mod = Modulation(block=8, rng=e.rng, silence_ratio=RandomWalk(0.3, step=0.1), inversion=Choice((0, 1, 2)))
+    assert mod.rng is e.rng
+    e.get_chord_sequence(duration=3, modulation=mod)    # Restore mid-block
+    snap = e.snapshot(), mod.snapshot()
+    a = e.get_chord_sequence(duration=8, modulation=mod), e.get_note_sequence(duration=4, vectorized=True)
+    e.restore(snap[0])
+    mod.restore(snap[1])
+    assert (e.get_chord_sequence(duration=8, modulation=mod), e.get_note_sequence(duration=4, vectorized=True)) == a
+    assert mod.rng is e.rng and mod._generator() is e.rng.numpy()
+
+
+def test_generator_rng():
+    a = Modulation(rng=np.random.default_rng(4), x=Uniform())
+    b = Modulation(rng=np.random.default_rng(4), x=Uniform())
+    assert [next(a) for _ in range(70)] == [next(b) for _ in range(70)]
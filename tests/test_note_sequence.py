@@ -0,0 +1,32 @@
+from array import array
+import pytest
+from utils.NoteSequence import NoteSequence, ChordSequence
+
+
+def test_typed_arrays():
+    seq = NoteSequence(array('q', [1, 0]), array('q', [0, 0]), array('f', [0, 0.25]), [0.25, 0.25])
+    assert seq.pitch.typecode == 'b' and seq.onset.typecode == 'd'
+    assert list(seq) == [((1, 0),), ()]
+    pitch = array('b', [3])
+    assert NoteSequence(pitch, [1], [0], [1]).pitch is pitch
+    with pytest.raises(ValueError):
+        NoteSequence([1], [0], [], [])
+
+
+def test_note_sequence_round_trip():
+    blob = [((1, 0),), (), ((12, -1),)]
+    seq = NoteSequence.from_list(blob, delay=0.5)
+    assert list(seq) == blob
+    assert list(seq.onset) == [0, 0.5, 1.0]
+    assert list(seq[1:]) == blob[1:] and seq[2] == blob[2]
+    seq.append(((5, 1),))
+    assert seq[-1] == ((5, 1),) and seq.onset[-1] == 1.5
+
+
+def test_chord_sequence_round_trip():
+    blob = [((1, 0), (5, 0), (8, 0)), (), ((3, 1), (7, 1), (10, 1))]
+    seq = ChordSequence.from_list(blob)
+    assert list(seq) == blob and len(seq) == 3
+    assert list(seq[1:]) == blob[1:] and list(seq[::2]) == blob[::2]
+    assert seq[-1] == blob[-1]
+    assert list(seq.onset) == [0, 0.25, 0.5]
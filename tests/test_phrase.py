@@ -0,0 +1,102 @@
+'''
+Scale.phrase / compile_phrase against the parser they replaced.
+'''
+
+
+import random
+import pytest
+from utils.Scale import Scale
+from utils.Phrase import compile_phrase
+from utils.Command import parse
+
+
+def reference_phrase(scale, phrase, root=4):
+    '''
+    Scale.phrase before phrases were compiled (character-by-character parser).
+    '''
+    mod_notes = {i:v for i,v in enumerate(scale.notes.values(), 1)}
+    invalid_note = lambda s: print(f"Invalid note '{s}'. Notes must be in scale. Playing 'C' note instead.") or 'C'
+    get_note = lambda s: mod_notes.get(s, False) or invalid_note(s)
+
+    oct_flag = True
+    oct = 0
+    notes = []
+
+    for s in phrase:
+        if s=='q' or s=='Q':
+            print("Press 0 to Quit")
+            break
+
+        if s.isnumeric():
+            if not oct_flag:
+                notes.append(f"{min(max(root+oct, 0), 7)}")
+            notes.append(get_note(int(s)))
+            oct_flag = False
+            oct = 0
+        elif s=='-':
+            oct -= 1
+        elif s=='+':
+            oct += 1
+        elif s==' ':
+            notes.append(f"{min(max(root+oct, 0), 7)}-" if not oct_flag else "-")
+            oct = 0
+            oct_flag = True
+        else:
+            notes.append(f"{min(max(root+oct, 0), 7)}"+s if not oct_flag else s)
+            oct = 0
+            oct_flag = True
+
+    if not oct_flag:
+        notes.append(f"{min(max(root+oct, 0), 7)}")
+
+    notes = ''.join(notes)
+    print(f"Playing: {notes}")
+    return notes
+
+
+def random_phrases(n, seed=0):
+    rng = random.Random(seed)
+    alphabet = "0123456789" + "+-" + "  " + "_.m" + "qQ"
+    for _ in range(n):
+        yield "".join(rng.choice(alphabet) for __ in range(rng.randint(0, 24)))
+
+
+@pytest.mark.parametrize('key, name', [('C', 'major'), ('F#', 'minor'), ('A', 'harmonic')])
+@pytest.mark.parametrize('root', [0, 4, 7])
+def test_phrase_matches_reference(capsys, key, name, root):
+    scale = Scale(key, name)
+    for phrase in random_phrases(300, seed=root):
+        expected = reference_phrase(scale, phrase, root)
+        expected_out = capsys.readouterr().out
+        assert scale.phrase(phrase, root) == expected, phrase
+        assert capsys.readouterr().out == expected_out, phrase
+
+
+def test_compiled_phrase_is_cached():
+    notes = tuple(Scale('C', 'major').notes.values())
+    assert compile_phrase("1+3 5-_q7", notes, 4) is compile_phrase("1+3 5-_q7", notes, 4)
+    assert str(compile_phrase("1 9", notes, 4)) == "C4-C4"
+    assert compile_phrase("1 9", notes, 4).invalid == ('9',)
+
+
+def test_phrase_on_channel():
+    p = compile_phrase("135", tuple(Scale('C', 'major').notes.values()), 4)
+    assert str(p.on(3)) == "V<3>" + str(p)
+    assert p.on(3) is p.on(3)
+    assert p.on(3).channel == 3
+
+
+@pytest.mark.parametrize('unit', [0.5, 0.25])
+def test_events_match_parsed_command(unit):
+    notes = tuple(Scale('E', 'minor').notes.values())
+    for phrase in random_phrases(300, seed=3):
+        p = compile_phrase(phrase, notes, 4)
+        assert p.events(1.0, unit) == parse(str(p), 1.0, unit), phrase
+        assert p.on(5).events(0.0, unit) == parse(str(p.on(5)), 0.0, unit), phrase
+
+
+def test_events_skip_the_command_string():
+    p = compile_phrase("1_2.3- 4+m5", tuple(Scale('G', 'major').notes.values()), 3)
+    p.events()
+    assert p._command is None
+    assert str(p) == "G3_A3.B2-C4mD3"
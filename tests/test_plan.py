@@ -0,0 +1,38 @@
+import pytest
+from engine.Engine import StupidEngine, _commands
+from utils.Scale import Scale
+from utils.Plan import Plan
+
+
+def test_compile_matches_render():
+    e = StupidEngine(Scale('C', 'major'), seed=5)
+    for blob in (e.get_chord_sequence(duration=8, midi=True), e.get_note_sequence(duration=8), []):
+        for sustain in (True, False):
+            plan = e.compile(blob, sustain=sustain, octave=4)
+            assert isinstance(plan, Plan)
+            assert list(plan) == [(float(d), c) for d, c in _commands(blob, e._delay, sustain, 4)]
+            assert list(e._render(plan)) == list(plan)
+            assert e.compile(blob, sustain=sustain, octave=4) is plan
+            assert e.compile(plan) is plan
+
+
+def test_progression_plan():
+    s = Scale('C', 'major')
+    chords = [s.chord(1), s.chord(4), s.chord(5)]
+    plan = s.progression(chords, delay=0.5, mute_prev=True)
+    assert plan is s.progression(chords, delay=0.5, mute_prev=True)
+    assert plan.commands == tuple('m' + "".join(Scale.semitones_to_letter_notes(c, octave=4)) + '--' for c in chords)
+    assert plan.duration == 1.5
+
+
+def test_plan_operations():
+    p = Plan([(1, 'a'), (0.5, None)])
+    assert p.duration == 1.5 and p.commands == ('a',)
+    assert p + [(1, 'b')] == Plan([(1, 'a'), (0.5, None), (1, 'b')])
+    assert [(1, 'b')] + p == Plan([(1, 'b'), (1, 'a'), (0.5, None)])
+    assert isinstance(p + ((1, 'b'),), Plan) and isinstance(p + p, Plan)
+    assert isinstance(p*2, Plan) and len(2*p) == 4
+    assert isinstance(p[1:], Plan) and p[0] == (1.0, 'a')
+    assert hash(p) == hash(Plan([(1.0, 'a'), (0.5, None)]))
+    with pytest.raises(TypeError):
+        p + "ab"
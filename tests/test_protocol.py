@@ -0,0 +1,71 @@
+import threading
+from multiprocessing import Pipe
+import pytest
+from utils.Protocol import encode, decode, FrameWriter, ProtocolError, reference_backend, HEADER, EVENT
+from utils.Command import parse, NOTE_ON, NOTE_OFF, CONTROL, PROGRAM, ALL_NOTES_OFF
+from utils.MidiPlayer import MidiPlayer
+
+
+events = [(1.5, NOTE_ON, 0, 60, 100), (2.0, NOTE_OFF, 0, 60, 0), (2.0, PROGRAM, 3, 40, 0), (2.5, CONTROL, 0, ALL_NOTES_OFF, 0)]
+
+
+def test_round_trip():
+    frame = encode(events)
+    assert len(frame) == HEADER.size + 4*EVENT.size
+    assert decode(frame) == events
+    assert decode(encode([])) == []
+    assert decode(encode(parse("V<2>I<5>C4E4-m", 10.0))) == parse("V<2>I<5>C4E4-m", 10.0)
+
+
+@pytest.mark.parametrize('frame', [b'', b'ME', b'XX' + encode(events)[2:], encode(events)[:-1], encode(events) + b'\0'])
+def test_malformed(frame):
+    with pytest.raises(ProtocolError):
+        decode(frame)
+
+
+def test_frame_writer():
+    class Conn:
+        frames = []
+        def send_bytes(self, frame):
+            self.frames.append(frame)
+    w = FrameWriter(Conn())
+    w.flush()
+    w.add(events[:2])
+    w.add(events[2:])
+    w.flush()
+    w.flush()
+    assert [decode(_) for _ in Conn.frames] == [events]
+
+
+def test_reference_backend():
+    reader, writer = Pipe(False)
+    err_reader, err_writer = Pipe(False)
+    sounded = []
+    backend = threading.Thread(target=reference_backend, args=(reader, err_writer, sounded.append))
+    backend.start()
+    frames = [[(0.0, NOTE_ON, 0, 60, 100), (0.0, NOTE_ON, 0, 64, 100)], [(0.01, CONTROL, 0, ALL_NOTES_OFF, 0)]]
+    for f in frames:
+        writer.send_bytes(encode(f))
+    assert [err_reader.recv() for _ in frames] == frames
+    writer.close()
+    backend.join(5)
+    assert not backend.is_alive()
+    assert sounded == [
+        (0.0, NOTE_ON, 0, 60, 100), (0.0, NOTE_ON, 0, 64, 100),
+        (0.01, NOTE_OFF, 0, 60, 0), (0.01, NOTE_OFF, 0, 64, 0),
+    ]
+
+
+def test_player_batches_frames():
+    player = MidiPlayer(backend='recording', protocol='binary')
+    player.start()
+    try:
+        with player.batch():
+            player.play("C4-")
+            player.play("E4")
+        player.play("m")
+        records = player.backend.records()
+    finally:
+        player.stop()
+    assert [e[1:] for s, r, e in records] == [(NOTE_ON, 0, 60, 100), (NOTE_OFF, 0, 60, 0), (NOTE_ON, 0, 64, 100), (CONTROL, 0, ALL_NOTES_OFF, 0)]
+    assert records[0][0] == records[2][0] != records[3][0]     # One frame per batch
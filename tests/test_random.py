@@ -0,0 +1,39 @@
+from utils.Random import Stream
+
+
+def test_substreams():
+    s = Stream(1)
+    a = s.substream(3).random()
+    s.random()
+    assert Stream(1).substream(3).random() == s.substream(3).random() == a
+    assert s.substream(4).random() != a and Stream(2).substream(3).random() != a
+    assert s.substream(3).substream(0).key == (3, 0)
+
+
+def test_spawn():
+    s = Stream(1)
+    first, second = s.spawn(), s.spawn(2)
+    assert [_.key for _ in first + second] == [(0,), (1,), (2,)]
+
+
+def test_state_round_trip():
+    s = Stream(5)
+    s.random()
+    s.numpy().random()
+    state = s.getstate()
+    a = s.random(), s.numpy().random(3).tolist()
+    s.setstate(state)
+    assert (s.random(), s.numpy().random(3).tolist()) == a
+
+
+def test_restore_keeps_generator():
+    s = Stream(6)
+    state = s.getstate()            # Before numpy() exists
+    g = s.numpy()
+    a = g.random(3).tolist()
+    s.setstate(state)
+    assert s.numpy() is g and g.random(3).tolist() == a
+    state = s.getstate()
+    b = g.random(3).tolist()
+    s.setstate(state)
+    assert s.numpy() is g and g.random(3).tolist() == b
@@ -0,0 +1,55 @@
+import numpy as np
+from rhythm.Rhythm import Rhythm
+from utils.Random import Stream
+
+
+def test_pattern_round_trip():
+    r = Rhythm("O--O-x--")
+    assert r.rhythm == "O--O-O--" and len(r) == 8
+    assert r.onsets == (0, 3, 5) and r.density == 3/8
+    assert list(r) == [c == 'O' for c in r.rhythm]
+    assert Rhythm(r) == r and hash(Rhythm(r)) == hash(r)
+    assert Rhythm.from_array(np.array(list(r))) == r
+    assert r[2:6].rhythm == "-O-O" and r[3] is True
+    assert r.duration == 8/16
+
+
+def test_operations_match_strings():
+    a, b = Rhythm("O-O-"), Rhythm("OO-")
+    def tiled(r, n):
+        return (r.rhythm*n)[:n]
+    def combine(x, y, op):
+        return "".join('O' if op(p == 'O', q == 'O') else '-' for p, q in zip(tiled(x, 12), tiled(y, 12)))
+    assert (a | b).rhythm == combine(a, b, lambda p, q: p or q)
+    assert (a & b).rhythm == combine(a, b, lambda p, q: p and q)
+    assert (a ^ b).rhythm == combine(a, b, lambda p, q: p != q)
+    assert (~a).rhythm == "-O-O"
+    assert (a + b).rhythm == "O-O-OO-"
+    assert (a*3).rhythm == (3*a).rhythm == a.tile(3).rhythm == "O-O-"*3
+    assert b.rotate(1).rhythm == "-OO" and b.rotate(-1).rhythm == "O-O" and b.rotate(3) == b
+
+
+def test_random_is_seeded():
+    rows = Rhythm.random_array(50, groups=8, group=3, rng=Stream(1))
+    assert rows.shape == (50, 24)
+    assert (rows.reshape(50, 8, 3).sum(-1) <= 1).all()
+    assert (rows == Rhythm.random_array(50, groups=8, group=3, rng=Stream(1))).all()
+    patterns = Rhythm.random(50, groups=8, group=3, rng=Stream(1))
+    assert [p.rhythm for p in patterns] == ["".join('O' if t else '-' for t in row) for row in rows.tolist()]
+    assert isinstance(Rhythm.random(rng=Stream(2)), Rhythm)
+
+
+def test_empty_pattern_broadcasts():
+    a, empty = Rhythm("O-OO"), Rhythm("")
+    assert empty | a == a and a | empty == a and empty ^ a == a
+    assert (empty & a).rhythm == "----"
+    assert len(empty | empty) == 0
+    assert empty + a == a and (a*0) == empty and empty.rotate(2) == empty
+
+
+def test_onset_array_cached():
+    r = Rhythm("O--O-O")
+    assert r.onset_array() is r.onset_array()
+    assert r.onset_array().tolist() == [0, 3, 5]
+    r.rhythm = "-O"
+    assert r.onset_array().tolist() == [1]
@@ -0,0 +1,42 @@
+from itertools import product
+import pytest
+from utils.Scale import Scale, CircularOctave, find_scale, find_scales, note_mask
+
+
+def test_voicing_table():
+    for key, name in product(('C', 'F#', 'A'), Scale.rules):
+        s = Scale(key, name)
+        intervals = CircularOctave(Scale._intervals(s.key, s.rule))
+        for num, inv, low in product(range(-3, 25), range(4), (False, True)):
+            assert s.chord(num, inv, low) == Scale._voicing(intervals, num, inv, low)
+
+
+def test_scales_share_theory_data():
+    a, b = Scale('D', 'minor'), Scale(3, 'minor')
+    assert tuple(a.intervals) == tuple(b.intervals)
+    assert a._chords is b._chords
+    assert not hasattr(a, '_midi')      # No MidiPlayer until midi is used
+
+
+def test_voicing_table_read_only():
+    s = Scale('C', 'major')
+    table = Scale._voicings(s.key, s.rule)
+    with pytest.raises(TypeError):
+        table[0, 0, True] = ()
+    s.chord(40)     # Degrees outside the table do not enter it
+    assert (40, 0, True) not in table
+
+
+def test_find_scale_matches_brute_force():
+    for notes in [(1,), (1, 5, 8), (1, 3, 5, 6, 8, 10, 12), (2, 3), (1, 2, 3), (13,)]:
+        expected = [
+            (Scale.note_name[key-1], name)
+            for key in range(1, 13)
+            for name, rule in Scale.rules.items()
+            if set(notes) <= set(Scale._intervals(key, rule))
+        ]
+        assert [(Scale.note_name[s.key-1], s.name) for s in find_scale(*notes)] == expected
+        assert list(find_scales([note_mask(*notes)])[0]) == expected
+        assert list(find_scales([notes])[0]) == expected
+    names = lambda scales: [(s.key, s.name) for s in scales]
+    assert names(find_scale('C', 'E', 'G')) == names(find_scale(1, 5, 8)) == names(find_scale('1', '5', '8'))
@@ -0,0 +1,90 @@
+import asyncio
+import utils.Scheduler
+from utils.Scheduler import Scheduler
+
+
+class Clock:
+    '''
+    Fake clock: sleeping advances time.
+    '''
+    def __init__(self):
+        self.t = 100.0
+
+    def __call__(self):
+        return self.t
+
+    def sleep(self, wait):
+        self.t += wait
+
+    async def async_sleep(self, wait):
+        self.t += wait
+
+
+events = [(0.5, 'a'), (0, 'b'), (0.25, 'c'), (0.25, None), (1, 'd'), (0, None), (0.5, 'e')]
+
+
+def log(clock, rest=True):
+    sent = []
+
+    class batch:
+        def __enter__(self):
+            sent.append(('batch', clock()))
+        def __exit__(self, *exc):
+            sent.append(('end', clock()))
+
+    kwargs = dict(rest=(lambda: sent.append((None, clock())))) if rest else {}
+    return sent, dict(send=lambda p: sent.append((p, clock())), batch=batch, clock=clock, lookahead=2, **kwargs)
+
+
+def test_run_deadlines():
+    clock = Clock()
+    sent, kwargs = log(clock)
+    Scheduler(sleep=clock.sleep, **kwargs).run(events, start=101.0)
+    assert sent == [
+        ('a', 101.0),
+        ('batch', 101.5), ('b', 101.5), ('c', 101.5), ('end', 101.5),
+        (None, 101.75), ('d', 102.0),
+        ('batch', 103.0), (None, 103.0), ('e', 103.0), ('end', 103.0),
+    ]
+    assert clock.t == 103.5
+
+
+
+def test_no_drift():
+    clock = Clock()
+    sent = []
+
+    def send(payload):     # Each send takes 0.1s: later deadlines stay on the grid
+        sent.append(clock())
+        clock.t += 0.1
+
+    timing = Scheduler(send, clock=clock, sleep=clock.sleep).run([(0.25, 'x')]*8, start=100.0)
+    assert sent == [100.0 + 0.25*i for i in range(8)]
+    assert timing.count == 8 and timing.max == 0.0
+
+
+def test_arun_matches_run(monkeypatch):
+    for rest in (True, False):
+        clock = Clock()
+        sent, kwargs = log(clock, rest)
+        Scheduler(sleep=clock.sleep, **kwargs).run(events)
+        expected = sent, clock.t
+
+        clock = Clock()
+        sent, kwargs = log(clock, rest)
+        monkeypatch.setattr(utils.Scheduler, 'async_sleep', clock.async_sleep)
+        asyncio.run(Scheduler(**kwargs).arun(events))
+        assert (sent, clock.t) == expected
+
+
+def test_arun_awaits_coroutines(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(utils.Scheduler, 'async_sleep', clock.async_sleep)
+    sent = []
+
+    async def send(p):
+        sent.append((p, clock()))
+
+    asyncio.run(Scheduler(send, clock=clock).arun(events[:3]))
+    assert sent == [('a', 100.0), ('b', 100.5), ('c', 100.5)]
+
@@ -0,0 +1,89 @@
+'''
+Viterbi voice leading against a brute-force search over all voicings.
+'''
+
+
+import itertools
+import random
+import pytest
+from utils.Scale import Scale
+from utils.VoiceLeading import lead, lead_batch, lead_stream, movement, _tables
+
+
+def brute_force(scale, degrees, low_notes=True, octaves=(0, 1)):
+    choices = [(inv, k) for k in octaves for inv in sorted(Scale.inversions)]
+    played = [(d - 1) % 7 + 1 for d in degrees if d]
+    return min(
+        movement([scale.chord(d + 7*k, inversion=inv, low_notes=low_notes) for d, (inv, k) in zip(played, voicing)])
+        for voicing in itertools.product(choices, repeat=len(played))
+    )
+
+
+@pytest.mark.parametrize('key, name', [('C', 'major'), ('E', 'harmonic')])
+@pytest.mark.parametrize('low_notes', [True, False])
+def test_minimal_movement(key, name, low_notes):
+    scale = Scale(key, name)
+    rng = random.Random(0)
+    for _ in range(20):
+        degrees = [rng.randint(0, 9) for __ in range(rng.randint(1, 5))]
+        chords = lead(scale, degrees, low_notes=low_notes, weight=0.0)
+        assert movement(chords) == brute_force(scale, degrees, low_notes), degrees
+        assert [bool(c) for c in chords] == [bool(d) for d in degrees]
+
+
+def test_batch_matches_single():
+    scale = Scale('D', 'minor')
+    rng = random.Random(1)
+    sequences = [[rng.randint(0, 9) for __ in range(rng.randint(0, 20))] for _ in range(30)]
+    assert lead_batch(scale, sequences) == [lead(scale, _) for _ in sequences]
+    assert scale.voice_lead(sequences) == lead_batch(scale, sequences)
+
+
+def test_tables_cached():
+    s = Scale('C', 'major')
+    assert _tables(s.key, s.rule, True, (0, 1), 0.25, None) is _tables(s.key, s.rule, True, (0, 1), 0.25, None)
+
+
+def test_empty():
+    s = Scale('C', 'major')
+    assert lead(s, []) == []
+    assert lead(s, [0, None]) == [(), ()]
+
+
+def test_stream_with_full_window_is_optimal():
+    scale = Scale('A', 'minor')
+    rng = random.Random(2)
+    for _ in range(30):
+        degrees = [rng.randint(0, 9) for __ in range(rng.randint(0, 12))]
+        streamed = list(lead_stream(scale, degrees, window=len(degrees) or 1, weight=0.0))
+        assert movement(streamed) == movement(lead(scale, degrees, weight=0.0)), degrees
+        assert [bool(c) for c in streamed] == [bool(d) for d in degrees]
+        assert movement(lead_stream(scale, degrees, window=1, weight=0.0)) >= movement(streamed)
+
+
+def test_stream_is_online():
+    scale = Scale('C', 'major')
+    pulled = []
+    def degrees():
+        for d in itertools.cycle((1, 4, 5, 0, 6, 2)):
+            pulled.append(d)
+            yield d
+    chords = lead_stream(scale, degrees(), window=3)
+    first = [next(chords) for _ in range(10)]
+    assert len(pulled) == 12        # Two degrees ahead
+    assert all(c in [scale.chord(d + 7*k, inversion=i) for k in (0, 1) for i in range(3)] for c, d in zip(first, pulled) if d)
+    with pytest.raises(ValueError):
+        next(lead_stream(scale, [1], window=0))
+
+
+def test_engine_stream_voice_leading():
+    from engine.Engine import StupidEngine
+    e = StupidEngine(Scale('C', 'major'), seed=1)
+    chords = e.stream_chords(duration=None, midi=True, voice_leading=True, lookahead=4, window=16)
+    first = [next(chords) for _ in range(64)]
+    again = StupidEngine(Scale('C', 'major'), seed=1).get_chord_sequence.generator(duration=16, midi=True, voice_leading=True, lookahead=4)
+    assert list(again) == first
+    assert list(e.chord_history) == first[-16:]
+    played = [c for c in first if c]
+    greedy = list(StupidEngine(Scale('C', 'major'), seed=1).stream_chords(duration=16, midi=True))
+    assert movement(played) <= movement([c for c in greedy if c])
@@ -0,0 +1,311 @@
+'''
+MidiPlayer backends: where played commands end up.
+
+    java        util() subprocess driving JavaProg.MusicSheetReader (text commands)
+    python      utils.Protocol reference backend process (binary frames)
+    null        discards everything, no process
+    recording   subprocess storing every message with send / receive timestamps
+
+Selected by name through CONFIG['midi_backend'] (see make_backend).
+'''
+
+
+from array import array
+from os import chdir, getpid
+from struct import Struct
+from subprocess import Popen, PIPE, DEVNULL
+from multiprocessing import Process, Pipe
+from time import monotonic
+from typing import List, Tuple
+from utils.config import CONFIG
+from utils.Protocol import decode, reference_backend
+
+try:
+    from fcntl import ioctl
+    from termios import FIONREAD
+except ImportError:     # Windows: queue depth is unknown
+    ioctl = None
+
+
+def _unread(conn):
+    '''
+    Bytes written to the pipe of conn (its receiving end) and not read yet. None if unknown.
+    '''
+    if ioctl is None:
+        return None
+    buf = array('i', [0])
+    try:
+        ioctl(conn.fileno(), FIONREAD, buf)
+    except (OSError, ValueError):
+        return None
+    return buf[0]
+
+
+def util(conn, err):
+    chdir(CONFIG.get('java_path', '..'))
+    print("MIDI Process: ", getpid(), PIPE)
+    p = Popen(['java', 'JavaProg.MusicSheetReader', 'p'], stdin=PIPE, stdout=DEVNULL, stderr=PIPE)
+    while p.poll() is None:
+        try:
+            #err.send("::"*10+"JavaErr"+"::"*10+f"-> {[_ for _ in p.stderr]}")
+            p.stdin.write(conn.recv().encode())
+            p.stdin.flush()
+        except OSError:
+            print("SubP Poll: ", p.poll())
+    #err.send("::"*10+"JavaErr"+"::"*10+f"-> {[_ for _ in p.stderr]}")
+    print("::"*10+"JavaErr"+"::"*10+f"-> {[_ for _ in p.stderr]}")
+    #err.close()
+    #remove("../Error.log")
+
+
+class Backend:
+    '''
+    Interface of MidiPlayer backends.
+    protocol: 'text' - receives command strings through send
+              'binary' - receives utils.Protocol frames through send_bytes
+    protocols: the protocols the backend class supports
+    routes_channels: whether 'V<n>' channel selection of commands reaches the
+                     MIDI channel n (required by utils.MidiPlayer.MidiHub)
+    '''
+    protocol = 'text'
+    protocols = ('text', 'binary')
+    routes_channels = True
+
+    def start(self):
+        raise NotImplementedError
+
+    def stop(self):
+        raise NotImplementedError
+
+    def restart(self):
+        '''
+        Stops the backend and starts it again with fresh state.
+        Also starts a stopped backend.
+        '''
+        self.stop()
+        self.start()
+
+    @property
+    def running(self)->bool:
+        raise NotImplementedError
+
+    def send(self, notes:str):
+        raise NotImplementedError
+
+    def send_bytes(self, frame:bytes):
+        raise NotImplementedError
+
+    def fileno(self):
+        '''
+        Writable file descriptor of the backend pipe, None without one.
+        '''
+        return None
+
+    def queue_depth(self):
+        '''
+        Bytes sent and not yet read by the backend, None if unknown.
+        '''
+        return None
+
+
+class ProcessBackend(Backend):
+    '''
+    Backend process running target(conn, err), fed through a one-way Pipe.
+    '''
+
+    def __init__(self, target, protocol='text'):
+        self.target = target
+        self.protocol = protocol
+        self.reader, self.writer = Pipe(False)
+        self.err_reader, self.err_writer = Pipe(True)
+        self._process = self._new_process()
+
+    def _new_process(self):
+        return Process(target=self.target, args=(self.reader, self.err_writer))
+
+    def start(self):
+        self._process.start()
+
+    def stop(self):
+        self._process.terminate()
+
+    def restart(self):
+        if self._process._popen is not None:
+            self._process._popen.kill()
+            self._process.terminate()
+        self._process = self._new_process()
+        self.start()
+
+    @property
+    def running(self)->bool:
+        return self._process.is_alive()
+
+    def send(self, notes:str):
+        self.writer.send(notes)
+
+    def send_bytes(self, frame:bytes):
+        self.writer.send_bytes(frame)
+
+    def fileno(self):
+        return self.writer.fileno()
+
+    def queue_depth(self):
+        return _unread(self.reader)
+
+
+class JavaBackend(ProcessBackend):
+    protocols = ('text',)
+    routes_channels = False     # MusicSheetReader is not known to parse V<n>
+
+    def __init__(self):
+        super().__init__(util, 'text')
+
+
+class ReferenceBackend(ProcessBackend):
+    protocols = ('binary',)
+
+    def __init__(self):
+        super().__init__(reference_backend, 'binary')
+
+
+class NullBackend(Backend):
+    '''
+    Discards every message. No process, no pipe:
+    measures the cost of the engines alone.
+    '''
+
+    def __init__(self, protocol='text'):
+        self.protocol = protocol
+        self._running = False
+
+    def start(self):
+        self._running = True
+
+    def stop(self):
+        self._running = False
+
+    @property
+    def running(self)->bool:
+        return self._running
+
+    def send(self, notes:str):
+        pass
+
+    def send_bytes(self, frame:bytes):
+        pass
+
+    def queue_depth(self):
+        return 0
+
+
+_stamp = Struct('<d')
+
+
+def _recorder(conn):
+    '''
+    Process of RecordingBackend. Stores (send time, receive time, message)
+    per message; an empty message requests the records, which are sent back
+    and cleared.
+    '''
+    records = []
+    while True:
+        try:
+            msg = conn.recv_bytes()
+        except EOFError:
+            break
+        received = monotonic()
+        if msg == b'':
+            conn.send(records)
+            records = []
+            continue
+        sent, = _stamp.unpack_from(msg)
+        body = msg[_stamp.size:]
+        if body[:1] == b'T':
+            records.append((sent, received, body[1:].decode()))
+        else:
+            for e in decode(body[1:]):
+                records.append((sent, received, e))
+
+
+class RecordingBackend(Backend):
+    '''
+    Records every message in memory with its send and receive timestamps
+    (monotonic clock), in a subprocess behind a Pipe like the real backends,
+    so the records include the IPC latency.
+    Binary frames are recorded per decoded event.
+    '''
+
+    def __init__(self, protocol='text'):
+        self.protocol = protocol
+        self._new_process()
+
+    def _new_process(self):
+        self.conn, self._child = Pipe(True)
+        self._process = Process(target=_recorder, args=(self._child,), daemon=True)
+
+    def start(self):
+        self._process.start()
+
+    def stop(self):
+        self._process.terminate()
+
+    def restart(self):
+        '''
+        Stops the recorder and starts a new one on a new pipe: records so far are discarded.
+        '''
+        if self._process.is_alive():
+            self._process.terminate()
+            self._process.join()
+        self.conn.close()
+        self._new_process()
+        self.start()
+
+    @property
+    def running(self)->bool:
+        return self._process.is_alive()
+
+    def send(self, notes:str):
+        self.conn.send_bytes(_stamp.pack(monotonic()) + b'T' + notes.encode())
+
+    def send_bytes(self, frame:bytes):
+        self.conn.send_bytes(_stamp.pack(monotonic()) + b'B' + frame)
+
+    def fileno(self):
+        return self.conn.fileno()
+
+    def queue_depth(self):
+        return _unread(self._child)
+
+    def records(self)->List[Tuple]:
+        '''
+        Returns and clears the records so far:
+        List of (send time, receive time, command string or event).
+        '''
+        self.conn.send_bytes(b'')
+        return self.conn.recv()
+
+
+backends = dict(
+    java = JavaBackend,
+    python = ReferenceBackend,
+    null = NullBackend,
+    recording = RecordingBackend,
+)
+
+
+def make_backend(name=None, protocol=None)->Backend:
+    '''
+    Backend by name (default CONFIG['midi_backend']).
+    protocol (default CONFIG['midi_protocol']) applies to null / recording,
+    java and python have a fixed protocol: any other protocol raises ValueError.
+    '''
+    name = name or CONFIG.get('midi_backend', 'java')
+    try:
+        cls = backends[name]
+    except KeyError:
+        raise ValueError(f"Unknown MIDI backend '{name}'.\nValid backends:\n{tuple(backends)}")
+    if len(cls.protocols) == 1:
+        if protocol is not None and protocol not in cls.protocols:
+            raise ValueError(f"MIDI backend '{name}' has no '{protocol}' protocol.\nValid protocols:\n{cls.protocols}")
+        return cls()
+    return cls(protocol or CONFIG.get('midi_protocol', 'text'))
@@ -0,0 +1,131 @@
+'''
+Chord recognition: the reverse of Scale.chord.
+
+find_chord(chord) returns every (key, scale, degree) whose triad has the
+pitch classes of chord, with the chord's root, quality and inversion. The
+answers come from an index built once over every key x Scale.rules x degree,
+keyed by (12-bit pitch-class mask, bass pitch class), so a lookup is a dict
+access. Any voicing of the triad is recognized: octave doublings and the
+low_notes of Scale.chord do not change the key.
+
+Chords may be given as returned by Scale.chord ((semitone, octave), ...), as
+letter notes ("E3", "G3", "C4", or "E", "G", "C") or as semitones 1-12.
+Without octaves the first note is taken as the bass.
+'''
+
+
+from collections import namedtuple
+from functools import lru_cache
+from typing import Dict, Iterable, List, Tuple
+
+
+ChordMatch = namedtuple('ChordMatch', ('key', 'scale', 'degree', 'root', 'quality', 'inversion'))
+
+qualities = {
+    (4, 7): 'major',
+    (3, 7): 'minor',
+    (3, 6): 'diminished',
+    (4, 8): 'augmented',
+}
+
+
+@lru_cache(maxsize=None)
+def _chord_index(rules)->Dict[Tuple[int, int], Tuple[ChordMatch]]:
+    '''
+    Table of (pitch-class mask, bass pitch class) to the ChordMatches of every triad.
+
+    @params:
+        rules: Tuple of Scale.rules items. A change to Scale.rules builds a new table.
+    '''
+    from utils.Scale import Scale
+    index = {}
+    for key in range(1, 13):
+        for name, rule in rules:
+            notes = Scale._intervals(key, rule)
+            for degree in range(1, 8):
+                triad = tuple(notes[(degree-1+i) % 7] - 1 for i in (0, 2, 4))
+                root, third, fifth = triad
+                steps = ((third - root) % 12, (fifth - root) % 12)
+                mask = sum(1 << pc for pc in triad)
+                for inversion, bass in enumerate(triad):
+                    index.setdefault((mask, bass), []).append(ChordMatch(
+                        Scale.note_name[key-1], name, degree, Scale.note_name[root],
+                        qualities.get(steps, str(steps)), inversion,
+                    ))
+    return {k: tuple(v) for k, v in index.items()}
+
+
+def _note(note)->Tuple[int, int]:
+    '''
+    (pitch class 0-11, pitch or None) of a note.
+    '''
+    if isinstance(note, (tuple, list)):
+        s, o = note
+        return s - 1, s - 1 + 12*o
+    if isinstance(note, str):
+        from utils.Scale import Scale
+        name = note.rstrip('-0123456789')
+        pc = Scale.note_name.index(name.upper())
+        return pc, (pc + 12*int(note[len(name):]) if len(name) < len(note) else None)
+    return (note - 1) % 12, None
+
+
+def _key(chord)->Tuple[int, int]:
+    '''
+    (pitch-class mask, bass pitch class) of chord.
+    '''
+    notes = [_note(_) for _ in chord]
+    mask = 0
+    for pc, pitch in notes:
+        mask |= 1 << pc
+    if all(pitch is not None for pc, pitch in notes):
+        bass = min(notes, key=lambda _: _[1])[0]
+    else:
+        bass = notes[0][0]
+    return mask, bass
+
+
+def find_chord(chord, scale=None)->Tuple[ChordMatch]:
+    '''
+    ChordMatches of chord over every key and scale of Scale.rules (or of scale only).
+    Empty chords (rests) and non-triads match nothing.
+
+    @params:
+        chord: Collection of notes
+        scale: Scale - Optional
+    '''
+    if not chord:
+        return ()
+    return _matches(_key(chord), scale)
+
+
+def _matches(key, scale=None)->Tuple[ChordMatch]:
+    '''
+    ChordMatches of a _key, over every key and scale of Scale.rules (or of scale only).
+    '''
+    from utils.Scale import Scale
+    matches = _chord_index(tuple(Scale.rules.items())).get(key, ())
+    if scale is None:
+        return matches
+    name = Scale.note_name[scale.key-1]
+    return tuple(m for m in matches if m.key == name and m.scale == scale.name)
+
+
+def find_chords(chords:Iterable, scale=None)->List[Tuple[ChordMatch]]:
+    '''
+    Batch form of find_chord, e.g. for a chord_history, a ChordSequence or an
+    imported corpus. Chords with the same (mask, bass) key are matched once.
+    '''
+    memo = {}
+    res = []
+    for chord in chords:
+        if not chord:
+            res.append(())
+            continue
+        key = _key(chord)
+        try:
+            res.append(memo[key])
+        except KeyError:
+            matches = memo[key] = _matches(key, scale)
+            res.append(matches)
+    return res
@@ -14,6 +14,8 @@ class CircularOctave:
             self._elems = args
             
         self._cur = min(0, len(self._elems)-1)
+        self._rotations = {}    # root_idx -> rotated tuple of elements
+        self._array = None      # NumPy array of elements, built by gather
     
 
     def __next__(self) -> Tuple:
@@ -52,15 +54,48 @@ class CircularOctave:
             return (self._elems[index], oct)
             
         if isinstance(index, tuple):
+            elems, cur, n = self._elems, self._cur, len(self._elems)
+            root = elems[cur]
             res = []
             for i in index:
-                i, oct = divmod(self._cur+i, len(self))[::-1]
-                if self._elems[i] < self.root:
-                    oct += 1
-                res.append((self._elems[i], oct))
+                oct, i = divmod(cur+i, n)
+                e = elems[i]
+                res.append((e, oct+1 if e < root else oct))
             return tuple(res)
 
 
+    def gather(self, index):
+        """
+            Array form of obj[i, j, ...].
+            index: NumPy integer array (any shape), sequence of ints or slice
+                   (stop defaults to len(obj)).
+            
+            Returns Tuple(elements, octaves) of NumPy arrays shaped as index.
+        """
+        import numpy as np
+        if self._cur == -1:
+            raise IndexError("Empty")
+        if self._array is None:
+            self._array = np.array(self._elems)
+        if isinstance(index, slice):
+            start, stop, step = index.start or 0, index.stop, index.step or 1
+            index = np.arange(start, len(self) if stop is None else stop, step)
+        oct, i = np.divmod(self._cur + np.asarray(index, dtype=np.intp), len(self))
+        elems = self._array[i]
+        return elems, oct + (elems < self.root)
+
+
+    def _rotated(self) -> Tuple:
+        """
+            Elements starting at the root, cached per root_idx.
+        """
+        try:
+            return self._rotations[self._cur]
+        except KeyError:
+            rot = self._rotations[self._cur] = self._elems[self._cur:] + self._elems[:self._cur]
+            return rot
+
+
     @property
     def root(self) -> int:
         """
@@ -87,8 +122,7 @@ class CircularOctave:
 
 
     def __iter__(self):
-        for elem in (self._elems[self._cur:] + self._elems[:self._cur]):
-            yield elem
+        return iter(self._rotated())
 
 
     def __len__(self):
@@ -100,4 +134,4 @@ class CircularOctave:
     
 
     def __str__(self):
-        return str(self._elems[self._cur:] + self._elems[:self._cur])
+        return str(self._rotated())
@@ -0,0 +1,223 @@
+'''
+MidiPlayer command language to timed MIDI events.
+
+Commands are the strings sent through MidiPlayer.play, e.g.
+    "C3G3C4E4G4"    chord, sounding until muted / re-struck
+    "mC4E4G4--"     mute channel, then chord held for 2 units
+    "C4-D4-E4"      phrase: notes one unit apart
+    "I<51>"         program (instrument) change
+    "V<2>..."       send to channel 2 (MidiHub)
+Durations: '-' 1 unit, '_' 1/2 unit, '.' 1/4 unit.
+
+Events are Tuple(time, status, channel, data1, data2), status being
+the MIDI status nibble: NOTE_OFF, NOTE_ON, CONTROL, PROGRAM.
+'''
+
+
+import re
+from heapq import heappush, heappop
+from typing import Iterable, Iterator, List, Tuple
+
+
+NOTE_OFF = 0x80
+NOTE_ON = 0x90
+CONTROL = 0xB0
+PROGRAM = 0xC0
+ALL_NOTES_OFF = 123     # CONTROL number of mute ('m')
+
+durations = {'-': 1.0, '_': 0.5, '.': 0.25}
+note_name = ('C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B')
+
+_token = re.compile(r"V<(\d+)>|I<(\d+)>|([A-G]#?)(\d+)|([-_.])|([mM])|(q)")
+_order = {CONTROL: 0, NOTE_OFF: 1, PROGRAM: 2, NOTE_ON: 3}   # Order of events at equal times
+
+
+def midi_number(name:str, octave:int)->int:
+    '''
+    MIDI note number of a letter note. ("C", 4) -> 60
+    '''
+    return 12*(octave+1) + note_name.index(name)
+
+
+def tokens(command:str)->Iterator[Tuple]:
+    '''
+    (kind, value) tokens of a command, characters outside the language skipped:
+        ('note', midi number)   ('dur', units)      ('mute', None)
+        ('program', number)     ('channel', number) ('quit', None)
+    '''
+    for m in _token.finditer(command):
+        v, i, name, octave, dur, mute, quit = m.groups()
+        if dur:
+            yield 'dur', durations[dur]
+        elif name:
+            yield 'note', midi_number(name, int(octave))
+        elif mute:
+            yield 'mute', None
+        elif i:
+            yield 'program', int(i) % 128
+        elif v:
+            yield 'channel', int(v) % 16
+        else:
+            yield 'quit', None
+
+
+def timed(tokens:Iterable[Tuple], onset=0.0, unit=0.5, channel=0, velocity=100)->List[Tuple]:
+    '''
+    Events of (kind, value) tokens (see tokens), ordered by time. Params as parse.
+    '''
+    events = []
+    cursor = onset
+    pending = []
+    length = 0.0
+
+    def flush():
+        nonlocal cursor, length
+        for n in pending:
+            events.append((cursor, NOTE_ON, channel, n, velocity))
+            if length:
+                events.append((cursor + length*unit, NOTE_OFF, channel, n, 0))
+        cursor += length*unit
+        pending.clear()
+        length = 0.0
+
+    for kind, value in tokens:
+        if kind == 'dur':
+            if pending:
+                length += value
+            else:
+                cursor += value*unit
+            continue
+        if kind == 'note':
+            if length:
+                flush()
+            if 0 <= value < 128:
+                pending.append(value)
+            continue
+        flush()
+        if kind == 'mute':
+            events.append((cursor, CONTROL, channel, ALL_NOTES_OFF, 0))
+        elif kind == 'program':
+            events.append((cursor, PROGRAM, channel, value, 0))
+        elif kind == 'channel':
+            channel = value
+        elif kind == 'quit':
+            break
+    flush()
+
+    events.sort(key=lambda e: (e[0], _order[e[1]]))
+    return events
+
+
+def parse(command:str, onset=0.0, unit=0.5, channel=0, velocity=100)->List[Tuple]:
+    '''
+    Events of one command, ordered by time.
+    Notes without a duration get no NOTE_OFF (they sustain);
+    mute is a CONTROL ALL_NOTES_OFF event.
+
+    @params:
+        command: str - MidiPlayer command
+        onset: float - Time of the command, in seconds
+        unit: float - Length of '-' in seconds
+        channel: int - Channel unless the command selects one with V<n>
+    '''
+    return timed(tokens(command), onset, unit, channel, velocity)
+
+
+def command_events(command, onset=0.0, unit=0.5, channel=0)->List[Tuple]:
+    '''
+    Events of a command string, or of a compiled phrase (utils.Phrase) without parsing it again.
+    '''
+    if isinstance(command, str):
+        return parse(command, onset, unit, channel)
+    return (command.on(channel) if channel else command).events(onset, unit)
+
+
+class Timeline:
+    '''
+    Merges the events of successive commands into one time-ordered stream
+    of NOTE_ON / NOTE_OFF / PROGRAM events, the way a synthesizer receiving
+    the commands would sound them:
+        mute ends every sounding note of its channel,
+        striking a sounding note ends it first,
+        NOTE_OFF of a note that is not sounding is dropped,
+        notes still sounding at close() end there.
+    Memory is bounded by the events still in the future of the last onset.
+    '''
+
+    def __init__(self, unit=0.5, channel=0):
+        self.unit = unit
+        self.channel = channel
+        self._heap = []
+        self._seq = 0
+        self._sounding = {}     # (channel, note) -> True
+        self.time = 0.0
+
+    def push(self, events:Iterable[Tuple]):
+        '''
+        Adds events with times at or after the last flushed time.
+        '''
+        for e in events:
+            heappush(self._heap, (e[0], _order[e[1]], self._seq, e))
+            self._seq += 1
+
+    def feed(self, onset:float, command:str)->List[Tuple]:
+        '''
+        Adds a command played at onset. Returns the events before onset,
+        which no later command can change.
+        '''
+        out = self.flush(onset)
+        self.push(parse(command, onset, self.unit, self.channel))
+        return out
+
+    def flush(self, until:float)->List[Tuple]:
+        '''
+        Resolves and returns events with time <= until.
+        '''
+        out = []
+        heap, sounding = self._heap, self._sounding
+        while heap and heap[0][0] <= until:
+            time, _, _, e = heappop(heap)
+            status, ch, n = e[1], e[2], e[3]
+            if status == NOTE_ON:
+                if (ch, n) in sounding:
+                    out.append((time, NOTE_OFF, ch, n, 0))
+                sounding[ch, n] = True
+                out.append(e)
+            elif status == NOTE_OFF:
+                if sounding.pop((ch, n), None):
+                    out.append(e)
+            elif status == CONTROL and n == ALL_NOTES_OFF:
+                for key in [_ for _ in sounding if _[0] == ch]:
+                    del sounding[key]
+                    out.append((time, NOTE_OFF, ch, key[1], 0))
+            else:
+                out.append(e)
+        if until != float('inf'):
+            self.time = max(self.time, until)
+        return out
+
+    def close(self, end:float=None, tail=0.0)->List[Tuple]:
+        '''
+        Resolves every remaining event and ends sounding notes at end
+        (default: tail seconds after the last event).
+        '''
+        out = self.flush(float('inf'))
+        if out:
+            self.time = max(self.time, out[-1][0])
+        end = self.time + tail if end is None else max(end, self.time)
+        for ch, n in self._sounding:
+            out.append((end, NOTE_OFF, ch, n, 0))
+        self._sounding.clear()
+        return out
+
+
+def resolve(timed:Iterable[Tuple[float, List[Tuple]]], *, end=None, tail=0.0, unit=0.5, channel=0)->Iterator[Tuple]:
+    '''
+    Lazily yields the time-ordered stream of (onset, events) pairs
+    (nondecreasing onsets) through a Timeline. See Timeline.close for end / tail.
+    '''
+    timeline = Timeline(unit, channel)
+    for onset, events in timed:
+        yield from timeline.flush(onset)
+        timeline.push(events)
+    yield from timeline.close(end, tail)
@@ -0,0 +1,165 @@
+'''
+Playback latency instrumentation.
+
+Per event sent through MidiPlayer.play, a LatencyMonitor records
+    intended    deadline of the event (monotonic clock), e.g. from Scheduler
+    sent        time play started sending
+    done        time the command was written to the backend
+    build       seconds spent building the command (rendering letter notes)
+    late        sent - intended
+    ipc         done - sent, time in the pipe write
+    depth       bytes queued in the backend pipe, unread by the backend (None if unknown)
+A growing depth points at the backend, a large ipc at the pipe, a large
+build at string building, and late without either at scheduling.
+'''
+
+
+import csv
+import json
+from bisect import bisect_left
+from collections import deque, namedtuple
+from typing import Callable, Dict, List
+
+
+LatencyEvent = namedtuple('LatencyEvent', 'command intended sent done build late ipc depth')
+
+TIME_BOUNDS = tuple(1e-6 * 2**_ for _ in range(21))     # 1us .. ~1s
+DEPTH_BOUNDS = tuple(2**_ for _ in range(21))           # 1B .. 1MiB
+
+
+class Histogram:
+    '''
+    Rolling histogram of the last window samples.
+    Bucket i counts samples <= bounds[i] (and above bounds[i-1]); the last bucket counts the rest.
+    Buckets are counted when queried, recording is a single append.
+    '''
+
+    def __init__(self, bounds=TIME_BOUNDS, window=1024):
+        self.bounds = tuple(bounds)
+        self.values = deque(maxlen=window)
+        self.add = self.values.append
+
+    def percentile(self, p:float)->float:
+        '''
+        p-th percentile (0-100) of the window. None when empty.
+        '''
+        if not self.values:
+            return None
+        ordered = sorted(self.values)
+        return ordered[min(len(ordered)-1, int(p/100*len(ordered)))]
+
+    def summary(self)->Dict:
+        n = len(self.values)
+        return dict(
+            count=n,
+            mean=sum(self.values)/n if n else None,
+            p50=self.percentile(50),
+            p90=self.percentile(90),
+            p99=self.percentile(99),
+            max=max(self.values) if n else None,
+        )
+
+    def buckets(self)->List:
+        '''
+        List of (upper bound, count) of the window, None bounding the overflow bucket.
+        '''
+        counts = [0]*(len(self.bounds) + 1)
+        for v in self.values:
+            counts[bisect_left(self.bounds, v)] += 1
+        return list(zip((*self.bounds, None), counts))
+
+    def clear(self):
+        self.values.clear()
+
+    def __len__(self):
+        return len(self.values)
+
+
+class LatencyMonitor:
+    '''
+    Rolling histograms of build / late / ipc / depth over the last window events.
+
+    @params:
+        window: int - Events kept by the histograms
+        hook: callable(LatencyEvent) - Optional. Receives every event, e.g. CsvLog / JsonLog
+    '''
+    metrics = ('build', 'late', 'ipc', 'depth')
+
+    def __init__(self, window=1024, hook:Callable=None):
+        self.histograms = {
+            _: Histogram(DEPTH_BOUNDS if _ == 'depth' else TIME_BOUNDS, window)
+            for _ in self.metrics
+        }
+        self.hooks = [hook] if hook is not None else []
+
+    def record(self, command:str, *, intended:float, sent:float, done:float, build=0.0, depth=None):
+        h = self.histograms
+        h['build'].add(build)
+        h['late'].add(sent - intended)
+        h['ipc'].add(done - sent)
+        if depth is not None:
+            h['depth'].add(depth)
+        if self.hooks:
+            e = LatencyEvent(str(command), intended, sent, done, build, sent - intended, done - sent, depth)
+            for hook in self.hooks:
+                hook(e)
+
+    def __getitem__(self, metric:str)->Histogram:
+        return self.histograms[metric]
+
+    def summary(self)->Dict:
+        '''
+        Dict of metric -> Histogram.summary()
+        '''
+        return {k: h.summary() for k, h in self.histograms.items()}
+
+    def clear(self):
+        for h in self.histograms.values():
+            h.clear()
+
+    def __repr__(self):
+        def ms(_):
+            return "-" if _ is None else f"{_*1000:.3f}ms"
+        s = self.summary()
+        return (
+            f"<LatencyMonitor {s['late']['count']} events:"
+            f" late p50 {ms(s['late']['p50'])} p99 {ms(s['late']['p99'])},"
+            f" build p99 {ms(s['build']['p99'])}, ipc p99 {ms(s['ipc']['p99'])},"
+            f" depth max {s['depth']['max']}>"
+        )
+
+
+class CsvLog:
+    '''
+    LatencyMonitor hook writing one CSV row per event. file: path or text file object.
+    '''
+
+    def __init__(self, file):
+        self._own = isinstance(file, str)
+        self.file = open(file, 'w', newline='') if self._own else file
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(LatencyEvent._fields)
+
+    def __call__(self, event:LatencyEvent):
+        self.writer.writerow(event)
+
+    def close(self):
+        if self._own:
+            self.file.close()
+
+
+class JsonLog:
+    '''
+    LatencyMonitor hook writing one JSON object per line and event. file: path or text file object.
+    '''
+
+    def __init__(self, file):
+        self._own = isinstance(file, str)
+        self.file = open(file, 'w') if self._own else file
+
+    def __call__(self, event:LatencyEvent):
+        self.file.write(json.dumps(event._asdict()) + "\n")
+
+    def close(self):
+        if self._own:
+            self.file.close()
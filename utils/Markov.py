@@ -0,0 +1,186 @@
+'''
+N-gram transition models with alias-method sampling.
+
+Symbols are small ints (scale degrees, 0 for silence). A model of order n
+counts every symbol after each context of the last 0..n symbols; sampling
+backs off to shorter contexts when the full one was never seen.
+Each context's distribution is compiled into an alias table (Vose), so a
+draw costs two random numbers whatever the alphabet size.
+
+Binary file layout (little-endian):
+    header      <4s B B>    magic b'MKV1', order, number of models
+    model       <B> name length, name (ascii), <I> number of contexts
+    context     <B> length, symbols <B each>, <H> number of entries
+    entry       <B I> symbol, count
+'''
+
+
+from collections import defaultdict
+from random import random
+from struct import Struct
+from typing import Dict, Iterable, Sequence, Tuple
+
+
+MAGIC = b'MKV1'
+_header = Struct('<4sBB')
+_entry = Struct('<BI')
+
+
+class AliasTable:
+    '''
+    Constant-time sampling of a discrete distribution (Vose's alias method).
+
+    @params:
+        symbols: Sequence - Outcomes
+        weights: Sequence[float] - Nonnegative weights, not all zero
+    '''
+    __slots__ = ('symbols', 'prob', 'alias', 'n')
+
+    def __init__(self, symbols:Sequence, weights:Sequence[float]):
+        n = len(symbols)
+        total = float(sum(weights))
+        if not n or total <= 0:
+            raise ValueError("AliasTable needs a positive total weight")
+        scaled = [w*n/total for w in weights]
+        prob = [1.0]*n
+        alias = list(range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            prob[s] = scaled[s]
+            alias[s] = l
+            scaled[l] -= 1.0 - scaled[s]
+            (small if scaled[l] < 1.0 else large).append(l)
+        self.symbols = tuple(symbols)
+        self.prob = prob
+        self.alias = alias
+        self.n = n
+
+    def sample(self, rand=random):
+        i = int(rand()*self.n)
+        return self.symbols[i] if rand() < self.prob[i] else self.symbols[self.alias[i]]
+
+
+def _counter():
+    return defaultdict(int)
+
+
+class NGram:
+    '''
+    Counts of symbols after contexts of length 0..order.
+    '''
+
+    def __init__(self, order=2):
+        self.order = order
+        self.counts: Dict[Tuple, Dict[int, int]] = defaultdict(_counter)  # Picklable, for worker processes
+        self._tables = {}
+
+    def fit(self, sequences:Iterable[Sequence[int]]):
+        '''
+        Adds the transitions of each sequence (of symbols 0-255). Returns self.
+        '''
+        order, counts = self.order, self.counts
+        for seq in sequences:
+            seq = tuple(seq)
+            for i, s in enumerate(seq):
+                for k in range(min(order, i) + 1):
+                    counts[seq[i-k:i]][s] += 1
+        self._tables = {}
+        return self
+
+    def table(self, context:Tuple)->AliasTable:
+        '''
+        AliasTable of the longest suffix of context with counts. Tables are built once.
+        '''
+        context = tuple(context)[-self.order:] if self.order else ()
+        while True:
+            try:
+                return self._tables[context]
+            except KeyError:
+                pass
+            if context in self.counts:
+                c = self.counts[context]
+                t = self._tables[context] = AliasTable(tuple(c), tuple(c.values()))
+                return t
+            if not context:
+                raise ValueError("Untrained model: fit it or load one first")
+            context = context[1:]
+
+    def sample(self, context:Tuple=(), rand=random)->int:
+        return self.table(context).sample(rand)
+
+    def __len__(self):
+        return len(self.counts)
+
+    def __bool__(self):
+        return bool(self.counts)
+
+    def to_bytes(self)->bytes:
+        out = bytearray()
+        out += len(self.counts).to_bytes(4, 'little')
+        for ctx, c in self.counts.items():
+            out.append(len(ctx))
+            out += bytes(ctx)
+            out += len(c).to_bytes(2, 'little')
+            for s, n in c.items():
+                out += _entry.pack(s, n)
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data, order, offset=0)->Tuple:
+        '''
+        Returns Tuple(NGram, offset after it).
+        '''
+        model = cls(order)
+        view = memoryview(data)
+        contexts = int.from_bytes(view[offset:offset+4], 'little')
+        offset += 4
+        for _ in range(contexts):
+            k = view[offset]
+            ctx = tuple(view[offset+1:offset+1+k])
+            offset += 1 + k
+            entries = int.from_bytes(view[offset:offset+2], 'little')
+            offset += 2
+            c = model.counts[ctx]
+            for s, n in _entry.iter_unpack(view[offset:offset+entries*_entry.size]):
+                c[s] = n
+            offset += entries*_entry.size
+        return model, offset
+
+
+def save(models:Dict[str, NGram], file, order:int):
+    '''
+    Writes models (name -> NGram of the given order) to file (path or binary file object).
+    '''
+    data = bytearray(_header.pack(MAGIC, order, len(models)))
+    for name, model in models.items():
+        data.append(len(name))
+        data += name.encode('ascii')
+        data += model.to_bytes()
+    if isinstance(file, str):
+        with open(file, 'wb') as f:
+            f.write(data)
+    else:
+        file.write(data)
+
+
+def load(file)->Tuple[int, Dict[str, NGram]]:
+    '''
+    Reads a file of save. Returns Tuple(order, models).
+    '''
+    if isinstance(file, str):
+        with open(file, 'rb') as f:
+            data = f.read()
+    else:
+        data = file.read()
+    magic, order, n = _header.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(f"Not a Markov model file: {magic!r}")
+    offset = _header.size
+    models = {}
+    for _ in range(n):
+        k = data[offset]
+        name = bytes(data[offset+1:offset+1+k]).decode('ascii')
+        models[name], offset = NGram.from_bytes(data, order, offset+1+k)
+    return order, models
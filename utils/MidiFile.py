@@ -0,0 +1,151 @@
+'''
+Offline Standard MIDI File rendering of engine output, without MidiPlayer.
+
+Everything is rendered in memory from the same commands MidiPlayer would
+receive (see utils.Command), much faster than real time.
+'''
+
+
+import os
+from itertools import chain
+from struct import pack
+from typing import Iterable, Iterator, List, Tuple
+from utils.Command import resolve, parse, command_events, note_name, NOTE_ON, CONTROL, PROGRAM, ALL_NOTES_OFF
+
+
+TICKS_PER_BEAT = 480
+TEMPO = 500000      # Microseconds per beat (120 bpm): 1 second = 960 ticks
+
+
+def _vlq(n:int)->bytes:
+    '''
+    MIDI variable-length quantity.
+    '''
+    res = [n & 0x7F]
+    n >>= 7
+    while n:
+        res.append(0x80 | (n & 0x7F))
+        n >>= 7
+    return bytes(reversed(res))
+
+
+def smf(events:Iterable[Tuple])->bytes:
+    '''
+    Format 0 Standard MIDI File of time-ordered events (see utils.Command).
+    '''
+    ticks = TICKS_PER_BEAT*1000000/TEMPO
+    track = bytearray(b'\x00\xFF\x51\x03' + TEMPO.to_bytes(3, 'big'))
+    last = 0
+    for time, status, ch, a, b in events:
+        tick = round(time*ticks)
+        track += _vlq(max(tick - last, 0))
+        last = max(tick, last)
+        if status == PROGRAM:
+            track += bytes((status | ch, a))
+        else:
+            track += bytes((status | ch, a, b))
+    track += b'\x00\xFF\x2F\x00'
+    return (
+        b'MThd' + pack('>IHHH', 6, 0, 1, TICKS_PER_BEAT)
+        + b'MTrk' + pack('>I', len(track)) + bytes(track)
+    )
+
+
+def blob_events(blob, *, delay=0.25, sustain=True, octave=3, channel=0, velocity=100)->Iterator[Tuple[float, List[Tuple]]]:
+    '''
+    Yields (onset, events) per item of blob, as Engine.play would send them.
+    Items are in any form Engine.play accepts; silence yields no events.
+    '''
+    for i, b in enumerate(blob):
+        onset = i*delay
+        if len(b) == 0:
+            continue
+        if isinstance(b[0], str):
+            yield onset, parse(("" if sustain else "m") + "".join(b), onset, channel=channel, velocity=velocity)
+            continue
+        events = [] if sustain else [(onset, CONTROL, channel, ALL_NOTES_OFF, 0)]
+        for n, o in b:
+            note = 12*(octave+o+1) + n-1
+            if 0 <= note < 128:     # Out of MIDI range: dropped, as in Command.parse
+                events.append((onset, NOTE_ON, channel, note, velocity))
+        yield onset, events
+
+
+def render_events(timed:Iterable[Tuple[float, List[Tuple]]], *, end=None, tail=0.0, program=None, unit=0.5, channel=0)->bytes:
+    '''
+    SMF bytes of (onset, events) pairs with nondecreasing onsets.
+
+    @params:
+        end: float - Optional. Time at which sustained notes end
+        tail: float - Without end, sustained notes end tail seconds after the last event
+        program: int - Optional. Instrument set at time 0
+        unit: float - Length of '-' in seconds, for commands
+    '''
+    events = resolve(timed, end=end, tail=tail, unit=unit, channel=channel)
+    if program is not None:
+        events = chain(((0.0, PROGRAM, channel, int(program), 0),), events)
+    return smf(events)
+
+
+def render(blob, *, delay=0.25, sustain=True, octave=3, program=None, channel=0)->bytes:
+    '''
+    SMF bytes of an engine sequence: get_note_sequence / get_chord_sequence result,
+    their generators, NoteSequence or ChordSequence. Params as Engine.play;
+    delay is the time between items (Engine._delay).
+    '''
+    n = len(blob) if hasattr(blob, '__len__') else None
+    return render_events(
+        blob_events(blob, delay=delay, sustain=sustain, octave=octave, channel=channel),
+        end=None if n is None else n*delay,
+        tail=delay,
+        program=program,
+        channel=channel,
+    )
+
+
+def render_commands(commands:Iterable[Tuple[float, str]], *, unit=0.5, program=None, channel=0, end=None)->bytes:
+    '''
+    SMF bytes of (onset, MidiPlayer command) pairs. Commands may be compiled phrases (utils.Phrase).
+    '''
+    return render_events(
+        ((onset, command_events(c, onset, unit, channel)) for onset, c in commands),
+        end=end,
+        tail=unit,
+        program=program,
+        unit=unit,
+        channel=channel,
+    )
+
+
+def render_progression(chords, *, delay=0.5, mute_prev=False, octave=4, unit=0.5, program=None)->bytes:
+    '''
+    SMF bytes of Scale.chord_progression(chords, delay, mute_prev).
+    '''
+    def commands():
+        for i, chord in enumerate(chords):
+            notes = "".join(f"{note_name[n-1]}{octave+o}" for n, o in chord)
+            yield i*delay, ('m' if mute_prev else '') + notes + '--'
+    return render_commands(commands(), unit=unit, program=program)
+
+
+def render_phrase(phrase, *, unit=0.5, program=None)->bytes:
+    '''
+    SMF bytes of a Scale.phrase string, e.g. "C4-D4-E4--", or of Scale.compile_phrase result.
+    '''
+    return render_commands(((0.0, phrase),), unit=unit, program=program)
+
+
+def render_many(blobs:Iterable, directory=None, *, prefix="sequence", **kwargs)->Iterator:
+    '''
+    Bulk export. Renders each blob with render(blob, **kwargs).
+    Yields SMF bytes, or with directory, writes <prefix>_<i>.mid files and yields their paths.
+    '''
+    for i, blob in enumerate(blobs):
+        data = render(blob, **kwargs)
+        if directory is None:
+            yield data
+            continue
+        path = os.path.join(directory, f"{prefix}_{i:06d}.mid")
+        with open(path, 'wb') as f:
+            f.write(data)
+        yield path
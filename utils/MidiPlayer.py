@@ -1,27 +1,12 @@
-from io import SEEK_END
-from os import chdir, getpid, remove
-from subprocess import Popen, PIPE, DEVNULL
-from multiprocessing import Process, Pipe
-from utils.config import CONFIG
+import asyncio
+from contextlib import contextmanager
+from time import monotonic
+from utils.Command import command_events
+from utils.Protocol import FrameWriter
+from utils.Backend import Backend, make_backend, backends, util
+from utils.Latency import LatencyMonitor
 
 
-def util(conn, err):
-    chdir(CONFIG.get('java_path', '..'))
-    print("MIDI Process: ", getpid(), PIPE)
-    p = Popen(['java', 'JavaProg.MusicSheetReader', 'p'], stdin=PIPE, stdout=DEVNULL, stderr=PIPE)
-    while p.poll() is None:
-        try:
-            #err.send("::"*10+"JavaErr"+"::"*10+f"-> {[_ for _ in p.stderr]}")
-            p.stdin.write(conn.recv().encode())
-            p.stdin.flush()
-        except OSError:
-            print("SubP Poll: ", p.poll())
-    #err.send("::"*10+"JavaErr"+"::"*10+f"-> {[_ for _ in p.stderr]}")
-    print("::"*10+"JavaErr"+"::"*10+f"-> {[_ for _ in p.stderr]}")
-    #err.close()
-    #remove("../Error.log")
-    
-
 class MidiPlayer:
 
     class UninitializedError(Exception):
@@ -55,11 +40,24 @@ class MidiPlayer:
             raise self.InvalidInstrument()
         
 
-    def __init__(self, file=None, fileno=4):
-        self.__reader__, self.__writer__ = Pipe(False)
-        self.__err_reader__, self.__err_writer__ = Pipe(True)
-        self._process = Process(target=util, args=(self.__reader__, self.__err_writer__))
+    unit = 0.5      # Seconds of one '-' in commands, for the binary protocol
+    
+    def __init__(self, file=None, fileno=4, protocol=None, backend=None):
+        '''
+        backend: Backend, or its name in utils.Backend.backends. Default: CONFIG['midi_backend']
+        protocol: 'text' / 'binary', for backends without a fixed protocol (null, recording)
+        '''
+        self.backend = backend if isinstance(backend, Backend) else make_backend(backend, protocol)
         self.__instrument = MidiPlayer.Instrument()
+        self._frame = FrameWriter(self.backend)
+        self._batch = 0
+        self._pending = []     # Latency records of the frame being batched
+        self._stopped = False
+        self.latency = LatencyMonitor()     # See utils.Latency. None disables recording
+    
+    @property
+    def protocol(self):
+        return self.backend.protocol
     
     @property
     def instrument(self):
@@ -73,42 +71,136 @@ class MidiPlayer:
     
     def listen(function):
         def _wrapper(self, *args, **kwargs):
-            print("MIDI ERROR Poll", self.__err_reader__.poll(), self.__err_writer__.closed)
-            if self.__err_reader__.poll() or self.__err_writer__.closed:
-                print(self.__err_reader__.recv())
+            err_reader, err_writer = self.backend.err_reader, self.backend.err_writer
+            print("MIDI ERROR Poll", err_reader.poll(), err_writer.closed)
+            if err_reader.poll() or err_writer.closed:
+                print(err_reader.recv())
             #    self.__reader__.close()
             #    self.__err_reader__.close()
             #    raise MidiPlayer.MIDIError()
             function(self, *args, **kwargs)
-            if self.__err_reader__.poll() or self.__err_writer__.closed:
-                print(self.__err_reader__.recv())
+            if err_reader.poll() or err_writer.closed:
+                print(err_reader.recv())
             #    self.__reader__.close()
             #    self.__err_reader__.close()
             #    raise MidiPlayer.MIDIError()
         
         return _wrapper
         
+    def _send(self, notes):
+        if self.protocol == 'binary':
+            self._frame.add(command_events(notes, monotonic(), self.unit))
+            if not self._batch:
+                self._frame.flush()
+        else:
+            self.backend.send(str(notes))     # Compiled phrases send their command
+    
+    def _record(self, notes, at, build, sent):
+        '''
+        Records the latency of one play. Inside a binary batch, the frame is
+        written on batch exit, so the record waits for it.
+        '''
+        if self.latency is None:
+            return
+        if self._batch and self.protocol == 'binary':
+            self._pending.append((notes, sent if at is None else at, build, sent))
+            return
+        self.latency.record(
+            notes,
+            intended=sent if at is None else at,
+            sent=sent,
+            done=monotonic(),
+            build=build,
+            depth=self.backend.queue_depth(),
+        )
+    
     #@listen
-    def play(self, notes):
+    def play(self, notes, *, at=None, build=0.0):
+        '''
+        Sends a command.
+        at: float - Optional. Intended send time (monotonic), for latency records
+        build: float - Optional. Seconds spent building notes, for latency records
+        '''
         if not self.running:
             raise self.UninitializedError()
 
-        self.__writer__.send(notes)
+        sent = monotonic()
+        self._send(notes)
+        self._record(notes, at, build, sent)
         
         #if self.rc.poll():
         #    raise self.MIDIError()
 
+    async def aplay(self, notes, *, at=None, build=0.0):
+        '''
+        Async form of play. Waits on the running event loop for the pipe
+        to be writable instead of blocking the loop in send.
+        '''
+        if not self.running:
+            raise self.UninitializedError()
+        
+        try:
+            lock = self.__async_lock
+        except AttributeError:
+            lock = self.__async_lock = asyncio.Lock()
+        
+        async with lock:    # The loop keeps one writer callback per fd
+            loop = asyncio.get_running_loop()
+            fd = self.backend.fileno()
+            writable = loop.create_future()
+            try:
+                if fd is None:
+                    raise NotImplementedError
+                loop.add_writer(fd, lambda: writable.done() or writable.set_result(None))
+            except NotImplementedError:     # No pipe, or event loops without add_writer (Windows Proactor)
+                pass
+            else:
+                try:
+                    await writable
+                finally:
+                    loop.remove_writer(fd)
+            sent = monotonic()
+            self._send(notes)
+            self._record(notes, at, build, sent)
+
+    @contextmanager
+    def batch(self):
+        '''
+        Context of one scheduling tick. With the binary protocol, the events
+        of every play inside it are sent as one frame on exit.
+        '''
+        self._batch += 1
+        try:
+            yield self
+        finally:
+            self._batch -= 1
+            if not self._batch and self.protocol == 'binary':
+                self._frame.flush()
+                if self._pending and self.latency is not None:
+                    done, depth = monotonic(), self.backend.queue_depth()
+                    for notes, at, build, sent in self._pending:
+                        self.latency.record(notes, intended=at, sent=sent, done=done, build=build, depth=depth)
+                self._pending.clear()
+
     def start(self):
-        self._process.start()
-        print("start process alive ", self._process.is_alive())
+        '''
+        Starts the backend. After stop, the backend is restarted with fresh state:
+        backend processes cannot be started twice.
+        '''
+        if self._stopped:
+            self._stopped = False
+            self.backend.restart()
+        else:
+            self.backend.start()
 
     def stop(self):
         self.play('q')
-        self._process.terminate()
+        self.backend.stop()
+        self._stopped = True
     
     @property
     def running(self):
-        return self._process.is_alive()
+        return not self._stopped and self.backend.running
         
     @property
     def mute(self):
@@ -120,14 +212,172 @@ class MidiPlayer:
         
     def refresh(self):
         self.play('q')
-        self._process._popen.kill()
-        self._process.terminate()
-        self._process = Process(target=util, args=(self.__reader__,))
-        self.start()
+        self.backend.restart()
         
     def __del__(self):
+        if getattr(self, 'backend', None) is not None and self.running:     # __init__ may have failed
+            self.backend.stop()
+
+
+class MidiHub:
+    '''
+    One MidiPlayer backend shared by many Scales / Engines.
+    
+    Each client gets a MidiChannel bound to its own MIDI channel and instrument.
+    Commands reach the backend prefixed with 'V<channel>', so play, instrument
+    changes and mute only affect the sender's channel. The player's backend
+    must route channels (Backend.routes_channels: not java), else ValueError.
+    '''
+    
+    class NoFreeChannel(Exception):
+        def __init__(self):
+            self.message = "All MIDI channels of the hub are in use"
+            super().__init__(self.message)
+    
+    
+    class ReleasedChannel(Exception):
+        def __init__(self):
+            self.message = "MIDI channel was released, get a new one with MidiHub.channel()"
+            super().__init__(self.message)
+    
+    
+    channels = tuple(_ for _ in range(16) if _ != 9)    # Channel 9 is reserved for percussion
+    _shared = None
+    
+    def __init__(self, player=None):
+        self.player = player or MidiPlayer()
+        if not self.player.backend.routes_channels:
+            raise ValueError(
+                f"MIDI backend {type(self.player.backend).__name__} does not route channels.\n"
+                f"Valid backends:\n{tuple(k for k, v in backends.items() if v.routes_channels)}"
+            )
+        self._free = list(self.channels)
+        self._clients = {}
+    
+    @classmethod
+    def shared(cls):
+        '''
+        Process-wide hub, created on first use.
+        '''
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+    
+    def channel(self, instrument=0):
+        '''
+        Allocates a free channel. Returns MidiChannel.
+        '''
+        if not self._free:
+            raise self.NoFreeChannel()
+        ch = MidiChannel(self, self._free.pop(0), instrument)
+        self._clients[ch.channel] = ch
+        return ch
+    
+    def release(self, ch):
+        '''
+        Mutes and frees the channel. Stops the backend when no channel is left;
+        the next start creates a new one.
+        ch is invalidated: it can no longer play on the channel number, which
+        may be handed to another client.
+        '''
+        if self._clients.get(ch.channel) is not ch:
+            return
+        del self._clients[ch.channel]
+        if self.running:
+            self.send(ch.channel, 'm')
+        ch._hub = None
+        self._free.append(ch.channel)
+        if not self._clients and self.running:
+            self.player.stop()
+    
+    def send(self, channel, notes, **timing):
+        self.player.play(notes.on(channel) if hasattr(notes, 'on') else f"V<{channel}>{notes}", **timing)
+    
+    async def asend(self, channel, notes, **timing):
+        await self.player.aplay(notes.on(channel) if hasattr(notes, 'on') else f"V<{channel}>{notes}", **timing)
+    
+    @property
+    def latency(self):
+        return self.player.latency
+    
+    def batch(self):
+        return self.player.batch()
+    
+    def start(self):
+        if self.running:
+            return
+        self.player.start()
+        for ch, client in self._clients.items():
+            self.send(ch, f"I<{client.instrument}>")
+    
+    @property
+    def running(self):
+        return self.player.running
+
+
+class MidiChannel:
+    '''
+    MidiPlayer interface over one channel of a MidiHub.
+    '''
+    
+    def __init__(self, hub, channel, instrument=0):
+        self._hub = hub
+        self.channel = channel
+        self.__instrument = MidiPlayer.Instrument(instrument)
+    
+    @property
+    def instrument(self):
+        return self.__instrument
+    
+    @instrument.setter
+    def instrument(self, instrument):
+        self.__instrument = MidiPlayer.Instrument(instrument)
         if self.running:
-            self._process.terminate()
+            self.play(f"I<{self.instrument}>")
+    
+    @property
+    def hub(self):
+        '''
+        Property: MidiHub of the channel. Raises MidiHub.ReleasedChannel after stop.
+        '''
+        if self._hub is None:
+            raise MidiHub.ReleasedChannel()
+        return self._hub
+    
+    def play(self, notes, **timing):
+        self.hub.send(self.channel, notes, **timing)
+    
+    async def aplay(self, notes, **timing):
+        await self.hub.asend(self.channel, notes, **timing)
+    
+    @property
+    def latency(self):
+        return self.hub.latency
+    
+    def batch(self):
+        return self.hub.batch()
+    
+    def start(self):
+        self.hub.start()
+    
+    def stop(self):
+        if self._hub is not None:
+            self._hub.release(self)
+    
+    @property
+    def running(self):
+        return self._hub is not None and self._hub.running
+    
+    @property
+    def mute(self):
+        try:
+            self.play('m')
+            return True
+        except (MidiPlayer.UninitializedError, MidiHub.ReleasedChannel):
+            return False
+    
+    def __repr__(self):
+        return f"<MidiChannel {self.channel}: {self.instrument.name}{'' if self._hub else ' (released)'}>"
 
 
 MidiPlayer.Instrument.instruments = (
@@ -0,0 +1,214 @@
+from array import array
+from typing import Iterator, List, Tuple
+
+
+def _typed(typecode, values):
+    '''
+    array of typecode from values. Buffers (array, memoryview, numpy array)
+    of the same typecode are wrapped without conversion.
+    '''
+    if isinstance(values, array) and values.typecode == typecode:
+        return values
+    if isinstance(values, memoryview) and values.format == typecode:
+        return values
+    if hasattr(values, 'astype'):   # numpy array
+        res = array(typecode)
+        res.frombytes(values.astype(typecode).tobytes())    # numpy shares array typecodes
+        return res
+    return array(typecode, values)
+
+
+class NoteSequence:
+    """
+        Compact note_history: one note (or silence) per event,
+        stored in contiguous typed arrays.
+
+        pitch    <signed char>: semitone 1-12, 0 for silence
+        octave   <signed char>: octave relative to the played octave
+        onset    <double>: seconds from the start of the sequence
+        duration <double>: seconds
+
+        Iterating / indexing yields the tuple format of note_history:
+        ((semitone, octave),) or () for silence.
+        Slicing returns a NoteSequence viewing the same memory (memoryview),
+        which cannot be appended to.
+    """
+    __slots__ = ('pitch', 'octave', 'onset', 'duration')
+    step = 0.25     # Default duration of appended events, same as Engine._delay
+
+    def __init__(self, pitch=(), octave=(), onset=(), duration=()):
+        self.pitch = _typed('b', pitch)
+        self.octave = _typed('b', octave)
+        self.onset = _typed('d', onset)
+        self.duration = _typed('d', duration)
+        if not len(self.pitch) == len(self.octave) == len(self.onset) == len(self.duration):
+            raise ValueError("pitch, octave, onset and duration must have equal lengths")
+
+    @classmethod
+    def from_list(cls, blob, delay=None, start=0.0):
+        """
+            NoteSequence from note_history tuple format.
+            Each item lasts delay seconds (default: NoteSequence.step).
+        """
+        delay = cls.step if delay is None else delay
+        seq = cls()
+        for item in blob:
+            seq.pitch.append(item[0][0] if item else 0)
+            seq.octave.append(item[0][1] if item else 0)
+        seq.onset.extend(start + i*delay for i in range(len(seq.pitch)))
+        seq.duration.extend(delay for _ in range(len(seq.pitch)))
+        return seq
+
+    @classmethod
+    def from_arrays(cls, pitch, octave, delay=None, start=0.0):
+        """
+            NoteSequence from (pitch, octave) arrays, as returned by
+            StupidEngine.note_arrays.
+        """
+        delay = cls.step if delay is None else delay
+        n = len(pitch)
+        return cls(pitch, octave, [start + i*delay for i in range(n)], [delay]*n)
+
+    def to_list(self) -> List[Tuple]:
+        return list(self)
+
+    def append(self, item, onset=None, duration=None):
+        """
+            Appends an item in note_history tuple format.
+            onset defaults to the end of the last event,
+            duration to the duration of the last event.
+        """
+        n = len(self)
+        if onset is None:
+            onset = self.onset[-1] + self.duration[-1] if n else 0.0
+        if duration is None:
+            duration = self.duration[-1] if n else self.step
+        self.pitch.append(item[0][0] if item else 0)
+        self.octave.append(item[0][1] if item else 0)
+        self.onset.append(onset)
+        self.duration.append(duration)
+
+    def clear(self):
+        self.__init__()
+
+    def __len__(self):
+        return len(self.pitch)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return type(self)(*(memoryview(getattr(self, _))[index] for _ in self.__slots__))
+        p = self.pitch[index]
+        return ((p, self.octave[index]),) if p else ()
+
+    def __iter__(self) -> Iterator[Tuple]:
+        for p, o in zip(self.pitch, self.octave):
+            yield ((p, o),) if p else ()
+
+    def __repr__(self):
+        return f"NoteSequence({len(self)} notes)"
+
+
+class ChordSequence:
+    """
+        Compact chord_history: one chord (or silence) per event.
+
+        Notes of all chords are stored flat in pitch / octave <signed char>.
+        Chord i is pitch[start[i]:start[i+1]], silence is an empty chord.
+        onset / duration <double> hold one value per chord.
+
+        Iterating / indexing yields the tuple format of chord_history:
+        ((semitone, octave), (semitone, octave), ...) or () for silence.
+        Contiguous slices return a ChordSequence viewing the same memory.
+    """
+    __slots__ = ('pitch', 'octave', 'start', 'onset', 'duration')
+    step = NoteSequence.step
+
+    def __init__(self, pitch=(), octave=(), start=(0,), onset=(), duration=()):
+        self.pitch = _typed('b', pitch)
+        self.octave = _typed('b', octave)
+        self.start = _typed('L', start)
+        self.onset = _typed('d', onset)
+        self.duration = _typed('d', duration)
+        if not len(self.start)-1 == len(self.onset) == len(self.duration):
+            raise ValueError("start must have one entry more than onset and duration")
+
+    @classmethod
+    def from_list(cls, blob, delay=None, start=0.0):
+        """
+            ChordSequence from chord_history tuple format.
+            Each item lasts delay seconds (default: ChordSequence.step).
+        """
+        seq = cls()
+        delay = cls.step if delay is None else delay
+        for i, item in enumerate(blob):
+            seq.append(item, start + i*delay, delay)
+        return seq
+
+    @classmethod
+    def from_arrays(cls, pitch, octave, delay=None, start=0.0):
+        """
+            ChordSequence from (pitch, octave) arrays of shape (chords, notes),
+            as returned by StupidEngine.chord_arrays. Rows of pitch 0 are silence.
+        """
+        return cls.from_list(
+            (tuple(zip(p, o)) if p[0] else () for p, o in zip(pitch.tolist(), octave.tolist())),
+            delay,
+            start,
+        )
+
+    def to_list(self) -> List[Tuple]:
+        return list(self)
+
+    def append(self, item, onset=None, duration=None):
+        """
+            Appends a chord in chord_history tuple format.
+            onset defaults to the end of the last event,
+            duration to the duration of the last event.
+        """
+        n = len(self)
+        if onset is None:
+            onset = self.onset[-1] + self.duration[-1] if n else 0.0
+        if duration is None:
+            duration = self.duration[-1] if n else self.step
+        for p, o in item:
+            self.pitch.append(p)
+            self.octave.append(o)
+        self.start.append(self.start[-1] + len(item))
+        self.onset.append(onset)
+        self.duration.append(duration)
+
+    def clear(self):
+        self.__init__()
+
+    def __len__(self):
+        return len(self.onset)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            i, j, step = index.indices(len(self))
+            if step != 1:
+                seq = type(self)()
+                for _ in range(i, j, step):
+                    seq.append(self[_], self.onset[_], self.duration[_])
+                return seq
+            j = max(i, j)
+            return type(self)(
+                memoryview(self.pitch),
+                memoryview(self.octave),
+                memoryview(self.start)[i:j+1],
+                memoryview(self.onset)[i:j],
+                memoryview(self.duration)[i:j],
+            )
+        if index < 0:
+            index += len(self)
+        a, b = self.start[index], self.start[index+1]
+        return tuple(zip(self.pitch[a:b], self.octave[a:b]))
+
+    def __iter__(self) -> Iterator[Tuple]:
+        pitch, octave, start = self.pitch, self.octave, self.start
+        for i in range(len(self)):
+            a, b = start[i], start[i+1]
+            yield tuple(zip(pitch[a:b], octave[a:b]))
+
+    def __repr__(self):
+        return f"ChordSequence({len(self)} chords)"
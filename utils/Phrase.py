@@ -0,0 +1,139 @@
+'''
+Compiled Scale.phrase mini-language.
+
+    digits 1-7      scale degrees (others: invalid, played as 'C')
+    + / -           after a note: octave up / down
+    ' '             one unit of duration
+    other chars     passed through (e.g. '_' ½ unit, '.' ¼ unit, 'm' mute)
+    q               end of phrase
+
+compile_phrase tokenizes a phrase once into a Phrase. Results are kept in an
+LRU cache keyed by (phrase, scale notes, root), so replaying a phrase costs a
+dict lookup. A Phrase goes to MidiPlayer.play, MidiFile.render_commands and
+Synth.render_commands as-is: its events are built from its tokens once per
+unit, without going through a command string. The command string is only
+built for the text protocol and str().
+'''
+
+
+from functools import lru_cache
+from typing import List, Tuple
+from utils.Command import timed, midi_number, durations
+
+
+class Phrase:
+    '''
+    @attrs:
+        tokens: Tuple of ('note', letter, octave) / ('cmd', char): ('note', 'C', 4), ('cmd', '-'), ...
+        command: str - MidiPlayer command, as returned by Scale.phrase
+        invalid: Tuple[str] - Invalid notes of the phrase
+        channel: int
+    '''
+    __slots__ = ('tokens', 'invalid', 'channel', '_prefix', '_command', '_events', '_channels')
+
+    def __init__(self, tokens, invalid=(), channel=0, prefix=""):
+        self.tokens = tuple(tokens)
+        self.invalid = tuple(invalid)
+        self.channel = channel
+        self._prefix = prefix
+        self._command = None
+        self._events = {}
+        self._channels = {}
+
+    @property
+    def command(self)->str:
+        '''
+        Property: MidiPlayer command string, built on first use.
+        '''
+        if self._command is None:
+            self._command = self._prefix + "".join(
+                f"{t[1]}{t[2]}" if t[0] == 'note' else t[1] for t in self.tokens
+            )
+        return self._command
+
+    def _timed_tokens(self):
+        '''
+        Tokens in the form of utils.Command.tokens. Passed-through characters
+        other than durations and mute do not sound.
+        '''
+        for t in self.tokens:
+            if t[0] == 'note':
+                yield 'note', midi_number(t[1], t[2])
+            elif t[1] in durations:
+                yield 'dur', durations[t[1]]
+            elif t[1] in 'mM':
+                yield 'mute', None
+
+    def events(self, onset=0.0, unit=0.5)->List[Tuple]:
+        '''
+        Events of the phrase played at onset (see utils.Command.timed).
+        '''
+        try:
+            base = self._events[unit]
+        except KeyError:
+            base = self._events[unit] = timed(self._timed_tokens(), 0.0, unit, self.channel % 16)
+        if not onset:
+            return list(base)
+        return [(t + onset, s, c, a, b) for t, s, c, a, b in base]
+
+    def on(self, channel:int)->'Phrase':
+        '''
+        The phrase sent to a MidiHub channel: command prefixed with V<channel>.
+        '''
+        try:
+            return self._channels[channel]
+        except KeyError:
+            p = self._channels[channel] = Phrase(self.tokens, self.invalid, channel, f"V<{channel}>")
+            return p
+
+    def __str__(self):
+        return self.command
+
+    def __repr__(self):
+        return f"<Phrase {self.command!r}>"
+
+
+@lru_cache(maxsize=1024)
+def compile_phrase(phrase:str, notes:Tuple[str], root=4)->Phrase:
+    '''
+    Phrase of a Scale.phrase string.
+
+    @params:
+        phrase: str
+        notes: Tuple[str] - Letter notes of scale degrees 1, 2, ...
+        root: int - Octave of the phrase
+    '''
+    tokens = []
+    invalid = []
+    pending = None      # Letter of the note waiting for its octave
+    oct = 0
+
+    def octave():
+        return min(max(root+oct, 0), 7)
+
+    for s in phrase:
+        if s == 'q' or s == 'Q':
+            break
+        if s.isnumeric():
+            if pending is not None:
+                tokens.append(('note', pending, octave()))
+            d = int(s)
+            if 0 < d <= len(notes):
+                pending = notes[d-1]
+            else:
+                invalid.append(s)
+                pending = 'C'
+            oct = 0
+        elif s == '-':
+            oct -= 1
+        elif s == '+':
+            oct += 1
+        else:
+            if pending is not None:
+                tokens.append(('note', pending, octave()))
+                pending = None
+            tokens.append(('cmd', '-' if s == ' ' else s))
+            oct = 0
+    if pending is not None:
+        tokens.append(('note', pending, octave()))
+    return Phrase(tokens, invalid)
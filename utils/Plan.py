@@ -0,0 +1,57 @@
+'''
+Compiled playback plans.
+
+A Plan is an immutable tuple of Scheduler events (duration, command),
+command being a pre-rendered MidiPlayer command string or None for silence.
+Replaying a plan sends the stored strings as-is: no per-item formatting.
+Plans are hashable, so they can key caches, and combine with
+    plan + other     one after the other (other: Plan or any sequence of events)
+    plan * n         repeated n times
+'''
+
+
+from collections.abc import Sequence
+from typing import Iterable, Tuple
+
+
+class Plan(tuple):
+
+    def __new__(cls, events:Iterable[Tuple]=()):
+        return super().__new__(cls, ((float(d), c) for d, c in events))
+
+    @property
+    def duration(self)->float:
+        '''
+        Property: Total playtime, in seconds.
+        '''
+        return sum(d for d, c in self)
+
+    @property
+    def commands(self)->Tuple[str]:
+        '''
+        Property: Commands of the plan, silence excluded.
+        '''
+        return tuple(c for d, c in self if c is not None)
+
+    def __add__(self, other):
+        if not isinstance(other, Sequence) or isinstance(other, (str, bytes)):
+            return NotImplemented
+        return Plan(tuple.__add__(self, Plan(other)))
+
+    def __radd__(self, other):
+        if not isinstance(other, Sequence) or isinstance(other, (str, bytes)):
+            return NotImplemented
+        return Plan(tuple.__add__(Plan(other), self))
+
+    def __mul__(self, n:int):
+        return Plan(tuple.__mul__(self, n))
+
+    __rmul__ = __mul__
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return Plan(tuple.__getitem__(self, index))
+        return tuple.__getitem__(self, index)
+
+    def __repr__(self):
+        return f"<Plan: {len(self)} events, {self.duration:g}s>"
@@ -0,0 +1,107 @@
+'''
+Framed binary event protocol of the MidiPlayer pipe.
+
+A frame carries the events of one scheduling tick:
+    header  <2s B H>    magic b'ME', protocol version, event count
+    event   <d B B B B> time (monotonic clock, seconds), status, channel, data1, data2
+Events are those of utils.Command: NOTE_ON, NOTE_OFF, PROGRAM and
+CONTROL ALL_NOTES_OFF (mute). Times lie in the future for held notes,
+the backend sounds each event when its time comes.
+'''
+
+
+from heapq import heappush, heappop
+from struct import Struct
+from time import monotonic
+from typing import Iterable, List, Tuple
+from utils.Command import Timeline
+
+
+MAGIC = b'ME'
+VERSION = 1
+HEADER = Struct('<2sBH')
+EVENT = Struct('<dBBBB')
+
+
+class ProtocolError(Exception):
+    def __init__(self, message="Malformed MidiPlayer frame"):
+        self.message = message
+        super().__init__(self.message)
+
+
+def encode(events:List[Tuple])->bytes:
+    '''
+    One frame of events.
+    '''
+    frame = bytearray(HEADER.size + EVENT.size*len(events))
+    HEADER.pack_into(frame, 0, MAGIC, VERSION, len(events))
+    for i, e in enumerate(events):
+        EVENT.pack_into(frame, HEADER.size + EVENT.size*i, *e)
+    return bytes(frame)
+
+
+def decode(frame:bytes)->List[Tuple]:
+    '''
+    Events of one frame.
+    '''
+    try:
+        magic, version, count = HEADER.unpack_from(frame)
+    except Exception:
+        raise ProtocolError("Frame shorter than header")
+    if magic != MAGIC or version != VERSION:
+        raise ProtocolError(f"Unknown frame {magic!r} v{version}")
+    if len(frame) != HEADER.size + EVENT.size*count:
+        raise ProtocolError(f"Frame of {len(frame)} bytes does not hold {count} events")
+    return list(EVENT.iter_unpack(memoryview(frame)[HEADER.size:]))
+
+
+class FrameWriter:
+    '''
+    Collects the events of one tick and sends them as one frame.
+    '''
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.events = []
+
+    def add(self, events:Iterable[Tuple]):
+        self.events.extend(events)
+
+    def flush(self):
+        if self.events:
+            self.conn.send_bytes(encode(self.events))
+            self.events = []
+
+
+def reference_backend(conn, err=None, sink=print):
+    '''
+    Python reference backend process of the binary protocol.
+    Decodes frames, sounds each event at its time (mute and re-strike resolved
+    as by utils.Command.Timeline) and passes it to sink. With err, decoded
+    frames are also sent back over it, for testing the protocol without Java.
+    Runs until the pipe is closed.
+    '''
+    heap = []
+    seq = 0
+    timeline = Timeline()
+    while True:
+        timeout = max(heap[0][0] - monotonic(), 0) if heap else None
+        if conn.poll(timeout):
+            try:
+                events = decode(conn.recv_bytes())
+            except EOFError:
+                break
+            if err is not None:
+                err.send(events)
+            for e in events:
+                heappush(heap, (e[0], seq, e))
+                seq += 1
+        due = []
+        while heap and heap[0][0] <= monotonic():
+            due.append(heappop(heap)[2])
+        if due:
+            timeline.push(due)
+            for e in timeline.flush(due[-1][0]):
+                sink(e)
+    for e in timeline.close():
+        sink(e)
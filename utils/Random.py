@@ -0,0 +1,80 @@
+'''
+Seedable, spawnable random streams for engines.
+
+A Stream is a random.Random seeded from (entropy, key): entropy is the
+user seed, key the path of substream indices leading to it. Substreams are
+derived by hashing, so substream(i) is the same whatever the order or
+process it is created in, and distinct keys give independent streams.
+Parallel workers each take substream(i) of a chunk and reproduce a serial
+run over the same chunks exactly.
+'''
+
+
+import random
+from hashlib import blake2b
+from os import urandom
+from typing import List
+
+
+class Stream(random.Random):
+    '''
+    @params:
+        seed: int - Optional. Entropy of the stream; default: from os.urandom
+        key: Tuple[int] - Substream path, see substream
+    '''
+
+    def __init__(self, seed:int=None, key=()):
+        self.entropy = int.from_bytes(urandom(16), 'little') if seed is None else int(seed)
+        self.key = tuple(key)
+        self._spawned = 0
+        self._numpy = None
+        super().__init__(self._derive(b'random'))
+
+    def _derive(self, salt:bytes)->int:
+        h = blake2b(repr((self.entropy, self.key)).encode(), digest_size=16, person=salt)
+        return int.from_bytes(h.digest(), 'little')
+
+    def substream(self, index:int)->'Stream':
+        '''
+        Independent child stream number index. Does not touch this stream's state.
+        '''
+        return Stream(self.entropy, self.key + (index,))
+
+    def spawn(self, n=1)->List['Stream']:
+        '''
+        n new child streams, never returned by an earlier spawn of this stream.
+        '''
+        children = [self.substream(self._spawned + i) for i in range(n)]
+        self._spawned += n
+        return children
+
+    def numpy(self):
+        '''
+        numpy.random.Generator of this stream (created on first use), for vectorized draws.
+        '''
+        if self._numpy is None:
+            import numpy as np
+            self._numpy = np.random.Generator(np.random.PCG64(self._derive(b'numpy')))
+        return self._numpy
+
+    def getstate(self):
+        return (
+            self.entropy, self.key, self._spawned, super().getstate(),
+            None if self._numpy is None else self._numpy.bit_generator.state,
+        )
+
+    def setstate(self, state):
+        '''
+        Restores a state of getstate. The numpy Generator is kept and its state set
+        in place, so holders of numpy() (e.g. Modulation) follow the restore.
+        '''
+        self.entropy, self.key, self._spawned, base, np_state = state
+        super().setstate(base)
+        if np_state is None and self._numpy is not None:    # Generator created after getstate
+            import numpy as np
+            np_state = np.random.PCG64(self._derive(b'numpy')).state
+        if np_state is not None:
+            self.numpy().bit_generator.state = np_state
+
+    def __repr__(self):
+        return f"<Stream {self.entropy}{''.join(f'/{_}' for _ in self.key)}>"
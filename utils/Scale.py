@@ -1,9 +1,30 @@
-from typing import Tuple
-from utils.MidiPlayer import MidiPlayer
+from typing import List, Tuple
+from utils.MidiPlayer import MidiPlayer, MidiHub, MidiChannel
+from utils.config import CONFIG
 from utils.CircularOctave import CircularOctave
+from utils.NoteSequence import NoteSequence, ChordSequence
+from utils.Scheduler import Scheduler
+from utils.Plan import Plan
+from utils.Phrase import Phrase, compile_phrase
+from functools import lru_cache
+from types import MappingProxyType
 from time import sleep
 
 
+@lru_cache(maxsize=4096)
+def _render_chord(chord, octave=4):
+    '''
+    Letter-note command for a chord voicing, e.g. "C3G3C4E4G4".
+    Voicings are interned tuples, so each (chord, octave) pair is joined once.
+    '''
+    return "".join(Scale.semitones_to_letter_notes(chord, octave=octave))
+
+
+@lru_cache(maxsize=256)
+def _progression(chords, delay, mute_prev)->Plan:
+    return Plan((delay, ('m' if mute_prev else '') + _render_chord(chord) + '--') for chord in chords)
+
+
 class Scale:
     note_name = ('C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B')
     semitones = CircularOctave(*range(1,13))
@@ -13,6 +34,12 @@ class Scale:
         harmonic = (1,0,1,1,0,2,1),
         melodic_minor = (1,0,1,1,1,1,0),
     )
+    inversions = {
+        0: (0,0,0),
+        1: (2,2,3),
+        2: (-3,-2,-2),
+    }
+    voiced_degrees = range(1, 22)   # Three octaves of degrees, covers StupidEngine's pooling
     
     def __init__(self, key, name=None):
         
@@ -28,121 +55,187 @@ class Scale:
         
         self._name = name
         self._initialize()
-        self.midi = MidiPlayer()
         self.__play_wrappers__()
 
 
     def _initialize(self):
-        self.semitones.root_idx = self.key-1
         self.rule = self.rules.get(self.name, None)
         self.intervals = self.get_intervals()
         self.notes = {_:self.note_name[_-1] for _ in self.intervals}
+        self._chords = self._voicings(self.key, self.rule)
     
     
     def __play_wrappers__(self):
+        class Playable:
+            '''
+            Wrapper for phrase/chord methods to add a per-Scale 'play' attribute,
+            so each Scale plays through its own midi (channel).
+            '''
+            def __init__(self, func, play):
+                self.__f = func
+                self.play = play
+            
+            def __call__(self, *args, **kwargs):
+                return self.__f(*args, **kwargs)
+        
         def _phrase(_obj, func):
             def _wrapper(*args, **kwargs):
-                _obj.midi.play(func(*args, **kwargs))
+                func(*args, **kwargs)
+                _obj.midi.play(_obj.compile_phrase(*args, **kwargs))
             return _wrapper
         
         def _chord(_obj, func):
             def _wrapper(*args, octave=3, **kwargs):
-                _obj.midi.play(
-                    "".join(
-                        _obj.semitones_to_letter_notes(func(*args, **kwargs), octave=octave)
-                    )
-                )
+                _obj.midi.play(_render_chord(func(*args, **kwargs), octave))
             return _wrapper
         
-        self.phrase.__func__.play = _phrase(self, self.phrase)
-        self.chord.__func__.play = _chord(self, self.chord)
+        self.phrase = Playable(self.phrase, _phrase(self, self.phrase))
+        self.chord = Playable(self.chord, _chord(self, self.chord))
         
 
     def get_intervals(self):
         if not self.rule:
             raise NotImplementedError
         
-        notes = [self.key]
-        for step in self.rule[:-1]:
-            for _ in range(step+1):
-                n, o = next(self.semitones)
-            notes.append(n)
-        
-        for _ in range(self.rule[-1]+1):
-            next(self.semitones)
-            
-        return CircularOctave(notes)
+        return CircularOctave(self._intervals(self.key, self.rule))
 
 
-    def chord(self, num, inversion=0, low_notes=True):
-        #num = (num-1)%7
-        inv = {
-            0: (0,0,0),
-            1: (2,2,3),
-            2: (-3,-2,-2),
-        }
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _intervals(key, rule):
+        '''
+        Semitones of the scale built on key by rule.
+        Pure function of (key, rule), shared by every Scale on the same pair.
+        '''
+        notes = [key]
+        for step in rule[:-1]:
+            notes.append((notes[-1]+step)%12 + 1)
+        return tuple(notes)
+
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _voicings(key, rule):
+        '''
+        Chord voicing table of (key, rule): every degree x inversion x low_notes.
+        Shared by every Scale on the same pair, read-only.
+        '''
+        intervals = CircularOctave(Scale._intervals(key, rule))
+        return MappingProxyType({
+            (num, inv, low): Scale._voicing(intervals, num, inv, low)
+            for num in Scale.voiced_degrees
+            for inv in Scale.inversions
+            for low in (False, True)
+        })
+
+
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def _extra_voicing(key, rule, num, inversion, low_notes):
+        '''
+        Voicing of a degree outside voiced_degrees, in a bounded cache.
+        '''
+        return Scale._voicing(CircularOctave(Scale._intervals(key, rule)), num, inversion, low_notes)
+
+
+    @staticmethod
+    def _voicing(intervals, num, inversion=0, low_notes=True):
+        inv = Scale.inversions[inversion%3]
         _keys = tuple(
             i+k
             for i,k in zip(
                 (0, 2, 4),
-                inv[inversion%3],
+                inv,
             )
         )
         if low_notes:
-            _keys = (-7+inv[inversion%3][0], -3+inv[inversion%3][-1]) + _keys
+            _keys = (-7+inv[0], -3+inv[-1]) + _keys
         _keys = tuple(_+num-1 for _ in _keys)
-        chord = self.intervals[_keys]
-        return chord
-        
+        return intervals[_keys]
 
-    def chord_progression(self, chords, delay=0.5, mute_prev=False):
-        for chord in chords:
-            notes = ''.join(self.semitones_to_letter_notes(chord))
-            print(notes)
-            self.midi.play(('m' if mute_prev else '') + notes+'--')
-            sleep(delay)
 
+    def chord(self, num, inversion=0, low_notes=True):
+        '''
+        Chord voicing from the table built by _initialize.
+        Degrees outside voiced_degrees come from a bounded cache (_extra_voicing).
+        '''
+        try:
+            return self._chords[num, inversion, low_notes]
+        except KeyError:
+            return self._extra_voicing(self.key, self.rule, num, inversion, low_notes)
 
-    def phrase(self, phrase, root=4):
-        mod_notes = {i:v for i,v in enumerate(self.notes.values(), 1)}
-        invalid_note = lambda s: print(f"Invalid note '{s}'. Notes must be in scale. Playing 'C' note instead.") or 'C'
-        get_note = lambda s: mod_notes.get(s, False) or invalid_note(s)
-        
-        oct_flag = True
-        oct = 0
-        notes = []
-        special_cmd_stack = []
-        
-        for s in phrase:
-            if s=='q' or s=='Q':
-                print("Press 0 to Quit")
-                break
-            
-            if s.isnumeric():
-                if not oct_flag:
-                    notes.append(f"{min(max(root+oct, 0), 7)}")
-                notes.append(get_note(int(s)))
-                oct_flag = False
-                oct = 0
-            elif s=='-':
-                oct -= 1
-            elif s=='+':
-                oct += 1
-            elif s==' ':
-                notes.append(f"{min(max(root+oct, 0), 7)}-" if not oct_flag else "-")
-                oct = 0
-                oct_flag = True
-            else:
-                notes.append(f"{min(max(root+oct, 0), 7)}"+s if not oct_flag else s)
-                oct = 0
-                oct_flag = True
+
+    def voice_lead(self, degrees, low_notes=True, **kwargs)->List[Tuple]:
+        '''
+        Chords of the degree progression, in the inversion and octave of each chord
+        that minimize the total voice movement (see utils.VoiceLeading).
+        Degree 0 / None: rest.
+
+        @params:
+            degrees: Sequence of degrees, or of degree sequences (returns a List per sequence)
+            octaves, weight, center: Optional. See utils.VoiceLeading.lead_batch
+        '''
+        from utils.VoiceLeading import lead, lead_batch
+        if len(degrees) and hasattr(degrees[0], '__len__'):
+            return lead_batch(self, degrees, low_notes=low_notes, **kwargs)
+        return lead(self, degrees, low_notes=low_notes, **kwargs)
+
+
+    def progression(self, chords, delay=0.5, mute_prev=False)->Plan:
+        '''
+        Compiles chords into a Plan (see utils.Plan) for chord_progression.
+        Equal progressions return the cached Plan.
+        '''
+        return _progression(tuple(chords), delay, mute_prev)
+
+
+    def chord_progression(self, chords, delay=0.5, mute_prev=False):
+        '''
+        Plays chords every delay seconds at absolute deadlines (see Scheduler).
+        chords may be a Plan of progression(), played as compiled (delay and mute_prev have no effect).
+        Returns Timing report.
+        '''
+        def send(command):
+            print(command.lstrip('m').rstrip('-'))
+            self.midi.play(command, at=scheduler.deadline, build=scheduler.build)
         
-        if not oct_flag:
-            notes.append(f"{min(max(root+oct, 0), 7)}")
+        plan = chords if isinstance(chords, Plan) else self.progression(chords, delay, mute_prev)
+        scheduler = Scheduler(send, batch=getattr(self.midi, 'batch', None))
+        return scheduler.run(plan)
+
+    
+    async def achord_progression(self, chords, delay=0.5, mute_prev=False):
+        '''
+        Async form of chord_progression, for use on a shared event loop.
+        '''
+        async def send(command):
+            print(command.lstrip('m').rstrip('-'))
+            await self.midi.aplay(command, at=scheduler.deadline, build=scheduler.build)
         
-        notes = ''.join(notes)
-        print(f"Playing: {notes}")
-        return notes
+        plan = chords if isinstance(chords, Plan) else self.progression(chords, delay, mute_prev)
+        scheduler = Scheduler(send, batch=getattr(self.midi, 'batch', None))
+        return await scheduler.arun(plan)
+
+
+    def compile_phrase(self, phrase, root=4)->Phrase:
+        '''
+        Compiled phrase (see utils.Phrase), cached per (phrase, scale notes, root).
+        '''
+        return compile_phrase(phrase, tuple(self.notes.values()), root)
+
+
+    def phrase(self, phrase, root=4):
+        '''
+        MidiPlayer command of a phrase, e.g. "1 2 3" -> "C4-D4-E4".
+        phrase.play sends the compiled phrase instead of the string.
+        '''
+        compiled = self.compile_phrase(phrase, root)
+        for s in compiled.invalid:
+            print(f"Invalid note '{s}'. Notes must be in scale. Playing 'C' note instead.")
+        if 'q' in phrase or 'Q' in phrase:
+            print("Press 0 to Quit")
+        print(f"Playing: {compiled.command}")
+        return compiled.command
 
 
     def init_midi(self):
@@ -152,7 +245,28 @@ class Scale:
 
 
     def close_midi(self):
-        self.midi.stop()
+        if hasattr(self, '_midi'):
+            self._midi.stop()
+            if isinstance(self._midi, MidiChannel):     # Released: the next access allocates a channel
+                del self._midi
+    
+    
+    @property
+    def midi(self):
+        '''
+        MidiPlayer of the Scale. Created on first access.
+        With CONFIG['shared_midi'], a channel of the shared MidiHub instead.
+        '''
+        try:
+            return self._midi
+        except AttributeError:
+            self._midi = MidiHub.shared().channel() if CONFIG.get('shared_midi') else MidiPlayer()
+            return self._midi
+
+
+    @midi.setter
+    def midi(self, player):
+        self._midi = player
     
     
     @property
@@ -296,6 +410,14 @@ class Scale:
                 scale.close_midi()
                 break
 
+
+    def __reduce__(self):
+        '''
+        Pickles as Scale(key, name): wrappers and the MIDI player stay behind.
+        '''
+        return (Scale, (self.key, self.name))
+
+
     def __repr__(self):
         return f"<Scale: {self.note_name[self.key-1]} {self.name}>"
     
@@ -314,6 +436,17 @@ class Scale:
 
     @staticmethod
     def semitones_to_letter_notes(*t, octave=4):
+        '''
+        Letter notes of a chord / note: ((semitone, octave), ...) -> ("C4", ...)
+        NoteSequence / ChordSequence: List with the letter notes of every item.
+        '''
+        if isinstance(t[0], NoteSequence):
+            return [
+                (f"{Scale.note_name[p-1]}{octave+o}",) if p else ()
+                for p, o in zip(t[0].pitch, t[0].octave)
+            ]
+        if isinstance(t[0], ChordSequence):
+            return [Scale.semitones_to_letter_notes(_, octave=octave) for _ in t[0]]
         res = []
         for _ in t[0]:
             n, oct = _
@@ -321,20 +454,65 @@ class Scale:
         return tuple(res)
 
 
-def find_scale(*notes)->Tuple[Scale]:
+def note_mask(*notes)->int:
+    '''
+    12-bit pitch-class mask of notes, bit (n-1) set for semitone n.
+    Accepts the same note forms as find_scale. Notes outside 1-12 set bit 12,
+    which matches no scale.
+    '''
     if isinstance(notes[0], str) and not notes[0].isdigit():
         notes = tuple(Scale.note_name.index(_.upper())+1 for _ in notes)
     elif isinstance(notes[0], str):
         notes = tuple(int(_) for _ in notes)
-    notes = set(notes)
     
-    scales = []
-    for key in Scale.note_name:
-        for rule in Scale.rules.keys():
-            _ = Scale(key, rule)
-            if notes.issubset(_.intervals):
-                scales.append(_)
-            else:
-                del _
+    mask = 0
+    for n in notes:
+        mask |= 1 << (n-1) if 0 < n < 13 else 4096
+    return mask
+
+
+@lru_cache(maxsize=None)
+def _scale_index(rules)->Tuple[Tuple[Tuple[str, str]]]:
+    '''
+    Table of every 12-bit note mask to the (key, scale name) pairs containing it.
+    
+    @params:
+        rules: Tuple of Scale.rules items. A change to Scale.rules builds a new table.
+    '''
+    scales = [
+        (Scale.note_name[key-1], name, sum(1 << (n-1) for n in Scale._intervals(key, rule)))
+        for key in range(1, 13)
+        for name, rule in rules
+    ]
+    return tuple(
+        tuple((key, name) for key, name, mask in scales if not query & ~mask)
+        for query in range(4096)
+    )
+
+
+def find_scale(*notes)->Tuple[Scale]:
+    mask = note_mask(*notes)
+    return tuple(
+        Scale(key, name)
+        for key, name in (_scale_index(tuple(Scale.rules.items()))[mask] if mask < 4096 else ())
+    )
+
+
+def find_scales(note_sets)->List[Tuple[Tuple[str, str]]]:
+    '''
+    Batch form of find_scale.
+    Returns, for each note set, a Tuple of matching (key, scale name) pairs.
+    
+    @params:
+        note_sets: Iterable of note masks (see note_mask), e.g. a numpy integer array,
+                   or of note collections in any form accepted by find_scale.
+    '''
+    index = _scale_index(tuple(Scale.rules.items()))
+    if hasattr(note_sets, 'tolist'):
+        note_sets = note_sets.tolist()
     
-    return tuple(scales)
+    res = []
+    for notes in note_sets:
+        mask = notes if isinstance(notes, int) else note_mask(*notes)
+        res.append(index[mask] if 0 <= mask < 4096 else ())
+    return res
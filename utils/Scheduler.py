@@ -0,0 +1,180 @@
+from asyncio import sleep as async_sleep
+from collections import deque
+from contextlib import nullcontext
+from inspect import isawaitable
+from math import sqrt
+from time import monotonic, perf_counter, sleep
+
+
+_unbatched = nullcontext()
+
+
+class Timing:
+    """
+        Lateness report of a Scheduler run.
+        Lateness is (actual send time - deadline) in seconds.
+    """
+    __slots__ = ('count', 'mean', 'max', '_m2')
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.max = 0.0
+        self._m2 = 0.0
+
+    def record(self, late:float):
+        self.count += 1
+        d = late - self.mean
+        self.mean += d/self.count
+        self._m2 += d*(late - self.mean)
+        if late > self.max:
+            self.max = late
+
+    @property
+    def jitter(self) -> float:
+        """
+            Property: Standard deviation of lateness, in seconds.
+        """
+        return sqrt(self._m2/self.count) if self.count > 1 else 0.0
+
+    def __repr__(self):
+        return (
+            f"<Timing: {self.count} events, late mean {self.mean*1000:.3f}ms "
+            f"max {self.max*1000:.3f}ms jitter {self.jitter*1000:.3f}ms>"
+        )
+
+
+class Scheduler:
+    """
+        Sends events at absolute deadlines on the monotonic clock.
+
+        Events are (duration, payload) pairs. Event i is due at
+        start + sum of the durations before it, so a late event does not
+        shift the events after it. Payload None is silence.
+        A small lookahead queue pulls (renders) upcoming events from the
+        iterable while waiting for the current deadline.
+        Events sharing a deadline (duration 0) form one tick, sent inside
+        batch() (e.g. MidiPlayer.batch, one binary frame per tick).
+        While send runs, deadline and build hold the event's deadline and
+        the seconds spent pulling (rendering) it, for latency instrumentation.
+    """
+
+    def __init__(self, send, *, rest=None, batch=None, lookahead=4, clock=monotonic, sleep=sleep):
+        """
+            send: callable(payload) - Called at each event's deadline
+            rest: callable() - Optional. Called at each silence's deadline
+            batch: callable() -> context manager - Optional. Wraps the sends of each tick
+            lookahead: int - Events pulled ahead of the current one
+        """
+        self.send = send
+        self.rest = rest
+        self.batch = batch or nullcontext
+        self.lookahead = lookahead
+        self.clock = clock
+        self.sleep = sleep
+        self.deadline = None
+        self.build = 0.0
+
+    def _wait(self, deadline):
+        wait = deadline - self.clock()
+        if wait > 0:
+            self.sleep(wait)
+
+    def _ticks(self, events, start):
+        """
+            Yields (deadline, tick, wait) for each tick of events, pulling events
+            ahead into the lookahead queue (see _tick for tick), then
+            (end of the last event, (), True).
+            wait is False for ticks of silences only, when there is no rest callback.
+        """
+        events = iter(events)
+        queue = deque()
+
+        def fill():
+            t = perf_counter()
+            for e in events:
+                now = perf_counter()
+                queue.append((*e, now - t))
+                if len(queue) >= self.lookahead:
+                    break
+                t = now
+
+        fill()
+        deadline = self.clock() if start is None else start
+        while queue:
+            duration, tick = self._tick(queue, fill)
+            yield deadline, tick, any(_[0] is not None for _ in tick) or self.rest is not None
+            deadline += duration
+            fill()
+        yield deadline, (), True
+
+    def _dispatch(self, tick, deadline, timing):
+        """
+            Sends the payloads (or rests) of one tick, yielding what send / rest return.
+            Ticks of more than one event are sent inside batch(): a single send
+            is already flushed on its own.
+        """
+        if not tick:
+            return
+        with self.batch() if len(tick) > 1 else _unbatched:
+            for payload, build in tick:
+                if payload is not None:
+                    self.deadline, self.build = deadline, build
+                    timing.record(self.clock() - deadline)
+                    yield self.send(payload)
+                elif self.rest is not None:
+                    yield self.rest()
+
+    def run(self, events, start=None) -> Timing:
+        """
+            Sends every event at its deadline, then waits for the end of the last one.
+            Returns Timing.
+
+            @params:
+                events: Iterable of (duration, payload)
+                start: float - Optional. Clock time of the first deadline. Default: now
+        """
+        timing = Timing()
+        for deadline, tick, wait in self._ticks(events, start):
+            if wait:
+                self._wait(deadline)
+            for _ in self._dispatch(tick, deadline, timing):
+                pass
+        return timing
+
+    @staticmethod
+    def _tick(queue, fill):
+        """
+            Pops the payloads due at one deadline.
+            Returns (duration to next tick, List of (payload, build seconds)).
+        """
+        tick = []
+        duration = 0
+        while not duration:
+            if not queue:
+                fill()
+                if not queue:
+                    break
+            duration, payload, build = queue.popleft()
+            tick.append((payload, build))
+        return duration, tick
+
+    async def _await(self, deadline):
+        wait = deadline - self.clock()
+        if wait > 0:
+            await async_sleep(wait)
+
+    async def arun(self, events, start=None) -> Timing:
+        """
+            Async form of run, for many streams sharing one event loop.
+            Waits with asyncio.sleep; send / rest may be coroutine functions.
+            Cancelling the task stops playback at the current event.
+        """
+        timing = Timing()
+        for deadline, tick, wait in self._ticks(events, start):
+            if wait:
+                await self._await(deadline)
+            for _ in self._dispatch(tick, deadline, timing):
+                if isawaitable(_):
+                    await _
+        return timing
@@ -0,0 +1,181 @@
+'''
+In-process software synthesizer rendering engine output to PCM / WAV.
+
+Audio is mixed with NumPy in fixed-size blocks and streamed block by block,
+so memory stays constant for any duration. Input is the event stream of
+utils.Command, so mute ('m') and sustain behave as with Engine.play.
+'''
+
+
+import wave
+import numpy as np
+from typing import Iterable, Iterator, Tuple
+from utils.Command import resolve, command_events, NOTE_ON, NOTE_OFF, PROGRAM
+from utils.MidiFile import blob_events
+
+
+# Timbre of each General MIDI family (program // 8): (waveform, decay seconds or None to sustain)
+timbres = (
+    ('triangle', 1.5),  # Piano
+    ('sine', 0.8),      # Chromatic Percussion
+    ('square', None),   # Organ
+    ('saw', 1.2),       # Guitar
+    ('triangle', 1.0),  # Bass
+    ('saw', None),      # Strings
+    ('saw', None),      # Ensemble
+    ('square', None),   # Brass
+    ('square', None),   # Reed
+    ('sine', None),     # Pipe
+    ('square', None),   # Synth Lead
+    ('triangle', None), # Synth Pad
+    ('sine', None),     # Synth Effects
+    ('saw', 1.0),       # Ethnic
+    ('sine', 0.3),      # Percussive
+    ('sine', 0.5),      # Sound Effects
+)
+
+
+def _wave(kind, phase):
+    '''
+    Waveform of phase in cycles.
+    '''
+    frac = phase % 1.0
+    if kind == 'sine':
+        return np.sin(2*np.pi*frac)
+    if kind == 'square':
+        return np.where(frac < 0.5, 0.6, -0.6)
+    if kind == 'saw':
+        return 0.6*(2*frac - 1)
+    return 2*np.abs(2*frac - 1) - 1     # triangle
+
+
+class Voice:
+    __slots__ = ('freq', 'start', 'off', 'wave', 'decay', 'velocity')
+
+    def __init__(self, note, start, program, velocity):
+        self.freq = 440.0 * 2**((note-69)/12)
+        self.start = start
+        self.off = None
+        self.wave, self.decay = timbres[program // 8]
+        self.velocity = velocity/127
+
+
+class Synth:
+    '''
+    Block-streaming synthesizer.
+
+    @params:
+        rate: int - Sample rate
+        block: int - Samples per block
+        gain: float - Output gain of one full-velocity voice
+        attack / release: float - Envelope times, in seconds
+    '''
+
+    def __init__(self, rate=44100, block=1024, gain=0.15, attack=0.005, release=0.08):
+        self.rate = rate
+        self.block = block
+        self.gain = gain
+        self.attack = attack
+        self.release = release
+
+    def _envelope(self, v, n):
+        age = (n - v.start)/self.rate
+        env = np.clip(age/self.attack, 0.0, 1.0)
+        if v.decay:
+            env = env*np.exp(-np.maximum(age, 0.0)/v.decay)
+        if v.off is not None:
+            env = env*np.clip(1 - (n - v.off)/(self.release*self.rate), 0.0, 1.0)
+        return env
+
+    def _done(self, v, end):
+        if v.off is not None and end >= v.off + self.release*self.rate:
+            return True
+        return bool(v.decay) and (end - v.start)/self.rate > 10*v.decay
+
+    def blocks(self, events:Iterable[Tuple])->Iterator[np.ndarray]:
+        '''
+        Yields float32 mono blocks of the time-ordered events (see utils.Command.resolve)
+        until every voice has ended.
+        '''
+        events = iter(events)
+        pending = next(events, None)
+        programs = {}
+        sounding = {}       # (channel, note) -> Voice
+        releasing = []
+        t0 = 0
+        while pending is not None or sounding or releasing:
+            t1 = t0 + self.block
+            while pending is not None and pending[0]*self.rate < t1:
+                time, status, ch, a, b = pending
+                at = max(int(round(time*self.rate)), t0)
+                if status == NOTE_ON:
+                    if (ch, a) in sounding:
+                        old = sounding.pop((ch, a))
+                        old.off = at
+                        releasing.append(old)
+                    sounding[ch, a] = Voice(a, at, programs.get(ch, 0), b)
+                elif status == NOTE_OFF and (ch, a) in sounding:
+                    v = sounding.pop((ch, a))
+                    v.off = at
+                    releasing.append(v)
+                elif status == PROGRAM:
+                    programs[ch] = a
+                pending = next(events, None)
+
+            n = np.arange(t0, t1, dtype=np.float64)
+            out = np.zeros(self.block, dtype=np.float64)
+            for v in (*sounding.values(), *releasing):
+                out += v.velocity*self._envelope(v, n)*_wave(v.wave, v.freq*(n - v.start)/self.rate)
+            yield (out*self.gain).astype(np.float32)
+
+            releasing = [v for v in releasing if not self._done(v, t1)]
+            for key in [k for k, v in sounding.items() if self._done(v, t1)]:
+                del sounding[key]
+            t0 = t1
+
+    def render(self, blob, *, delay=0.25, sustain=True, octave=3, program=None)->Iterator[np.ndarray]:
+        '''
+        Blocks of an engine sequence (any form Engine.play accepts). Params as Engine.play;
+        delay is the time between items (Engine._delay).
+        '''
+        n = len(blob) if hasattr(blob, '__len__') else None
+        events = resolve(
+            blob_events(blob, delay=delay, sustain=sustain, octave=octave),
+            end=None if n is None else n*delay,
+            tail=delay,
+        )
+        return self.blocks(self._program(events, program))
+
+    def render_commands(self, commands:Iterable[Tuple[float, str]], *, unit=0.5, program=None)->Iterator[np.ndarray]:
+        '''
+        Blocks of (onset, MidiPlayer command) pairs, e.g. [(0.0, scale.phrase("1 2 3"))].
+        Commands may be compiled phrases (scale.compile_phrase("1 2 3")).
+        '''
+        events = resolve(((t, command_events(c, t, unit)) for t, c in commands), tail=unit, unit=unit)
+        return self.blocks(self._program(events, program))
+
+    @staticmethod
+    def _program(events, program):
+        if program is not None:
+            yield (0.0, PROGRAM, 0, int(program), 0)
+        yield from events
+
+
+def pcm(blocks:Iterable[np.ndarray])->Iterator[bytes]:
+    '''
+    16-bit little-endian PCM bytes of float blocks.
+    '''
+    for b in blocks:
+        yield (np.clip(b, -1.0, 1.0)*32767).astype('<i2').tobytes()
+
+
+def write_wav(file, blocks:Iterable[np.ndarray], rate=44100):
+    '''
+    Streams blocks to a mono 16-bit WAV file (path or binary file object).
+    '''
+    with wave.open(file, 'wb') as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        for data in pcm(blocks):
+            w.writeframes(data)
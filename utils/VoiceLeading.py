@@ -0,0 +1,180 @@
+'''
+Voice leading of degree progressions.
+
+Each chord of a progression may be voiced in any inversion (Scale.inversions)
+and octave shift (chord num + 7*k). lead picks the voicing of every chord so
+that the total voice movement of the progression is minimal, with a Viterbi
+pass over precomputed voicing-distance matrices: O(steps x voicings²) instead
+of the voicings^steps of a brute-force search.
+
+    distance    sum over voices of |pitch_a - pitch_b|, voices paired low to high
+    register    weight x |mean pitch - center| per chord, keeps the progression
+                from drifting to the edge of the candidate octaves
+
+Degree 0 (or None) is a rest: it is played as () and the next chord is led
+from the last chord sounded. Batches of progressions (lead_batch) run as one
+vectorized pass, padded with rests. lead_stream is the online form, for
+real-time generation: each chord is chosen from the last one and a few
+degrees ahead, over the same tables.
+'''
+
+
+import numpy as np
+from collections import deque
+from functools import lru_cache
+from typing import Iterable, Iterator, List, Sequence, Tuple
+
+
+@lru_cache(maxsize=64)
+def _tables(key:int, rule:Tuple[int], low_notes:bool, octaves:Tuple[int], weight:float, center):
+    '''
+    Voicing tables of (key, rule) over degree classes 0 (rest) and 1-7.
+
+    Returns Tuple(
+        choices: Tuple of (inversion, octave shift) of each candidate voicing,
+        trans: (8, 8, C, C) cost of candidate i of degree a to candidate j of degree b.
+               trans[0, b]: no chord sounded yet (0); trans[a, 0]: rest (0 on the diagonal, inf elsewhere),
+        reg: (8, C) register cost of each candidate,
+    )
+    '''
+    from utils.Scale import Scale
+    from utils.CircularOctave import CircularOctave
+    intervals = CircularOctave(Scale._intervals(key, rule))
+    choices = tuple((inv, k) for k in octaves for inv in sorted(Scale.inversions))
+    pitch = np.array([
+        sorted(s - 1 + 12*o for s, o in Scale._voicing(intervals, d + 7*k, inv, low_notes))
+        for d in range(1, 8)
+        for inv, k in choices
+    ], dtype=float).reshape(7, len(choices), -1)
+
+    C = len(choices)
+    trans = np.zeros((8, 8, C, C))
+    trans[1:, 1:] = np.abs(pitch[:, None, :, None, :] - pitch[None, :, None, :, :]).sum(-1)
+    trans[:, 0] = np.where(np.eye(C, dtype=bool), 0.0, np.inf)
+
+    mean = pitch.mean(-1)
+    reg = np.zeros((8, C))
+    reg[1:] = weight*np.abs(mean - (mean.mean() if center is None else center))
+    return choices, trans, reg
+
+
+def _degrees(sequences:Sequence[Sequence[int]])->np.ndarray:
+    T = max((len(_) for _ in sequences), default=0)
+    res = np.zeros((len(sequences), T), dtype=np.intp)
+    for b, seq in enumerate(sequences):
+        res[b, :len(seq)] = [d or 0 for d in seq]
+    return res
+
+
+def _viterbi(degrees:np.ndarray, trans:np.ndarray, reg:np.ndarray, start=(0, 0))->np.ndarray:
+    '''
+    Minimal-cost candidate index of every step of every row of degrees (B, T).
+    Degrees are classes 0-7. start: (degree class, candidate) of the chord
+    sounded before the rows, degree class 0 for none.
+    '''
+    B, T = degrees.shape
+    rows = np.arange(B)
+    path = np.zeros((B, T), dtype=np.intp)
+    if not T:
+        return path
+    back = np.empty((T, B, trans.shape[-1]), dtype=np.intp)
+    last = np.full(B, start[0], dtype=np.intp)     # Degree of the last chord sounded
+    cost = np.zeros((B, trans.shape[-1]))
+    if start[0]:
+        cost[:] = np.inf
+        cost[:, start[1]] = 0.0
+    for t in range(T):
+        d = degrees[:, t]
+        total = cost[:, :, None] + trans[last, d]       # (B, from, to)
+        back[t] = total.argmin(1)
+        cost = total.min(1) + reg[d]
+        last = np.where(d > 0, d, last)
+    c = cost.argmin(1)
+    for t in range(T-1, -1, -1):
+        path[:, t] = c
+        c = back[t, rows, c]
+    return path
+
+
+def lead_batch(scale, sequences:Sequence[Sequence[int]], *, low_notes=True, octaves=(0, 1), weight=0.25, center=None)->List[List[Tuple]]:
+    '''
+    Voice-led chords of each degree progression, in one vectorized pass.
+
+    @params:
+        scale: Scale
+        sequences: Sequence of degree sequences (degree 0 / None: rest)
+        low_notes: bool - As Scale.chord
+        octaves: Tuple[int] - Candidate octave shifts of each chord
+        weight: float - Register cost per semitone of mean pitch away from center
+        center: float - Optional. Target mean pitch (semitone - 1 + 12*octave);
+                        default: middle of the candidate voicings
+    '''
+    choices, trans, reg = _tables(scale.key, scale.rule, low_notes, tuple(octaves), weight, center)
+    degrees = _degrees(sequences)
+    classes = np.where(degrees > 0, (degrees - 1) % 7 + 1, 0)
+    path = _viterbi(classes, trans, reg).tolist()
+    res = []
+    for seq, row, cls in zip(sequences, path, classes.tolist()):
+        chords = []
+        for c, d in zip(row[:len(seq)], cls):
+            if d:
+                inv, k = choices[c]
+                chords.append(scale.chord(d + 7*k, inversion=inv, low_notes=low_notes))
+            else:
+                chords.append(())
+        res.append(chords)
+    return res
+
+
+def lead(scale, degrees:Sequence[int], **kwargs)->List[Tuple]:
+    '''
+    Voice-led chords of a degree progression (see lead_batch for params).
+    Degrees are taken modulo 7: the octave of each chord is chosen by the leading.
+    '''
+    return lead_batch(scale, [degrees], **kwargs)[0]
+
+
+def lead_stream(scale, degrees:Iterable[int], *, window=4, low_notes=True, octaves=(0, 1), weight=0.25, center=None)->Iterator[Tuple]:
+    '''
+    Online form of lead: yields the voice-led chord of each degree of an iterable
+    (which may be endless), pulling window-1 degrees ahead. Each chord is fixed by
+    a Viterbi pass from the last chord sounded over the next window degrees,
+    O(window x voicings²) per chord; window=1 is a greedy step.
+    Params as lead_batch.
+    '''
+    if window < 1:
+        raise ValueError("window must be at least 1")
+    choices, trans, reg = _tables(scale.key, scale.rule, low_notes, tuple(octaves), weight, center)
+    degrees = iter(degrees)
+    ahead = deque()
+    state = (0, 0)      # (degree class, candidate) of the last chord sounded
+    while True:
+        for d in degrees:
+            ahead.append((d - 1) % 7 + 1 if d else 0)
+            if len(ahead) >= window:
+                break
+        if not ahead:
+            return
+        c = _viterbi(np.array([ahead]), trans, reg, state)[0, 0]
+        d = ahead.popleft()
+        if d:
+            state = (d, c)
+            inv, k = choices[c]
+            yield scale.chord(d + 7*k, inversion=inv, low_notes=low_notes)
+        else:
+            yield ()
+
+
+def movement(chords:Sequence[Tuple])->int:
+    '''
+    Total voice movement of chords, in semitones (rests are skipped).
+    '''
+    total, prev = 0, None
+    for chord in chords:
+        if not chord:
+            continue
+        cur = sorted(s - 1 + 12*o for s, o in chord)
+        if prev is not None:
+            total += sum(abs(a - b) for a, b in zip(prev, cur))
+        prev = cur
+    return total
@@ -1,3 +1,6 @@
 CONFIG = dict(
     java_path="C:\\Users\\Fauzaan\\Desktop\\",
+    midi_backend="java",    # "java", "python" (binary reference backend), "null", "recording"
+    midi_protocol="text",   # "text" / "binary", for the "null" and "recording" backends
+    shared_midi=False,  # True: Scales play through channels of one MidiHub backend (not java)
 )
\ No newline at end of file